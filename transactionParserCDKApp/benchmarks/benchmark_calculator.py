@@ -0,0 +1,137 @@
+"""
+Throughput / latency / memory benchmark for the reward calculator
+
+Scores seeded synthetic statements (see synthetic.py) of each size plus
+the adversarial large spend months, and checks the month solver against
+the brute force oracle (see oracle.py) on small random months so that
+performance work cannot silently lose optimality
+
+Usage (from transactionParserCDKApp):
+    python benchmarks/benchmark_calculator.py [--sizes 10,1000,100000,1000000]
+        [--repeat 5] [--oracle-months 200] [--seed 0]
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "lambda"
+))
+
+from oracle import brute_force_month  # noqa: E402
+from synthetic import (  # noqa: E402
+    adversarial_statements, generate_statement, small_months
+)
+from rewardPointsCalculator import lambda_handler  # noqa: E402
+from rewardPointsCalculator.rewardPointsCalculator import (  # noqa: E402
+    DEFAULT_RULES, RewardPointsCalculator
+)
+
+DEFAULT_SIZES = "10,1000,100000,1000000"
+
+
+def operations(transactions):
+    """(name, zero argument callable) pairs measured for one statement"""
+    calculator = RewardPointsCalculator(transactions)
+    event = {"body": json.dumps({"transactions": transactions})}
+    return [
+        ("construct", lambda: RewardPointsCalculator(transactions)),
+        ("month", calculator.maximum_reward_for_month),
+        ("per_transaction", calculator.maximum_reward_per_transaction),
+        ("handler", lambda: lambda_handler.handler(event, None)),
+    ]
+
+
+def measure(function, repeat):
+    """Latencies (seconds) of repeat calls and peak traced memory (bytes)"""
+    latencies = []
+    # the calculator prints its results, keep that out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start)
+
+        # separate traced call, tracemalloc slows everything down
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return latencies, peak
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(scenario, num_transactions, name, latencies, peak):
+    p50 = statistics.median(latencies)
+    row = "{:<24} {:<16} {:>10} {:>12.0f} {:>10.3f} {:>10.3f} {:>10.1f}"
+    print(row.format(
+        scenario, name, num_transactions,
+        num_transactions / p50 if p50 else float("inf"),
+        p50 * 1000, percentile(latencies, 0.99) * 1000, peak / 2 ** 20
+    ))
+
+
+def check_oracle(count, seed):
+    """Compares maximum_reward_for_month with the brute force oracle"""
+    mismatches = []
+    for transactions in small_months(count, seed):
+        calculator = RewardPointsCalculator(transactions)
+        with open(os.devnull, "w") as devnull, \
+             contextlib.redirect_stdout(devnull):
+            reward, _ = calculator.maximum_reward_for_month()
+        expected = brute_force_month(
+            calculator._parsed_transactions, DEFAULT_RULES
+        )
+        if reward != expected:
+            mismatches.append((transactions, reward, expected))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--oracle-months", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print("{:<24} {:<16} {:>10} {:>12} {:>10} {:>10} {:>10}".format(
+        "scenario", "operation", "rows", "rows/s", "p50 ms", "p99 ms",
+        "peak MiB"
+    ))
+    scenarios = [
+        ("synthetic_{}".format(size), generate_statement(size, args.seed))
+        for size in map(int, args.sizes.split(","))
+    ] + sorted(adversarial_statements().items())
+    for scenario, transactions in scenarios:
+        # fewer repeats for the big statements
+        repeat = max(
+            1, min(args.repeat, 10 ** 6 // (len(transactions) * 10) or 1)
+        )
+        for name, function in operations(transactions):
+            latencies, peak = measure(function, repeat)
+            report(scenario, len(transactions), name, latencies, peak)
+
+    mismatches = check_oracle(args.oracle_months, args.seed)
+    print("oracle: {}/{} months match".format(
+        args.oracle_months - len(mismatches), args.oracle_months
+    ))
+    for transactions, reward, expected in mismatches[:5]:
+        print("  mismatch: got {} expected {} for {}".format(
+            reward, expected, json.dumps(transactions)
+        ))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
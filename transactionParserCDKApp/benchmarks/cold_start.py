@@ -0,0 +1,149 @@
+"""
+Cold start benchmark for the Lambda package
+
+Every run starts a fresh interpreter on a temporary copy of
+lambda/rewardPointsCalculator and measures, inside that interpreter,
+the time to import rewardPointsCalculator.lambda_handler and the
+duration of the first and second handler invocations on the README
+sample request
+
+Usage (from transactionParserCDKApp):
+    python benchmarks/cold_start.py [--runs 20] [--bytecode] [--no-preload]
+"""
+import argparse
+import compileall
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+LAMBDA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "lambda"
+)
+
+SAMPLE_TRANSACTIONS = {
+    "T01": {
+        "date": "2021-05-01", "merchant_code": "sportcheck",
+        "amount_cents": 21000
+    },
+    "T02": {
+        "date": "2021-05-02", "merchant_code": "sportcheck",
+        "amount_cents": 8700
+    },
+    "T03": {
+        "date": "2021-05-03", "merchant_code": "tim_hortons",
+        "amount_cents": 323
+    },
+    "T04": {
+        "date": "2021-05-04", "merchant_code": "tim_hortons",
+        "amount_cents": 1267
+    },
+    "T05": {
+        "date": "2021-05-05", "merchant_code": "tim_hortons",
+        "amount_cents": 2116
+    },
+    "T06": {
+        "date": "2021-05-06", "merchant_code": "tim_hortons",
+        "amount_cents": 2211
+    },
+    "T07": {
+        "date": "2021-05-07", "merchant_code": "subway",
+        "amount_cents": 1853
+    },
+    "T08": {
+        "date": "2021-05-08", "merchant_code": "subway",
+        "amount_cents": 2153
+    },
+    "T09": {
+        "date": "2021-05-09", "merchant_code": "sportcheck",
+        "amount_cents": 7326
+    },
+    "T10": {
+        "date": "2021-05-10", "merchant_code": "tim_hortons",
+        "amount_cents": 1321
+    }
+}
+
+# runs inside the fresh interpreter, prints its timings as JSON
+CHILD = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+from rewardPointsCalculator import lambda_handler
+imported = time.perf_counter()
+event = {"body": sys.argv[1]}
+with contextlib.redirect_stdout(io.StringIO()):
+    lambda_handler.handler(event, None)
+    first = time.perf_counter()
+    lambda_handler.handler(event, None)
+    second = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_invocation_ms": (first - imported) * 1000,
+    "second_invocation_ms": (second - first) * 1000
+}))
+"""
+
+
+def run_once(package_dir, bytecode, preload):
+    """Times one cold start in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=package_dir)
+    env["PRELOAD_RULE_PLAN"] = "1" if preload else "0"
+    if not bytecode:
+        # same as a Lambda package without __pycache__: /var/task is
+        #  read only so the source is compiled on every cold start
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD,
+         json.dumps({"transactions": SAMPLE_TRANSACTIONS})],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--bytecode", action="store_true",
+        help="precompile the package like the CDK bundling step does"
+    )
+    parser.add_argument(
+        "--no-preload", action="store_true",
+        help="compile the rule plan in the first invocation instead"
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as package_dir:
+        shutil.copytree(
+            os.path.join(LAMBDA_DIR, "rewardPointsCalculator"),
+            os.path.join(package_dir, "rewardPointsCalculator"),
+            ignore=shutil.ignore_patterns("__pycache__")
+        )
+        if args.bytecode:
+            compileall.compile_dir(
+                package_dir, quiet=1,
+                invalidation_mode=(
+                    compileall.py_compile.PycInvalidationMode.UNCHECKED_HASH
+                )
+            )
+
+        runs = [
+            run_once(package_dir, args.bytecode, not args.no_preload)
+            for _ in range(args.runs)
+        ]
+
+    print("{} runs, bytecode={}, preload={}".format(
+        args.runs, args.bytecode, not args.no_preload
+    ))
+    for key in ("import_ms", "first_invocation_ms", "second_invocation_ms"):
+        values = [run[key] for run in runs]
+        print("{:<22} median {:7.2f}  min {:7.2f}  max {:7.2f}".format(
+            key, statistics.median(values), min(values), max(values)
+        ))
+
+
+if __name__ == "__main__":
+    main()
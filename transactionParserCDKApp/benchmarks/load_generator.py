@@ -0,0 +1,146 @@
+"""
+Load generator for the asyncio scoring service
+
+Opens --clients keep-alive connections that together send --requests
+POSTs of seeded synthetic statements (see synthetic.py), a share of them
+byte-identical so coalescing kicks in, and reports throughput, p50/p99
+latency and status counts. Without --port an in-process service is
+started on a free port and its batching counters are printed too
+
+Usage (from transactionParserCDKApp):
+    python benchmarks/load_generator.py [--clients 32] [--requests 2000]
+        [--transactions 200] [--duplicate-share 0.3]
+        [--max-batch-size 64] [--max-wait-ms 5] [--host H --port P]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "lambda"
+))
+
+from synthetic import generate_statement  # noqa: E402
+from rewardPointsCalculator import service  # noqa: E402
+
+# distinct statements the duplicates are drawn from
+DUPLICATE_POOL = 8
+
+
+async def client(host, port, bodies, latencies, statuses):
+    """Sends its bodies one after another over a single connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            writer.write((
+                "POST / HTTP/1.1\r\nHost: {}\r\n"
+                "Content-Type: application/json\r\n"
+                "Content-Length: {}\r\n\r\n"
+            ).format(host, len(body)).encode() + body)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def make_bodies(args):
+    """Request bodies, duplicates drawn from a small pool of statements"""
+    rng = random.Random(args.seed)
+    pool = [
+        json.dumps({"transactions": generate_statement(
+            args.transactions, seed=args.seed + index
+        )}).encode()
+        for index in range(DUPLICATE_POOL)
+    ]
+    return [
+        rng.choice(pool) if rng.random() < args.duplicate_share
+        else json.dumps({"transactions": generate_statement(
+            args.transactions, seed=args.seed + DUPLICATE_POOL + index
+        )}).encode()
+        for index in range(args.requests)
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(args):
+    bodies = make_bodies(args)
+    server = scorer = None
+    host, port = args.host, args.port
+    if port is None:
+        server, scorer = await service.start_server(
+            host, 0, args.max_batch_size, args.max_wait_ms / 1000
+        )
+        port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, bodies[index::args.clients], latencies, statuses)
+        for index in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print("requests {}  clients {}  rows/request {}".format(
+        len(latencies), args.clients, args.transactions
+    ))
+    print("throughput {:.1f} req/s  p50 {:.2f} ms  p99 {:.2f} ms".format(
+        len(latencies) / elapsed,
+        statistics.median(latencies) * 1000,
+        percentile(latencies, 0.99) * 1000
+    ))
+    print("statuses {}".format(json.dumps(statuses, sort_keys=True)))
+    if scorer is not None:
+        print(
+            "batches {batches}  coalesced {coalesced}".format(**scorer.stats)
+        )
+        server.close()
+        await server.wait_closed()
+        await scorer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=200)
+    parser.add_argument("--duplicate-share", type=float, default=0.3)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=service.DEFAULT_MAX_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=service.DEFAULT_MAX_WAIT * 1000
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="target a running service")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
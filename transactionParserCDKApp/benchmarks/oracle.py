@@ -0,0 +1,82 @@
+"""
+Brute force month oracle, independent of the calculator's solver
+
+Tries every multiset of rules (including the ones the plan compiler
+prunes) on the per merchant totals and gives whatever is left over to
+the OTHER only rules, so it is only usable for small spends
+"""
+from typing import Any, Dict, List
+
+
+def brute_force_month(
+    parsed_transactions: Dict[str, int],
+    rules: List[Dict[str, Any]]
+) -> int:
+    """
+    Max reward for a month by exhaustive search
+
+    Args:
+        parsed_transactions -- {merchant: cents} totals, unknown
+                               merchants already under 'other'
+        rules -- a list of rules (see DEFAULT_RULES for format)
+
+    Returns:
+        int -- max reward points
+    """
+    merchants = sorted(parsed_transactions)
+    # everything in whole dollars, requirements are whole dollars
+    available = {
+        merchant: parsed_transactions[merchant] // 100
+        for merchant in merchants
+    }
+    pool = sum(parsed_transactions.values()) // 100
+
+    specific = []
+    other_only = []
+    for rule in rules:
+        reqs = {}
+        for merchant, amount in rule["Reqs"]:
+            reqs[merchant] = reqs.get(merchant, 0) + amount
+        cost = sum(reqs.values())
+        if set(reqs) == {"other"}:
+            other_only.append((rule["Points"], cost))
+        elif all(merchant in available for merchant in reqs):
+            specific.append((rule["Points"], reqs, cost))
+
+    def leftover_reward(amount):
+        best = 0
+        for points, cost in other_only:
+            if cost <= amount:
+                best = max(best, points + leftover_reward(amount - cost))
+        return best
+
+    leftover_rewards = {}
+
+    def search(index, available, pool):
+        if index == len(specific):
+            if pool not in leftover_rewards:
+                leftover_rewards[pool] = leftover_reward(pool) \
+                    if len(other_only) > 1 or not other_only \
+                    else pool // other_only[0][1] * other_only[0][0]
+            return leftover_rewards[pool]
+
+        points, reqs, cost = specific[index]
+        best = 0
+        count = 0
+        while True:
+            remaining = dict(available)
+            fits = pool >= count * cost
+            for merchant, amount in reqs.items():
+                if merchant != "other":
+                    remaining[merchant] -= count * amount
+                    fits = fits and remaining[merchant] >= 0
+            if not fits:
+                return best
+            best = max(
+                best,
+                count * points
+                + search(index + 1, remaining, pool - count * cost)
+            )
+            count += 1
+
+    return search(0, available, pool)
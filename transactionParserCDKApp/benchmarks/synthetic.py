@@ -0,0 +1,122 @@
+"""
+Seeded synthetic statements for the benchmarks
+
+Transactions follow a rough card statement mix: many small coffee and
+sandwich purchases, fewer larger sportcheck ones and a long tail of
+other merchants, with log-normal amounts per merchant
+"""
+import random
+from typing import Any, Dict, List
+
+# merchant_code -> (share of transactions, median amount in cents, sigma)
+MERCHANT_PROFILES = {
+    "sportcheck": (0.15, 6000, 0.9),
+    "tim_hortons": (0.35, 450, 0.6),
+    "subway": (0.20, 1100, 0.5),
+    "other": (0.05, 2500, 1.0),
+}
+# merchants that parse_transactions files under 'other'
+UNKNOWN_MERCHANTS = ["starbucks", "amazon", "loblaws", "shell", "netflix"]
+UNKNOWN_SHARE = 0.25
+# repeated purchases (same order every morning) are common in statements
+REPEAT_SHARE = 0.3
+
+
+def generate_statement(
+    num_transactions: int,
+    seed: int = 0,
+    start_date: str = "2021-05"
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Generates a month of transactions in the request body format
+
+    Args:
+        num_transactions -- number of transactions
+        seed -- random seed, the same seed gives the same statement
+        start_date -- year and month of the transaction dates
+
+    Returns:
+        dict -- {"T0000001": {"date", "merchant_code", "amount_cents"}}
+    """
+    rng = random.Random(seed)
+    merchants = list(MERCHANT_PROFILES) + UNKNOWN_MERCHANTS
+    weights = [share for share, _, _ in MERCHANT_PROFILES.values()] + [
+        UNKNOWN_SHARE / len(UNKNOWN_MERCHANTS)
+    ] * len(UNKNOWN_MERCHANTS)
+    width = len(str(num_transactions))
+
+    transactions = {}
+    previous = []
+    for index in range(num_transactions):
+        if previous and rng.random() < REPEAT_SHARE:
+            merchant, amount = rng.choice(previous)
+        else:
+            merchant = rng.choices(merchants, weights)[0]
+            _, median, sigma = MERCHANT_PROFILES.get(
+                merchant, MERCHANT_PROFILES["other"]
+            )
+            amount = max(1, int(rng.lognormvariate(0, sigma) * median))
+            if len(previous) < 50:
+                previous.append((merchant, amount))
+        transactions["T{:0{}d}".format(index + 1, width)] = {
+            "date": "{}-{:02d}".format(start_date, index % 28 + 1),
+            "merchant_code": merchant,
+            "amount_cents": amount
+        }
+    return transactions
+
+
+def adversarial_statements() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Few transactions with very large or boundary spends that stress the
+    month solver rather than the per row loops
+
+    Returns:
+        dict -- scenario name -> transactions
+    """
+    def statement(*rows):
+        return {
+            "T{:02d}".format(index + 1): {
+                "date": "2021-05-01", "merchant_code": merchant,
+                "amount_cents": amount
+            }
+            for index, (merchant, amount) in enumerate(rows)
+        }
+
+    return {
+        "sportcheck_5M": statement(("sportcheck", 500_000_000)),
+        "balanced_5M": statement(
+            ("sportcheck", 500_000_000), ("tim_hortons", 170_000_000),
+            ("subway", 170_000_000)
+        ),
+        "unbalanced_5M": statement(
+            ("sportcheck", 500_000_000), ("tim_hortons", 300_000_001),
+            ("subway", 9_999), ("amazon", 123_456_789)
+        ),
+        "just_below_thresholds": statement(
+            ("sportcheck", 7_499), ("tim_hortons", 2_499),
+            ("subway", 2_499), ("sportcheck", 1_999)
+        ),
+        "many_cents": statement(*[("tim_hortons", 99)] * 5000),
+    }
+
+
+def small_months(count: int, seed: int = 0) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Months small enough for the brute force oracle (a few hundred
+    dollars per merchant)
+    """
+    rng = random.Random(seed)
+    months = []
+    for _ in range(count):
+        months.append({
+            "T{}".format(index): {
+                "date": "2021-05-01",
+                "merchant_code": rng.choice(
+                    ["sportcheck", "tim_hortons", "subway", "starbucks"]
+                ),
+                "amount_cents": rng.randint(1, rng.choice([3000, 12000]))
+            }
+            for index in range(rng.randint(1, 12))
+        })
+    return months
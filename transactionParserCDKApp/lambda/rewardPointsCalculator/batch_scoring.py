@@ -0,0 +1,185 @@
+"""
+Batch scoring of many accounts' months
+
+Input is a set of NDJSON shard files, one transaction per line:
+    {"account_id": "A1", "merchant_code": "sportcheck", "amount_cents": 2500}
+with every account's transactions inside a single shard. Shards are
+spread over a process pool and each one is written back as an NDJSON
+file of per account results with the same name in the output directory
+
+Usage:
+    python -m rewardPointsCalculator.batch_scoring OUTPUT_DIR SHARD...
+"""
+import argparse
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, MonthAccumulator
+)
+from .transaction_reader import iter_ndjson_transactions
+from .worker_pool import pool_map, worker_state
+
+# tasks per worker process the shards are split into by default, so a
+#  worker left with slow shards does not keep the others idle at the end
+TASKS_PER_WORKER = 4
+
+
+def score_accounts(
+    transactions: Iterable[Dict[str, Any]],
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    per_transaction: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scores the month of every account in a stream of transactions
+
+    Args:
+        transactions -- transactions carrying an "account_id" key
+        rules -- a list of rules (see DEFAULT_RULES for format)
+        defined_merchants -- set of known merchant codes
+        per_transaction -- also return max_reward_per_transaction
+
+    Returns:
+        iterator of per account results, in first seen account order
+    """
+    accumulators = {}
+    for transaction in transactions:
+        account_id = transaction["account_id"]
+        if account_id not in accumulators:
+            accumulators[account_id] = MonthAccumulator(
+                rules, defined_merchants,
+                keep_transaction_rewards=per_transaction
+            )
+        accumulators[account_id].add(transaction)
+
+    for account_id, accumulator in accumulators.items():
+        max_reward, rules_used = accumulator.maximum_reward_for_month()
+        result = {
+            "account_id": account_id,
+            "transaction_count": accumulator.transaction_count,
+            "max_reward": max_reward,
+            "rules_used": rules_used
+        }
+        if per_transaction:
+            result["max_reward_per_transaction"] = \
+                accumulator.maximum_reward_per_transaction()
+        yield result
+
+
+def score_shards(
+    shard_paths: List[str],
+    output_dir: str,
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    per_transaction: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> List[str]:
+    """
+    Scores NDJSON shard files in parallel, writing one result file per
+    shard into output_dir
+
+    Args:
+        shard_paths -- input shard files (see module docstring)
+        output_dir -- directory for the result shards
+        rules -- a list of rules (see DEFAULT_RULES for format)
+        defined_merchants -- set of known merchant codes
+        per_transaction -- also write max_reward_per_transaction
+        workers -- number of worker processes (defaults to cpu count)
+        chunk_size -- shards handed to a worker per task (defaults to
+                      an even split into TASKS_PER_WORKER tasks per
+                      worker, see default_chunk_size)
+
+    Returns:
+        list -- paths of the written result shards, in input order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = [
+        os.path.join(output_dir, os.path.basename(path))
+        for path in shard_paths
+    ]
+
+    if chunk_size is None:
+        chunk_size = default_chunk_size(len(shard_paths), workers)
+    return pool_map(
+        _score_shard, shard_paths, output_paths,
+        workers=workers,
+        state=(rules, defined_merchants, per_transaction),
+        chunksize=chunk_size
+    )
+
+
+def default_chunk_size(num_shards: int, workers: Optional[int] = None) -> int:
+    """
+    Shards per task splitting num_shards into TASKS_PER_WORKER tasks per
+    worker, at least one
+
+    Args:
+        num_shards -- number of shards to score
+        workers -- number of worker processes (defaults to cpu count)
+
+    Returns:
+        int -- the chunk size
+    """
+    workers = workers or os.cpu_count() or 1
+    return max(math.ceil(num_shards / (workers * TASKS_PER_WORKER)), 1)
+
+
+def _score_shard(shard_path: str, output_path: str) -> str:
+    """Scores one shard file into output_path (runs in a worker)"""
+    # every MonthAccumulator of this worker reuses the cached plan
+    rules, defined_merchants, per_transaction = worker_state()
+    with open(shard_path) as shard, open(output_path, "w") as output:
+        for result in score_accounts(
+            iter_ndjson_transactions(shard),
+            rules,
+            defined_merchants,
+            per_transaction
+        ):
+            output.write(json.dumps(result))
+            output.write("\n")
+    return output_path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Score the reward points of many accounts' months"
+    )
+    parser.add_argument("output_dir", help="directory for result shards")
+    parser.add_argument("shards", nargs="+", help="NDJSON input shards")
+    parser.add_argument(
+        "--rules", help="JSON file with a rule set (DEFAULT_RULES format)"
+    )
+    parser.add_argument(
+        "--per-transaction", action="store_true",
+        help="also write max_reward_per_transaction for every account"
+    )
+    parser.add_argument("--workers", type=int, help="worker processes")
+    parser.add_argument(
+        "--chunk-size", type=int,
+        help="shards handed to a worker per task (default: %d tasks per "
+             "worker)" % TASKS_PER_WORKER
+    )
+    args = parser.parse_args(argv)
+
+    rules = DEFAULT_RULES
+    if args.rules:
+        with open(args.rules) as rules_file:
+            rules = json.load(rules_file)
+
+    for path in score_shards(
+        args.shards,
+        args.output_dir,
+        rules=rules,
+        per_transaction=args.per_transaction,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    ):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
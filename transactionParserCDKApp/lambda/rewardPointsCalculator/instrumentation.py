@@ -0,0 +1,86 @@
+"""
+Structured, sampled logging of the calculator's instrumentation events
+
+    install_from_environment()
+
+registers a SampledLogHook (see rewardPointsCalculator.add_hook) that
+writes one JSON line per sampled event, eg.
+    {"event": "month_solve", "ms": 0.41, "units": [3, 0, 0, 1]}
+and adds the process counters (rewardPointsCalculator.COUNTERS) to the
+sampled "invocation" records
+
+Environment:
+    LOG_SAMPLE_RATE -- share of events logged (default 0.01, 0 disables)
+    LOG_PAYLOADS -- "1" also logs full request payloads (default off)
+"""
+import json
+import logging
+import os
+import random
+from typing import Any, Callable, Dict, Optional
+
+from .rewardPointsCalculator import COUNTERS, add_hook
+
+DEFAULT_SAMPLE_RATE = 0.01
+# sampled records of these events also carry the process counters
+COUNTER_EVENTS = {"invocation"}
+
+logger = logging.getLogger("rewardPointsCalculator")
+
+
+class SampledLogHook:
+    """Instrumentation hook logging a random share of events as JSON"""
+
+    def __init__(
+        self,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        log: Optional[Callable[[str], None]] = None,
+        rng: Callable[[], float] = random.random
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            sample_rate -- share of events logged, in [0, 1]
+            log -- receives each JSON record (defaults to logger.info)
+            rng -- uniform [0, 1) source for the sampling decision
+        """
+        self.sample_rate = sample_rate
+        self._log = log or logger.info
+        self._rng = rng
+
+    def __call__(
+        self,
+        event: str,
+        seconds: float,
+        fields: Dict[str, Any]
+    ) -> None:
+        if self._rng() >= self.sample_rate:
+            return
+        record = {"event": event, "ms": round(seconds * 1000, 3)}
+        record.update(fields)
+        if event in COUNTER_EVENTS:
+            record["counters"] = dict(COUNTERS)
+        self._log(json.dumps(record, default=str))
+
+
+def payload_logging_enabled() -> bool:
+    """Whether LOG_PAYLOADS asks for full request payloads in the logs"""
+    return os.environ.get("LOG_PAYLOADS", "0") == "1"
+
+
+def install_from_environment() -> Optional[SampledLogHook]:
+    """
+    Registers a SampledLogHook configured by LOG_SAMPLE_RATE
+
+    Returns:
+        SampledLogHook -- the registered hook, None when sampling is off
+    """
+    sample_rate = float(os.environ.get("LOG_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+    if sample_rate <= 0:
+        return None
+    # the Lambda runtime's root logger only passes WARNING and up
+    logger.setLevel(logging.INFO)
+    hook = SampledLogHook(sample_rate)
+    add_hook(hook)
+    return hook
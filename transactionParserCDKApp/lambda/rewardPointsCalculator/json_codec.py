@@ -0,0 +1,90 @@
+"""
+Pluggable JSON codec for request bodies and responses
+
+get_codec() returns the orjson backed codec when orjson is installed and
+the standard library one otherwise; JSON_CODEC=json (or orjson) in the
+environment forces a backend. Both write compact JSON
+"""
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, Tuple
+
+from .transaction_reader import iter_json_transactions
+
+
+class StdlibCodec:
+    """json module codec; request bodies are decoded incrementally"""
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def loads(self, data: Any) -> Any:
+        return json.loads(data)
+
+    def iter_transactions(
+        self,
+        body: str,
+        options: Dict[str, Any]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields the (transaction_id, transaction) pairs of a request body,
+        filling options with its other top level keys
+        """
+        return iter_json_transactions(io.StringIO(body), options)
+
+
+class OrjsonCodec:
+    """
+    orjson codec; request bodies are decoded in one call, which is much
+    faster than the incremental reader but holds the whole document
+    """
+    name = "orjson"
+
+    def __init__(self, orjson: Any) -> None:
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def loads(self, data: Any) -> Any:
+        return self._orjson.loads(data)
+
+    def iter_transactions(
+        self,
+        body: str,
+        options: Dict[str, Any]
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """See StdlibCodec.iter_transactions"""
+        document = self._orjson.loads(body)
+        if not isinstance(document, dict):
+            raise ValueError("Expected a JSON object")
+        transactions = document.pop("transactions", {})
+        if not isinstance(transactions, dict):
+            raise ValueError("Expected transactions to be a JSON object")
+        options.update(document)
+        return iter(transactions.items())
+
+
+def get_codec(name: str = None) -> Any:
+    """
+    Args:
+        name -- "orjson" or "json" (defaults to JSON_CODEC, else orjson
+                when installed)
+
+    Returns:
+        the codec (StdlibCodec or OrjsonCodec)
+    """
+    name = name or os.environ.get("JSON_CODEC")
+    if name in (None, "orjson"):
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise
+        else:
+            return OrjsonCodec(orjson)
+    elif name != "json":
+        raise ValueError("Unknown JSON codec %r" % (name,))
+    return StdlibCodec()
@@ -1,27 +1,274 @@
-import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
-from .rewardPointsCalculator import RewardPointsCalculator
+from .instrumentation import (
+    install_from_environment, logger, payload_logging_enabled
+)
+from .json_codec import get_codec
+from .merchant_registry import registry_from_environment
+from .period_scoring import PeriodIndex
+from .rewardPointsCalculator import (
+    MonthAccumulator, RewardPointsCalculator, RewardTable, Timer,
+    TransactionColumns, compile_rules, date_ordinal, install_reward_table,
+    rewards_from_columns
+)
 
+# compile the default rule plan during the Lambda init phase instead of
+#  in the first invocation (set PRELOAD_RULE_PLAN=0 to skip)
+if os.environ.get("PRELOAD_RULE_PLAN", "1") != "0":
+    compile_rules()
 
-def handler(event, context):
-    print("request: ", json.dumps(event))
-    transactions = json.loads(event["body"])["transactions"]
+# precomputed month answers (RewardTable.save) memory mapped at init so
+#  month solves within its bounds are lookups
+if os.environ.get("REWARD_TABLE_PATH"):
+    install_reward_table(RewardTable.load(os.environ["REWARD_TABLE_PATH"]))
+
+# worker processes for solving many periods; Lambda has no /dev/shm for
+#  multiprocessing so periods are solved in process unless raised
+PERIOD_WORKERS = int(os.environ.get("PERIOD_WORKERS", "1"))
+
+# sampled structured logs of the timed operations (see instrumentation)
+install_from_environment()
+LOG_PAYLOADS = payload_logging_enabled()
+
+# response body of a request that failed for reasons other than its input
+INTERNAL_ERROR = {"message": "Internal server error"}
 
-    reward_pts_calc = RewardPointsCalculator(transactions)
+# orjson when installed, else the json module (JSON_CODEC overrides)
+CODEC = get_codec()
 
-    max_per_transaction = reward_pts_calc.maximum_reward_per_transaction()
-    max_for_month, rules_used = reward_pts_calc.maximum_reward_for_month()
+# raw merchant strings are mapped to merchant codes when
+#  MERCHANT_REGISTRY_PATH names a registry config (reloaded on change)
+MERCHANT_REGISTRY = registry_from_environment()
+
+
+def handler(event, context):
+    if LOG_PAYLOADS:
+        logger.info(
+            CODEC.dumps({"event": "request", "payload": event}).decode()
+        )
+
+    request_body = event.get("body") or ""
+    with Timer("invocation", body_bytes=len(request_body)):
+        try:
+            status, body = score_bodies([request_body])[0]
+        except Exception:
+            logger.exception("Scoring the request failed")
+            status, body = 500, dict(INTERNAL_ERROR)
+        with Timer("json_encode", codec=CODEC.name):
+            encoded = CODEC.dumps(body).decode()
 
     return {
-        'statusCode': 200,
+        'statusCode': status,
         'headers': {
             'Context-Type': 'application/json'
         },
-        'body': json.dumps({
-            "max_reward_per_transaction": max_per_transaction,
-            "rewards_for_month": {
-                "max_reward": max_for_month,
-                "rules_used": rules_used
-            }
-        })
-    }
\ No newline at end of file
+        'body': encoded
+    }
+
+
+def score_bodies(bodies: List[str]) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Scores request bodies together: the transactions of every body go
+    into one column store so they are scored in a single (vectorized
+    when large enough) pass, while months and periods are solved per body
+
+    Args:
+        bodies -- JSON request bodies ({"transactions": {...}, options})
+
+    Returns:
+        list -- (status code, response body) per body, in input order;
+                a malformed body gets (400, {"message"}) and one that
+                fails to score (500, INTERNAL_ERROR) without failing
+                the others
+    """
+    plan = compile_rules()
+    columns = TransactionColumns()
+    requests = []
+    canonical = None
+    if MERCHANT_REGISTRY is not None:
+        canonical = MERCHANT_REGISTRY.registry().canonical
+    for body in bodies:
+        start = len(columns)
+        # transactions are streamed out of the body straight into the
+        #  column store instead of building the whole transactions dict
+        options = {}
+        # transaction id -> its row; a repeated id keeps the row of its
+        #  first occurrence with the fields of its last, as json.loads
+        #  (and so the orjson codec) does
+        id_rows = {}
+        try:
+            with Timer("json_decode", body_bytes=len(body), codec=CODEC.name):
+                for transaction_id, transaction in CODEC.iter_transactions(
+                    body, options
+                ):
+                    _check_transaction(transaction_id, transaction)
+                    if canonical is not None:
+                        transaction["merchant_code"] = canonical(
+                            transaction["merchant_code"]
+                        )
+                    row = id_rows.get(transaction_id)
+                    if row is None:
+                        id_rows[transaction_id] = columns.append(
+                            transaction_id, transaction
+                        )
+                    else:
+                        columns.replace(row, transaction)
+        except (KeyError, OverflowError, TypeError, ValueError) as error:
+            columns.truncate(start)
+            requests.append(
+                ("Invalid request body: %s" % error, None, None)
+            )
+            continue
+        requests.append((None, options, slice(start, len(columns))))
+
+    # one pass for the whole batch, converted per body as requested;
+    #  rules are only worked out when some body asks for them
+    explain = any(
+        options.get("explain", True)
+        for error, options, _ in requests if error is None
+    )
+    try:
+        rewards = _score_rows(plan, columns, explain)
+    except Exception:
+        # bodies are then scored one at a time below, so a body that
+        #  cannot be scored only fails itself
+        logger.exception("Batch scoring failed")
+        rewards = None
+
+    results = []
+    for error, options, rows in requests:
+        if error is not None:
+            results.append((400, {"message": error}))
+            continue
+        try:
+            results.append(
+                _body_response(plan, columns, rewards, options, rows)
+            )
+        except OverflowError as error:
+            results.append((400, {"message": "Invalid amounts: %s" % error}))
+        except Exception:
+            logger.exception("Scoring a request body failed")
+            results.append((500, dict(INTERNAL_ERROR)))
+
+    return results
+
+
+def _check_transaction(transaction_id: str, transaction: Any) -> None:
+    """
+    Raises:
+        TypeError -- if a request transaction is not a JSON object with
+                     a string merchant_code
+    """
+    if not isinstance(transaction, dict):
+        raise TypeError(
+            "transaction %r is not a JSON object" % (transaction_id,)
+        )
+    if not isinstance(transaction.get("merchant_code", ""), str):
+        raise TypeError(
+            "merchant_code of transaction %r is not a string"
+            % (transaction_id,)
+        )
+
+
+def _score_rows(
+    plan: Any,
+    columns: TransactionColumns,
+    explain: bool
+) -> Dict[str, Any]:
+    """
+    Per transaction rewards of every row, {"points", "rules", "times"}
+    columns ({"points"} only without explain)
+    """
+    if explain:
+        return RewardPointsCalculator._score_columns(
+            plan, columns, columnar=True
+        )
+    return {"points": RewardPointsCalculator._score_columns(
+        plan, columns, points_only=True
+    )}
+
+
+def _body_response(
+    plan: Any,
+    columns: TransactionColumns,
+    rewards: Optional[Dict[str, Any]],
+    options: Dict[str, Any],
+    rows: slice
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Response of one body of a batch
+
+    Args:
+        plan -- compiled rule set
+        columns -- transactions of the whole batch
+        rewards -- per transaction rewards of the batch (see
+                   _score_rows), None to score the body's rows alone
+        options -- the body's top level keys besides "transactions"
+        rows -- the body's rows of columns
+
+    Returns:
+        tuple -- (status code, response body)
+    """
+    # "explain": false is the totals only fast path, points without
+    #  any rules_used
+    body_explain = options.get("explain", True)
+    if rewards is None:
+        rewards = _score_rows(
+            plan, columns.copy_rows(rows.start, rows.stop), body_explain
+        )
+        reward_rows = slice(None)
+    else:
+        reward_rows = rows
+
+    # the month only needs the body's per merchant totals
+    month = MonthAccumulator(keep_transaction_rewards=False)
+    month.add_merchant_totals(
+        columns.merchants,
+        columns.merchant_totals(rows.start, rows.stop),
+        rows.stop - rows.start
+    )
+    if body_explain:
+        max_for_month, rules_used = month.maximum_reward_for_month(
+            # opt-in to the legacy flat rules_used list
+            expand_rules_used=options.get("expand_rules_used", False)
+        )
+        rewards_for_month = {
+            "max_reward": max_for_month,
+            "rules_used": rules_used
+        }
+        body_rewards = {
+            column: values[reward_rows] for column, values in rewards.items()
+        }
+    else:
+        rewards_for_month = {"max_reward": month.total_reward_for_month()}
+        body_rewards = {"points": rewards["points"][reward_rows]}
+
+    # opt-in compact format: parallel "points", "rules" and "times"
+    #  arrays instead of a (points, {"rules_used"}) pair per row
+    if options.get("response_format") != "columnar":
+        if body_explain:
+            body_rewards = rewards_from_columns(body_rewards)
+        else:
+            body_rewards = body_rewards["points"]
+    body = {
+        "max_reward_per_transaction": body_rewards,
+        "rewards_for_month": rewards_for_month
+    }
+    # opt-in per period breakdown: "period" is "month" or a window
+    #  length in days, optionally aligned to a "period_start" date;
+    #  the per day index is only built for these
+    if "period" in options:
+        index = PeriodIndex()
+        index.add_columns(columns, rows.start, rows.stop)
+        try:
+            body["rewards_by_period"] = index.solve(
+                options["period"],
+                anchor=date_ordinal(options.get("period_start")) or 1,
+                expand_rules_used=options.get("expand_rules_used", False),
+                workers=PERIOD_WORKERS,
+                explain=body_explain
+            )
+        except ValueError as error:
+            return 400, {"message": str(error)}
+    return 200, body
@@ -0,0 +1,222 @@
+"""
+Mapping of raw merchant strings to canonical merchant codes
+
+Raw strings are normalized into lower case word tokens with store
+numbers dropped ("Tim Hortons #0442" -> "tim_hortons") and looked up in
+an exact alias index, then in a token prefix trie (longest prefix wins,
+so "SUBWAY 1234 TORONTO ON" -> "subway"). Results are cached per raw
+string, so a batch only normalizes each distinct merchant once:
+    registry = MerchantRegistry.from_file("merchants.json")
+    registry.canonical("SPORTCHEK #123")  # "sportcheck"
+
+Config file format (JSON):
+    {"merchants": {"sportcheck": {"aliases": ["sport chek"],
+                                  "prefixes": ["sportchek"]}, ...}}
+every code is an alias and a prefix of itself. Strings matching nothing
+are returned unchanged (parse_transactions then counts them as 'other')
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .rewardPointsCalculator import MerchantCode, TransactionColumns
+
+# raw strings whose canonical code is kept per registry
+MERCHANT_CACHE_SIZE = 1 << 16
+# aliases and prefixes of the built in merchant codes
+DEFAULT_MERCHANTS = {
+    MerchantCode.SPORTCHECK.value: {
+        "aliases": ["sport chek", "sport check"],
+        "prefixes": ["sportchek", "sport chek", "sport check"]
+    },
+    MerchantCode.TIM_HORTONS.value: {
+        "aliases": ["tims"],
+        "prefixes": ["tim hortons", "tim horton"]
+    },
+    MerchantCode.SUBWAY.value: {"aliases": [], "prefixes": ["subway"]},
+    MerchantCode.OTHER.value: {"aliases": [], "prefixes": []}
+}
+
+# word tokens of a raw merchant string (apostrophes dropped first)
+_TOKENS = re.compile(r"[^\W_]+")
+# trie key of the code ending a prefix
+_CODE = ""
+
+
+def merchant_tokens(raw: str) -> Tuple[str, ...]:
+    """
+    Lower case word tokens of a raw merchant string, without the purely
+    numeric ones (store numbers, terminal ids)
+    """
+    return tuple(
+        token for token in _TOKENS.findall(raw.casefold().replace("'", ""))
+        if not token.isdigit()
+    )
+
+
+def normalize_merchant(raw: str) -> str:
+    """Normalized raw merchant string ("Tim Hortons 0442" -> "tim_hortons")"""
+    return "_".join(merchant_tokens(raw))
+
+
+class MerchantRegistry:
+    """
+    Precompiled alias index (exact hash plus token prefix trie) from raw
+    merchant strings to canonical merchant codes
+    """
+
+    def __init__(
+        self,
+        merchants: Dict[str, Dict[str, List[str]]] = DEFAULT_MERCHANTS,
+        cache_size: int = MERCHANT_CACHE_SIZE
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            merchants -- {code: {"aliases": [...], "prefixes": [...]}}
+                         (see the config file format above)
+            cache_size -- raw strings whose result is cached
+        """
+        self.codes = frozenset(merchants)
+        # normalized alias -> code
+        self._exact = {}
+        # token -> subtrie, _CODE -> code of the prefix ending here
+        self._trie = {}
+        for code, names in merchants.items():
+            for alias in [code] + list(names.get("aliases", [])):
+                self._exact[normalize_merchant(alias)] = code
+            for prefix in [code] + list(names.get("prefixes", [])):
+                node = self._trie
+                for token in merchant_tokens(prefix):
+                    node = node.setdefault(token, {})
+                node[_CODE] = code
+        self.canonical = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        cache_size: int = MERCHANT_CACHE_SIZE
+    ) -> "MerchantRegistry":
+        """Registry from a JSON config file (see format above)"""
+        with open(path) as config_file:
+            config = json.load(config_file)
+        merchants = config.get("merchants")
+        if not isinstance(merchants, dict):
+            raise ValueError("%s has no merchants object" % (path,))
+        return cls(merchants, cache_size)
+
+    def _lookup(self, raw: Any) -> Any:
+        """
+        Canonical code of a raw merchant string (self.canonical is the
+        cached version), the string itself when nothing matches
+        """
+        if not isinstance(raw, str):
+            return raw
+        if raw in self.codes:
+            return raw
+        tokens = merchant_tokens(raw)
+        code = self._exact.get("_".join(tokens))
+        if code is not None:
+            return code
+
+        node = self._trie
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                break
+            code = node.get(_CODE, code)
+        return raw if code is None else code
+
+    def canonicalize(
+        self,
+        transactions: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Copy of a request transactions dict with canonical merchant codes
+        """
+        canonical = self.canonical
+        return {
+            transaction_id: dict(
+                transaction,
+                merchant_code=canonical(transaction["merchant_code"])
+            )
+            for transaction_id, transaction in transactions.items()
+        }
+
+    def remap_columns(self, columns: TransactionColumns) -> TransactionColumns:
+        """
+        TransactionColumns with canonical merchant codes; only the
+        distinct merchants are looked up, the rows are then remapped by
+        merchant index
+
+        Args:
+            columns -- the transactions (eg. a MappedTransactionColumns)
+
+        Returns:
+            TransactionColumns -- new columns, row order kept
+        """
+        remapped = TransactionColumns()
+        new_index = []
+        for merchant in columns.merchants:
+            code = self.canonical(merchant)
+            lookup = remapped._merchant_lookup
+            if code not in lookup:
+                lookup[code] = len(remapped.merchants)
+                remapped.merchants.append(code)
+            new_index.append(lookup[code])
+
+        remapped.transaction_ids = list(columns.transaction_ids)
+        remapped.merchant_index.extend(
+            new_index[index] for index in columns.merchant_index
+        )
+        remapped.amount_cents.extend(columns.amount_cents)
+        remapped.date_ordinals.extend(columns.date_ordinals)
+        return remapped
+
+
+class RegistryFile:
+    """
+    Registry of a config file, reloaded when the file changes so a
+    warm process picks up new aliases without a redeploy
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = MERCHANT_CACHE_SIZE
+    ) -> None:
+        """
+        Constructor (loads the file)
+
+        Args:
+            path -- JSON config file (see format above)
+            cache_size -- raw strings whose result is cached
+        """
+        self.path = path
+        self._cache_size = cache_size
+        self._mtime = None
+        self._registry = None
+        self.registry()
+
+    def registry(self) -> MerchantRegistry:
+        """The registry of the file's current contents"""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            self._registry = MerchantRegistry.from_file(
+                self.path, self._cache_size
+            )
+            self._mtime = mtime
+        return self._registry
+
+
+def registry_from_environment() -> Optional[RegistryFile]:
+    """
+    RegistryFile of MERCHANT_REGISTRY_PATH, None when it is not set
+    (merchant codes are then used as sent)
+    """
+    path = os.environ.get("MERCHANT_REGISTRY_PATH")
+    return RegistryFile(path) if path else None
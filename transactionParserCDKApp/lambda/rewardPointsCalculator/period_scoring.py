@@ -0,0 +1,273 @@
+"""
+Date aware scoring of transactions spanning several periods
+
+Transactions are indexed by their "date" in one pass, keeping only per
+day merchant totals, and the days are then grouped into calendar months
+or fixed day windows, each solved on its own like a single month:
+    index = PeriodIndex()
+    index.add_many(transactions)
+    index.solve(PERIOD_MONTH)  # [{"period": "2021-05", ...}, ...]
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, MonthAccumulator,
+    RewardPointsCalculator, TransactionColumns, compile_rules, date_ordinal
+)
+from .worker_pool import pool_map, worker_state
+
+PERIOD_MONTH = "month"
+# period of transactions without a (valid) date
+UNDATED_PERIOD = "undated"
+# fewest periods worth spreading over a process pool
+PARALLEL_MIN_PERIODS = 64
+# periods handed to a worker process per task
+DEFAULT_CHUNK_SIZE = 8
+
+
+def period_key(
+    ordinal: int,
+    period: Union[str, int] = PERIOD_MONTH,
+    anchor: int = 1
+) -> str:
+    """
+    Period a day belongs to
+
+    Args:
+        ordinal -- date.toordinal() of the day (0 if undated)
+        period -- PERIOD_MONTH or a window length in days
+        anchor -- ordinal of a day starting a window (the default,
+                  0001-01-01, is a Monday so 7 day windows are weeks)
+
+    Returns:
+        str -- "YYYY-MM" for months, the ISO first day for windows
+    """
+    if period != PERIOD_MONTH and (
+        not isinstance(period, int) or isinstance(period, bool) or period < 1
+    ):
+        raise ValueError(
+            "period must be %r or a number of days" % PERIOD_MONTH
+        )
+    if not ordinal:
+        return UNDATED_PERIOD
+    if period == PERIOD_MONTH:
+        day = date.fromordinal(ordinal)
+        return "%04d-%02d" % (day.year, day.month)
+    return date.fromordinal(ordinal - (ordinal - anchor) % period).isoformat()
+
+
+class PeriodIndex:
+    """
+    Per day index of transactions; periods are only chosen when solving,
+    so the same index answers months and any day window
+    """
+
+    def __init__(
+        self,
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+        keep_transaction_rewards: bool = False
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            rules -- a list of rules (see DEFAULT_RULES for format)
+            defined_merchants -- set of known merchant codes
+            keep_transaction_rewards -- keep per transaction rewards of
+                                        the whole payload (see total)
+        """
+        self._rules = rules
+        self._defined_merchants = defined_merchants
+        # the whole payload as one month, as before periods existed
+        self.total = MonthAccumulator(
+            rules, defined_merchants, keep_transaction_rewards
+        )
+        # day ordinal -> merchant totals of that day
+        self._days = {}
+        # raw "date" value -> day ordinal
+        self._ordinals = {}
+
+    def add(self, transaction: Dict[str, Any]) -> None:
+        """
+        Adds one transaction ({"date", "merchant_code", "amount_cents"})
+        """
+        raw_date = transaction.get("date")
+        ordinal = self._ordinals.get(raw_date)
+        if ordinal is None:
+            ordinal = self._ordinals[raw_date] = date_ordinal(raw_date)
+
+        self._day(ordinal).add(transaction)
+        self.total.add(transaction)
+
+    def add_many(self, transactions: Iterable[Dict[str, Any]]) -> None:
+        """Adds every transaction of an iterable, consuming it lazily"""
+        for transaction in transactions:
+            self.add(transaction)
+
+    def add_columns(
+        self,
+        columns: TransactionColumns,
+        start: int = 0,
+        stop: Optional[int] = None
+    ) -> None:
+        """
+        Adds rows start to stop - 1 (default all) of a column store; the
+        rows are summed per day and merchant first, so the day
+        accumulators only see one total per merchant
+        """
+        if stop is None:
+            stop = len(columns)
+        merchant_count = len(columns.merchants)
+        # day ordinal -> (cents per merchant index, transaction count)
+        days = {}
+        for ordinal, index, amount in zip(
+            columns.date_ordinals[start:stop],
+            columns.merchant_index[start:stop],
+            columns.amount_cents[start:stop]
+        ):
+            day = days.get(ordinal)
+            if day is None:
+                day = days[ordinal] = ([0] * merchant_count, [0])
+            day[0][index] += amount
+            day[1][0] += 1
+
+        for ordinal, (totals, count) in days.items():
+            self._day(ordinal).add_merchant_totals(
+                columns.merchants, totals, count[0]
+            )
+        self.total.add_merchant_totals(
+            columns.merchants, columns.merchant_totals(start, stop),
+            stop - start
+        )
+
+    def _day(self, ordinal: int) -> MonthAccumulator:
+        """Accumulator of one day, created on first use"""
+        day = self._days.get(ordinal)
+        if day is None:
+            day = self._days[ordinal] = MonthAccumulator(
+                self._rules, self._defined_merchants,
+                keep_transaction_rewards=False
+            )
+        return day
+
+    def periods(
+        self,
+        period: Union[str, int] = PERIOD_MONTH,
+        anchor: int = 1
+    ) -> Dict[str, MonthAccumulator]:
+        """
+        Groups the indexed days into periods (see period_key for args)
+
+        Returns:
+            dict -- period -> its transactions, in date order with the
+                    undated period last
+        """
+        grouped = {}
+        for ordinal in sorted(self._days, key=lambda day: (not day, day)):
+            key = period_key(ordinal, period, anchor)
+            if key not in grouped:
+                grouped[key] = MonthAccumulator(
+                    self._rules, self._defined_merchants,
+                    keep_transaction_rewards=False
+                )
+            grouped[key].merge(self._days[ordinal])
+        return grouped
+
+    def solve(
+        self,
+        period: Union[str, int] = PERIOD_MONTH,
+        anchor: int = 1,
+        expand_rules_used: bool = False,
+        workers: Optional[int] = None,
+        explain: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Max reward of every period
+
+        Args:
+            period -- PERIOD_MONTH or a window length in days
+            anchor -- ordinal of a day starting a window
+            expand_rules_used -- return flat rules_used lists
+            workers -- worker processes once there are at least
+                       PARALLEL_MIN_PERIODS periods (1 never spawns any)
+            explain -- include each period's rules_used
+
+        Returns:
+            list -- {"period", "transaction_count", "max_reward",
+                     "rules_used"} per period, in date order (no
+                     rules_used without explain)
+        """
+        grouped = self.periods(period, anchor)
+        results = solve_periods(
+            [
+                (accumulator.parsed_transactions,
+                 accumulator.total_transaction_amount)
+                for accumulator in grouped.values()
+            ],
+            self._rules, self._defined_merchants, expand_rules_used, workers
+        )
+        breakdown = []
+        for (key, accumulator), (max_reward, rules_used) in zip(
+            grouped.items(), results
+        ):
+            period_rewards = {
+                "period": key,
+                "transaction_count": accumulator.transaction_count,
+                "max_reward": max_reward
+            }
+            if explain:
+                period_rewards["rules_used"] = rules_used
+            breakdown.append(period_rewards)
+        return breakdown
+
+
+def solve_periods(
+    periods: List[Tuple[Dict[str, int], int]],
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    expand_rules_used: bool = False,
+    workers: Optional[int] = None
+) -> List[Tuple[int, List[Any]]]:
+    """
+    Solves independent months, over a process pool when there are many
+
+    Args:
+        periods -- (parsed_transactions, total_transaction_amount) pairs
+        rules -- a list of rules (see DEFAULT_RULES for format)
+        defined_merchants -- set of known merchant codes
+        expand_rules_used -- return flat rules_used lists
+        workers -- number of worker processes (defaults to cpu count)
+
+    Returns:
+        list -- (max_reward, rules_used) per period, in input order
+    """
+    if workers == 1 or len(periods) < PARALLEL_MIN_PERIODS:
+        plan = compile_rules(rules, defined_merchants)
+        return [
+            RewardPointsCalculator._month_rewards(
+                plan, parsed, total, expand_rules_used
+            )
+            for parsed, total in periods
+        ]
+
+    return pool_map(
+        _solve_period,
+        periods,
+        [expand_rules_used] * len(periods),
+        workers=workers,
+        state=(rules, defined_merchants),
+        chunksize=DEFAULT_CHUNK_SIZE
+    )
+
+
+def _solve_period(
+    period: Tuple[Dict[str, int], int],
+    expand_rules_used: bool
+) -> Tuple[int, List[Any]]:
+    """Solves one period (runs in a worker, the plan is compiled once)"""
+    parsed, total = period
+    return RewardPointsCalculator._month_rewards(
+        compile_rules(*worker_state()), parsed, total, expand_rules_used
+    )
@@ -0,0 +1,435 @@
+"""
+Exact reference month solver and a verifier for the fast solver
+
+reference_month_reward solves a month as the integer program
+
+    maximize    sum(points[r] * x[r])
+    subject to  sum(req[r][m] * x[r]) <= spend[m]   for each merchant m
+                sum(cost[r] * x[r]) <= total spend
+                x[r] >= 0 and integer
+
+over every rule of the rule set, by best first branch and bound on
+exact rational LP relaxations. The program is built straight from the
+rules: nothing is pruned, no LP bulk or count cap is applied and the
+catch-all rules are plain columns, so it shares none of _solve_month's
+shortcuts. The LP bounds do not loosen with the size of the spend, so
+large months stay tractable.
+
+The LP relaxations are solved by the calculator's _lp_relaxation, the
+one copy of the exact simplex. The search itself is the reference's
+own: best first on the LP bound and branching on the first fractional
+count, where the calculator's _branch_and_bound goes depth first from
+the regions its LP bulk cut off. The simplex is in turn checked by the
+brute force oracle on small months (benchmarks/oracle.py).
+
+verify_month_solver cross-checks the calculator's fast month solver
+against it on random months (and random rule sets from the command line):
+    python -m rewardPointsCalculator.reference_solver --trials 500
+"""
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+from fractions import Fraction
+from functools import reduce
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, OTHER_MERCHANT,
+    RewardPointsCalculator, _lp_relaxation, compile_rules
+)
+
+DEFAULT_TRIALS = 500
+# largest per merchant spend of a random month, in cents
+DEFAULT_MAX_SPEND_CENTS = 10 ** 7
+
+
+class Mismatch(NamedTuple):
+    """A month on which the fast solver is not provably maximal"""
+    parsed_transactions: Dict[str, int]
+    fast_reward: int
+    reference_reward: int
+    reason: str
+
+
+def reference_month_reward(
+    parsed_transactions: Dict[str, int],
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+) -> Tuple[int, Dict[int, int]]:
+    """
+    Exact max reward for a month
+
+    Args:
+        parsed_transactions -- {merchant: cents} totals, unknown
+                               merchants already under 'other'
+        rules -- a list of rules (see DEFAULT_RULES for format)
+        defined_merchants -- set of known merchant codes
+
+    Returns:
+        tuple -- (max_reward, {rule_num: times used} of an optimal
+                  solution, unused rules left out)
+    """
+    rule_nums, points, matrix, unit = _integer_program(
+        rules, defined_merchants
+    )
+    specific = _specific_merchants(defined_merchants)
+    capacities = [
+        parsed_transactions.get(merchant, 0) // unit for merchant in specific
+    ] + [sum(parsed_transactions.values()) // unit]
+
+    best_value = 0
+    best_counts = [0] * len(points)
+    # best first over (-LP bound, tie breaker, lower bounds, upper bounds,
+    #  LP solution) of the counts
+    heap = []
+    sequence = 0
+
+    def push(lower: List[int], upper: List[Optional[int]]) -> None:
+        nonlocal sequence
+        relaxation = _bounded_lp(points, matrix, capacities, lower, upper)
+        # points are integers, so no integer solution below beats floor
+        if relaxation is not None \
+           and math.floor(relaxation[0]) > best_value:
+            sequence += 1
+            heapq.heappush(
+                heap, (-relaxation[0], sequence, lower, upper, relaxation[1])
+            )
+
+    push([0] * len(points), [None] * len(points))
+    while heap:
+        value, _, lower, upper, solution = heapq.heappop(heap)
+        value = -value
+        # every open region is bounded by this one's LP
+        if math.floor(value) <= best_value:
+            break
+
+        rounded = _round_down_and_fill(points, matrix, capacities, solution)
+        rounded_value = sum(p * count for p, count in zip(points, rounded))
+        if rounded_value > best_value:
+            best_value, best_counts = rounded_value, rounded
+            if math.floor(value) <= best_value:
+                continue
+
+        index = next(
+            (
+                index for index, count in enumerate(solution)
+                if count.denominator != 1
+            ),
+            None
+        )
+        if index is None:
+            best_value = int(value)
+            best_counts = [int(count) for count in solution]
+            continue
+
+        floor = math.floor(solution[index])
+        down_upper = list(upper)
+        down_upper[index] = floor
+        up_lower = list(lower)
+        up_lower[index] = floor + 1
+        push(lower, down_upper)
+        push(up_lower, upper)
+
+    return best_value, {
+        rule_num: count
+        for rule_num, count in zip(rule_nums, best_counts) if count
+    }
+
+
+def _specific_merchants(defined_merchants: Set[str]) -> List[str]:
+    return sorted(
+        merchant for merchant in defined_merchants
+        if merchant != OTHER_MERCHANT
+    )
+
+
+def _integer_program(
+    rules: List[Dict[str, Any]],
+    defined_merchants: Set[str]
+) -> Tuple[List[int], List[int], List[List[int]], int]:
+    """
+    Builds the constraint matrix straight from the rules
+
+    Returns:
+        tuple -- (rule_nums, points, matrix, unit_cents); matrix has a
+                 row per specific merchant then the total spend row, a
+                 column per applicable rule, in units of unit_cents
+    """
+    specific = _specific_merchants(defined_merchants)
+    rule_nums = []
+    points = []
+    columns = []
+    for rule_num, rule in enumerate(rules, start=1):
+        reqs = {}
+        for merchant, amount in rule["Reqs"]:
+            reqs[merchant] = reqs.get(merchant, 0) + round(amount * 100)
+        cost = sum(reqs.values())
+        if cost <= 0 or any(
+            merchant != OTHER_MERCHANT and merchant not in specific
+            for merchant in reqs
+        ):
+            # never applicable (undefined merchants end up in 'other')
+            continue
+        rule_nums.append(rule_num)
+        points.append(rule["Points"])
+        columns.append(
+            [reqs.get(merchant, 0) for merchant in specific] + [cost]
+        )
+
+    unit = reduce(
+        math.gcd, (amount for column in columns for amount in column), 0
+    ) or 100
+    matrix = [
+        [column[row] // unit for column in columns]
+        for row in range(len(specific) + 1)
+    ]
+    return rule_nums, points, matrix, unit
+
+
+def _round_down_and_fill(
+    points: List[int],
+    matrix: List[List[int]],
+    capacities: List[int],
+    solution: List[Fraction]
+) -> List[int]:
+    """
+    Feasible integer counts near an LP solution: rounded down, then
+    greedily topped up by points per unit of total spend
+    """
+    counts = [math.floor(count) for count in solution]
+    slack = [
+        capacity - sum(a * count for a, count in zip(row, counts))
+        for row, capacity in zip(matrix, capacities)
+    ]
+    order = sorted(
+        range(len(points)),
+        key=lambda index: -points[index] / matrix[-1][index]
+    )
+    for index in order:
+        if points[index] <= 0:
+            continue
+        extra = min(
+            slack[row] // matrix[row][index]
+            for row in range(len(matrix)) if matrix[row][index]
+        )
+        if extra > 0:
+            counts[index] += extra
+            for row in range(len(matrix)):
+                slack[row] -= extra * matrix[row][index]
+    return counts
+
+
+def _bounded_lp(
+    points: List[int],
+    matrix: List[List[int]],
+    capacities: List[int],
+    lower: List[int],
+    upper: List[Optional[int]]
+) -> Optional[Tuple[Fraction, List[Fraction]]]:
+    """
+    Exact LP relaxation with lower <= x <= upper (None for no upper
+    bound)
+
+    Returns:
+        tuple -- (optimal value, optimal x), None when infeasible
+    """
+    # x = lower + y; the matrix is non negative so y = 0 is feasible
+    #  exactly when lower itself is
+    rows = []
+    bounds = []
+    for row, capacity in zip(matrix, capacities):
+        slack = capacity - sum(a * low for a, low in zip(row, lower))
+        if slack < 0:
+            return None
+        rows.append(row)
+        bounds.append(slack)
+    for index, (low, high) in enumerate(zip(lower, upper)):
+        if high is not None:
+            if high < low:
+                return None
+            rows.append(
+                [int(column == index) for column in range(len(points))]
+            )
+            bounds.append(high - low)
+
+    shift = _lp_relaxation(
+        [Fraction(p) for p in points],
+        [tuple(row[column] for row in rows) for column in range(len(points))],
+        tuple(bounds)
+    )
+    return (
+        sum(p * x for p, x in zip(points, shift))
+        + sum(p * low for p, low in zip(points, lower)),
+        [low + y for low, y in zip(lower, shift)]
+    )
+
+
+def check_month(
+    parsed_transactions: Dict[str, int],
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+) -> Optional[Mismatch]:
+    """
+    Cross-checks the fast solver on one month: its reward must equal the
+    reference optimum and its bundle rules must fit the spend
+
+    Returns:
+        Mismatch -- or None when the fast solver is maximal
+    """
+    plan = compile_rules(rules, defined_merchants)
+    total = sum(parsed_transactions.values())
+    fast_reward, rules_used = RewardPointsCalculator._month_rewards(
+        plan, parsed_transactions, total
+    )
+    reference_reward, _ = reference_month_reward(
+        parsed_transactions, rules, defined_merchants
+    )
+
+    if fast_reward != reference_reward:
+        return Mismatch(
+            parsed_transactions, fast_reward, reference_reward,
+            "reward differs from the reference optimum"
+        )
+
+    # the reported rule counts, catch-all rules included, must be a
+    #  feasible solution
+    remaining = dict(parsed_transactions)
+    pool = total
+    for rule_num, count in rules_used:
+        for merchant, amount in plan.rules[rule_num - 1][1]:
+            pool -= count * amount
+            if merchant != OTHER_MERCHANT:
+                remaining[merchant] = \
+                    remaining.get(merchant, 0) - count * amount
+    if pool < 0 or any(amount < 0 for amount in remaining.values()):
+        return Mismatch(
+            parsed_transactions, fast_reward, reference_reward,
+            "rules_used %r does not fit the spend" % (rules_used,)
+        )
+    return None
+
+
+def random_month(
+    rng: random.Random,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    max_spend_cents: int = DEFAULT_MAX_SPEND_CENTS
+) -> Dict[str, int]:
+    """
+    Random {merchant: cents} totals, with spend scales spread evenly on
+    a log scale up to max_spend_cents and some merchants left at 0
+    """
+    scale = int(10 ** rng.uniform(2, math.log10(max(max_spend_cents, 100))))
+    return {
+        merchant: 0 if rng.random() < 0.2 else rng.randint(0, scale)
+        for merchant in sorted(defined_merchants)
+    }
+
+
+def random_rule_set(
+    rng: random.Random,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+) -> List[Dict[str, Any]]:
+    """Random rule set (DEFAULT_RULES format) over the defined merchants"""
+    specific = _specific_merchants(defined_merchants)
+    rules = []
+    for _ in range(rng.randint(2, 7)):
+        merchants = rng.sample(specific, rng.randint(1, min(3, len(specific))))
+        reqs = [
+            (merchant, rng.choice([5, 10, 20, 25, 40, 75]))
+            for merchant in merchants
+        ]
+        if rng.random() < 0.2:
+            reqs.append((OTHER_MERCHANT, rng.choice([5, 10, 25])))
+        rules.append({"Points": rng.randint(1, 600), "Reqs": reqs})
+    if rng.random() < 0.8:
+        rules.append({
+            "Points": rng.randint(1, 3),
+            "Reqs": [(OTHER_MERCHANT, rng.choice([1, 2, 5]))]
+        })
+    return rules
+
+
+def verify_month_solver(
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    trials: int = DEFAULT_TRIALS,
+    max_spend_cents: int = DEFAULT_MAX_SPEND_CENTS,
+    seed: int = 0
+) -> List[Mismatch]:
+    """
+    Cross-checks the fast solver against the reference on random months
+
+    Args:
+        rules -- a list of rules (see DEFAULT_RULES for format)
+        defined_merchants -- set of known merchant codes
+        trials -- number of random months
+        max_spend_cents -- largest per merchant spend of a month
+        seed -- random seed
+
+    Returns:
+        list -- every Mismatch found (empty when the solver held up)
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(trials):
+        mismatch = check_month(
+            random_month(rng, defined_merchants, max_spend_cents),
+            rules, defined_merchants
+        )
+        if mismatch is not None:
+            mismatches.append(mismatch)
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Verify the fast month solver against the exact reference"
+    )
+    parser.add_argument(
+        "--rules", help="JSON file with a rule set (DEFAULT_RULES format)"
+    )
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument(
+        "--max-spend-cents", type=int, default=DEFAULT_MAX_SPEND_CENTS
+    )
+    parser.add_argument(
+        "--random-rule-sets", type=int, default=0,
+        help="also verify this many random rule sets"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rule_sets = [DEFAULT_RULES]
+    if args.rules:
+        with open(args.rules) as rules_file:
+            rule_sets = [json.load(rules_file)]
+    rng = random.Random(args.seed)
+    rule_sets += [random_rule_set(rng) for _ in range(args.random_rule_sets)]
+
+    failed = False
+    for index, rules in enumerate(rule_sets):
+        mismatches = verify_month_solver(
+            rules, trials=args.trials,
+            max_spend_cents=args.max_spend_cents, seed=args.seed + index
+        )
+        print("rule set {}: {}/{} months maximal".format(
+            index, args.trials - len(mismatches), args.trials
+        ))
+        for mismatch in mismatches[:5]:
+            failed = True
+            print("  {}: fast {} reference {} for {}".format(
+                mismatch.reason, mismatch.fast_reward,
+                mismatch.reference_reward,
+                json.dumps(mismatch.parsed_transactions)
+            ))
+        if mismatches:
+            print("  rules: {}".format(json.dumps(rules)))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
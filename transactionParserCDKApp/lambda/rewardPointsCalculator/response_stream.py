@@ -0,0 +1,260 @@
+"""
+Constant memory scoring output for very large statements
+
+Transactions are scored a chunk of rows at a time as they are read and
+written out straight away, while only the month's per merchant totals
+are kept, so memory does not grow with the number of transactions:
+    stream = RewardStream()
+    with open("rewards.json", "wb") as output:
+        for chunk in stream.iter_json(transactions):
+            output.write(chunk)
+
+iter_json writes the Lambda response body ({"max_reward_per_transaction":
+[...], "rewards_for_month": {...}}); iter_ndjson writes one line per
+transaction ({"transaction_id", "points", "rules_used"}) followed by a
+{"rewards_for_month": {...}} line. The columnar response format needs
+every row's points before any rules, so it is not streamed
+
+Merchant codes go through a merchant registry as in the Lambda (main
+loads the one named by MERCHANT_REGISTRY_PATH), so the JSON output is
+the Lambda's response body with one exception: the Lambda keeps a
+single row per repeated transaction ID, with the fields of its last
+occurrence. Rows already written cannot be taken back and remembering
+every ID would grow with the statement, so here each occurrence is
+scored as a row of its own
+
+Usage:
+    python -m rewardPointsCalculator.response_stream INPUT OUTPUT
+        [--input-format json|ndjson|columns] [--format json|ndjson]
+        [--no-explain] [--expand-rules-used] [--chunk-rows N]
+"""
+import argparse
+import itertools
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .json_codec import get_codec
+from .merchant_registry import MerchantRegistry, registry_from_environment
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, MappedTransactionColumns,
+    MonthAccumulator, RewardPointsCalculator, TransactionColumns,
+    compile_rules
+)
+from .transaction_reader import (
+    iter_json_transactions, iter_ndjson_transactions
+)
+
+# rows scored and written per chunk; bounds the memory of the output
+STREAM_CHUNK_ROWS = 1 << 14
+
+
+class RewardStream:
+    """
+    Scores a stream of (transaction_id, transaction) pairs chunk by
+    chunk (vectorized when a chunk is large enough) into encoded output
+    """
+
+    def __init__(
+        self,
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+        explain: bool = True,
+        expand_rules_used: bool = False,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+        codec: Any = None,
+        registry: Optional[MerchantRegistry] = None
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            rules -- a list of rules (see DEFAULT_RULES for format)
+            defined_merchants -- set of known merchant codes
+            explain -- include rules_used (False writes points only)
+            expand_rules_used -- legacy flat month rules_used list
+            chunk_rows -- rows scored and written at a time
+            codec -- JSON codec (see json_codec.get_codec)
+            registry -- maps merchant codes to canonical ones (optional)
+        """
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        self._plan = compile_rules(rules, defined_merchants)
+        self._month = MonthAccumulator(
+            rules, defined_merchants, keep_transaction_rewards=False
+        )
+        self._explain = explain
+        self._expand_rules_used = expand_rules_used
+        self._chunk_rows = chunk_rows
+        self._codec = codec or get_codec()
+        self._canonical = registry.canonical if registry else None
+
+    def iter_chunks(
+        self,
+        transactions: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> Iterator[Tuple[List[str], List[Any]]]:
+        """
+        Scores the transactions, adding them to the month as they go
+
+        Returns:
+            iterator of (transaction ids, rewards) per chunk, rewards in
+            the maximum_reward_per_transaction format (points only
+            without explain)
+        """
+        transactions = iter(transactions)
+        canonical = self._canonical
+        while True:
+            columns = TransactionColumns()
+            for transaction_id, transaction in itertools.islice(
+                transactions, self._chunk_rows
+            ):
+                if canonical is not None:
+                    transaction = dict(
+                        transaction,
+                        merchant_code=canonical(transaction["merchant_code"])
+                    )
+                columns.append(transaction_id, transaction)
+                self._month.add(transaction)
+            if not len(columns):
+                return
+            yield columns.transaction_ids, \
+                RewardPointsCalculator._score_columns(
+                    self._plan, columns, points_only=not self._explain
+                )
+
+    def rewards_for_month(self) -> Dict[str, Any]:
+        """rewards_for_month of the transactions streamed so far"""
+        if not self._explain:
+            return {"max_reward": self._month.total_reward_for_month()}
+        max_reward, rules_used = self._month.maximum_reward_for_month(
+            self._expand_rules_used
+        )
+        return {"max_reward": max_reward, "rules_used": rules_used}
+
+    def iter_json(
+        self,
+        transactions: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> Iterator[bytes]:
+        """
+        Yields the response body (same JSON as the Lambda's) in pieces
+        """
+        yield b'{"max_reward_per_transaction":['
+        separator = b""
+        for _, rewards in self.iter_chunks(transactions):
+            # the chunk's list without its brackets
+            yield separator + self._codec.dumps(rewards)[1:-1]
+            separator = b","
+        yield b'],"rewards_for_month":'
+        yield self._codec.dumps(self.rewards_for_month())
+        yield b"}"
+
+    def iter_ndjson(
+        self,
+        transactions: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> Iterator[bytes]:
+        """Yields one NDJSON line per transaction, then the month line"""
+        dumps = self._codec.dumps
+        for transaction_ids, rewards in self.iter_chunks(transactions):
+            if self._explain:
+                lines = [
+                    dumps({
+                        "transaction_id": transaction_id,
+                        "points": points,
+                        "rules_used": rules_used["rules_used"]
+                    })
+                    for transaction_id, (points, rules_used)
+                    in zip(transaction_ids, rewards)
+                ]
+            else:
+                lines = [
+                    dumps({
+                        "transaction_id": transaction_id, "points": points
+                    })
+                    for transaction_id, points
+                    in zip(transaction_ids, rewards)
+                ]
+            lines.append(b"")
+            yield b"\n".join(lines)
+        yield dumps({"rewards_for_month": self.rewards_for_month()}) + b"\n"
+
+
+def iter_column_transactions(
+    columns: TransactionColumns
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    (transaction_id, transaction) pairs of a column store (eg. a memory
+    mapped transaction file), one row at a time
+    """
+    merchants = columns.merchants
+    for transaction_id, index, amount in zip(
+        columns.transaction_ids, columns.merchant_index, columns.amount_cents
+    ):
+        yield transaction_id, {
+            "merchant_code": merchants[index], "amount_cents": amount
+        }
+
+
+def _iter_ndjson_input(stream: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """NDJSON transactions keyed by "transaction_id" (else line order)"""
+    for row, transaction in enumerate(iter_ndjson_transactions(stream)):
+        yield str(transaction.get("transaction_id", row)), transaction
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Score a large statement with constant memory output"
+    )
+    parser.add_argument("input", help="statement to score ('-' for stdin)")
+    parser.add_argument("output", help="file to write ('-' for stdout)")
+    parser.add_argument(
+        "--input-format", choices=("json", "ndjson", "columns"),
+        default="json",
+        help="request body JSON, NDJSON transactions or a transaction file"
+    )
+    parser.add_argument(
+        "--format", choices=("json", "ndjson"), default="json"
+    )
+    parser.add_argument(
+        "--no-explain", action="store_true", help="points without rules_used"
+    )
+    parser.add_argument("--expand-rules-used", action="store_true")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    registry_file = registry_from_environment()
+    stream = RewardStream(
+        explain=not args.no_explain,
+        expand_rules_used=args.expand_rules_used,
+        chunk_rows=args.chunk_rows,
+        registry=registry_file.registry() if registry_file else None
+    )
+    source = None
+    if args.input_format == "columns":
+        transactions = iter_column_transactions(
+            MappedTransactionColumns(args.input)
+        )
+    else:
+        source = sys.stdin if args.input == "-" else open(args.input)
+        if args.input_format == "ndjson":
+            transactions = _iter_ndjson_input(source)
+        else:
+            transactions = iter_json_transactions(source)
+
+    output = (
+        sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    )
+    try:
+        chunks = (
+            stream.iter_json(transactions) if args.format == "json"
+            else stream.iter_ndjson(transactions)
+        )
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        if source is not None and source is not sys.stdin:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,22 @@
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter, OrderedDict
+from datetime import date
 from enum import Enum
-from typing import Any, Dict, List, Set, Tuple
+from fractions import Fraction
+from functools import lru_cache, reduce
+from time import perf_counter
+from typing import (
+    Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set,
+    Tuple, Union
+)
 
 
 class MerchantCode(Enum):
@@ -9,6 +26,10 @@ class MerchantCode(Enum):
     OTHER = "other"
 
 
+# Enum attribute lookups are slow in hot paths, use this instead of
+#  MerchantCode.OTHER.value there
+OTHER_MERCHANT = MerchantCode.OTHER.value
+
 # Defined merchants must include a value for OTHER
 DEFAULT_DEFINED_MERCHANTS = {
     MerchantCode.SPORTCHECK.value,
@@ -90,307 +111,2800 @@ DEFAULT_RULES = [
 ]
 
 
-class RewardPointsCalculator:
-    def __init__(
-        self, 
-        transactions: Dict[str, Dict[str, Any]],
-        rules: List[Dict[str, Any]] = DEFAULT_RULES,
-        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
-    ) -> None:
-        """Constructor"""
-        self._raw_transactions = transactions
-        self._rules = rules
-        self._defined_merchants = defined_merchants
-        self._total_transaction_amount = 0
+# The month solver searches every rule multiset exactly as long as the
+#  number of (rule, count) combinations stays below this bound; bigger
+#  months are first reduced by applying the bulk of the LP optimum
+MAX_EXACT_SEARCH_STATES = 5000
+# Number of applications of each rule held back from the LP bulk so
+#  that the exact search can still trade bundles against each other;
+#  a result short of the LP bound is then proven by branch and bound
+LP_BULK_MARGIN = 8
+# maximum_reward_per_transaction switches to the NumPy batched path
+#  (when NumPy is installed) from this many transactions on
+VECTORIZE_MIN_TRANSACTIONS = 1000
+# Number of compiled rule plans kept per process (warm Lambda containers
+#  reuse them across invocations)
+RULE_PLAN_CACHE_SIZE = 32
+# Number of (rule set, merchant, amount) per transaction results kept per
+#  process, 0 disables the cache
+TRANSACTION_REWARD_CACHE_SIZE = 65536
+# First bytes of a transaction file (see write_transaction_file)
+TRANSACTION_FILE_MAGIC = b"RPCOLS01"
+# Rows scored per NumPy pass by the top-K and threshold queries, which
+#  bounds their memory
+QUERY_CHUNK_ROWS = 1 << 16
+# Number of recent month solutions an IncrementalMonth keeps, so edits
+#  that are undone (eg. a refund of a late posting) are not re-solved
+INCREMENTAL_SOLUTION_CACHE_SIZE = 64
+# First bytes of a reward table file (see RewardTable.save)
+REWARD_TABLE_MAGIC = b"RPTABL01"
+# Default spend per merchant a RewardTable covers, in cents; months
+#  spending more at any merchant go to the month solver
+DEFAULT_REWARD_TABLE_SPEND_CENTS = 50000
 
-        # sets self._parsed_transactions attr
-        # and updates self._total_transaction_amount
-        self.parse_transactions()
+# Instrumentation: every hook is called as hook(event, seconds, fields)
+#  after each timed operation (parse_transactions, the solvers, JSON
+#  encode/decode in the handler); nothing is timed while there are none
+INSTRUMENTATION_HOOKS = []
+# Running totals for the process (transactions_parsed,
+#  transactions_scored, month_solves, solver_states, lp_relaxations,
+#  table_lookups)
+COUNTERS = Counter()
 
-    def parse_transactions(self) -> None:
-        """
-        Parses raw transactions by summing values with same
-        merchant_code and putting unknown merchants into 'other'
 
-        sets self._parsed_transactions attribute
-        """
-        # init all merchants to 0
-        transactions = {
-            merchant_code: 0.0 for merchant_code in self._defined_merchants
-        }
+def add_hook(hook: Callable[[str, float, Dict[str, Any]], None]) -> None:
+    """Registers an instrumentation hook (see INSTRUMENTATION_HOOKS)"""
+    INSTRUMENTATION_HOOKS.append(hook)
 
-        for transaction in list(self._raw_transactions.values()):
-            merchant = transaction["merchant_code"]
-            if merchant not in self._defined_merchants:
-                merchant = MerchantCode.OTHER.value
-            # immediately conver to dollar
-            amount = transaction["amount_cents"] / 100
-            
-            self._total_transaction_amount += amount
-            transactions[merchant] += amount
 
-        self._parsed_transactions = transactions
+def remove_hook(hook: Callable[[str, float, Dict[str, Any]], None]) -> None:
+    """Unregisters an instrumentation hook"""
+    INSTRUMENTATION_HOOKS.remove(hook)
 
 
-    def maximum_reward_per_transaction(
-        self
-    )-> List[Tuple[int, Dict[str, List[int]]]]:
-        """
-        Compute max reward points per transaction based on
-        self._raw_transactions
+class Timer:
+    """
+    Context manager timing a block for the instrumentation hooks; fields
+    set on it inside the block are passed along:
+        with Timer("month_solve", merchants=3) as timer:
+            ...
+            timer.fields["states"] = 42
+    """
+    __slots__ = ("event", "fields", "_start")
 
-        Returns:
-            list of tuples -- (
-                    max_reward_for_transaction, 
-                    {"rules_used": [rules_used]}
-                )
-                index of each tuple denotes the transaction number
-        """
-        rewards = []
-        for transaction in list(self._raw_transactions.values()):
-            # add transaction for transsaction["merchant_code"]
-            #  and a 0$ transaction for 'other' in case Rule 7 required
-            parsed_transaction = {
-                transaction[
-                    "merchant_code"
-                ]: transaction["amount_cents"] / 100,
-                MerchantCode.OTHER.value: 0
-            }
+    def __init__(self, event: str, **fields: Any) -> None:
+        self.event = event
+        self.fields = fields
+        self._start = None
 
-            # check if need to merge to 'other' for Rule 7
-            if self._must_merge_to_other(parsed_transaction):
-                rule_7_reward = self._merge_to_other(parsed_transaction)
-                rewards.append((rule_7_reward, {"rules_used": [7]}))
-                continue
+    def __enter__(self) -> "Timer":
+        if INSTRUMENTATION_HOOKS:
+            self._start = perf_counter()
+        return self
 
-            # iterate over all rules from highest reward to lowest
-            #  break when an applicable rule is reached
-            for rule_num, rule in enumerate(self._rules):
-                reqs = rule["Reqs"]
-                num_times_applicable = self._rule_applicable(
-                    parsed_transaction, reqs
-                )   
-                if num_times_applicable:
-                    # rules are 0 indexed
-                    rewards.append((
-                        rule["Points"] * num_times_applicable,
-                        # use rule number num_times_applicable times
-                        {"rules_used": [rule_num + 1] * num_times_applicable}
-                    ))
-                    break
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._start is not None:
+            seconds = perf_counter() - self._start
+            for hook in INSTRUMENTATION_HOOKS:
+                hook(self.event, seconds, self.fields)
 
-        print("Rewards: ", rewards)
 
-        return rewards
+"""
+Compiled rule formats (in units of RulePlan.unit_cents, see compile_rules):
+    bundle rule -- (rule_num, points, (req per specific merchant..., cost))
+        where cost is the total of all of the rule's requirements and
+        is paid from the pooled transaction total
+    catch-all rule -- (rule_num, points, cost)
+        a rule whose only requirement is OTHER, applied to the left over
+        amount once all bundle rules have been applied
+"""
 
-    def maximum_reward_for_month(self) -> Tuple[int, List[int]]:
-        """
-        Compute maximum reward for month based on self._parsed_transactions
 
-        * This current algo is only applicable to the DEFAULT_RULES
-           above (given in assesment), but this method can be updated
-           to return max reward points for different sets of rules
+class RulePlan(NamedTuple):
+    """Immutable compiled form of a rule set (see compile_rules)"""
+    fingerprint: str
+    # (points, ((merchant, amount_cents), ...)) for every rule in rule order
+    rules: Tuple[Tuple[int, Tuple[Tuple[str, int], ...]], ...]
+    # gcd of all requirements in cents; month amounts are floored to
+    #  this unit, which is exact since every requirement is a multiple
+    unit_cents: int
+    # merchants other than OTHER, in requirement vector order
+    specific_merchants: Tuple[str, ...]
+    # reqs of every rule needing a merchant other than OTHER (a single
+    #  transaction falls back to the catch-all rules when none applies)
+    specific_reqs: Tuple[Tuple[Tuple[str, int], ...], ...]
+    # bundle rules left after dominance pruning
+    bundle_rules: Tuple[Tuple[int, int, Tuple[int, ...]], ...]
+    # rule nums of the bundle rules that never beat a cheaper combination
+    pruned_rules: Tuple[int, ...]
+    catch_all_rules: Tuple[Tuple[int, int, int], ...]
+    # catch_all_best[amount] -- best catch-all reward for a left over amount
+    #  catch_all_choice[amount] -- index of the last catch-all rule used
+    #  (-1 for none); amounts past the table are reduced by the best
+    #  ratio rule catch_all_rules[catch_all_best_rule]
+    catch_all_best: Tuple[int, ...]
+    catch_all_choice: Tuple[int, ...]
+    catch_all_best_rule: int
+    # saturating[i] -- every extra application of bundle_rules[i] earns
+    #  more than its cost could ever add through the catch-all rules, so
+    #  with no bundle rules left to compete it is applied by division
+    saturating: Tuple[bool, ...]
+    # count_caps[i] -- bundle_rules[i] earns no more per unit than the
+    #  best catch-all rule, so an optimal month applies it fewer times
+    #  than that rule's cost (None for rules earning more)
+    count_caps: Tuple[Optional[int], ...]
 
-        Returns:
-            tuple -- (max_reward: int, rules_used: List[int])
-        """
-
-        # Will use the following order logic (for DEFAULT_RULES):
-        #  1. Rule 1 
-        #  2. 2xRule 4 
-        #  3. Rule 2
-        #  4. Rule 4 + 2xRule 6
-        #  5. 3xRule 6
-        #  6. Rule 4
-        #  7. Rule 6
-        #  8. Rule 7
-        #  Rule 5 should never be used since Rule 6 + Rule 7 can be used
-        #   to produce bigger reward instead
-        #  Rule 3 should never be used since 3 x Rule 6 can
-        #   produce bigger reward
-        total_remainig = self._total_transaction_amount
-        transactions = self._parsed_transactions.copy()
-        rules_used = []
-        reward = 0
-
-        while total_remainig >= 1:
-            # check if only Rule 7 is applicable
-            # if so, then add all remaining transaction amounts
-            #  into the 'other' category and apply Rule 7
-            if self._must_merge_to_other(transactions):
-                amount = self._merge_to_other(transactions)
-                total_remainig -= amount
-                reward += amount
-                rules_used.append(7) # will only append 7 once to keep it clean
-                break
-            
-            # Note that self._rules is 0 indexed
-
-            # Rule 1
-            if self._rule_applicable(transactions, self._rules[0]["Reqs"]):
-                reward += self._rules[0]["Points"]
-                rules_used = rules_used + [1]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[0]["Reqs"]
-                )
-                continue
-            # 2 x Rule 4
-            elif self._rule_applicable(transactions, self._rules[3]["Reqs"]) == 2:
-                reward += self._rules[3]["Points"] * 2
-                rules_used = rules_used + [4, 4]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[3]["Reqs"], 2
-                )
-                continue
-            # Rule 2
-            elif self._rule_applicable(transactions, self._rules[1]["Reqs"]):
-                reward += self._rules[1]["Points"]
-                rules_used = rules_used + [2]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[1]["Reqs"]
-                )
-                continue
-            # Rule 4 + 2 * Rule 6
-            elif self._rule_applicable(transactions, self._rules[3]["Reqs"]) \
-             and self._rule_applicable(transactions, self._rules[5]["Reqs"]) == 2:
-                reward += self._rules[3]["Points"] + self._rules[5]["Points"] * 2
-                rules_used = rules_used + [4, 6, 6]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[3]["Reqs"]
-                )
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[5]["Reqs"], 2
-                )
-            # 3 * Rule 6
-            elif self._rule_applicable(transactions, self._rules[5]["Reqs"]) == 3:
-                reward += self._rules[5]["Points"] * 3
-                rules_used = rules_used + [6, 6, 6]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[5]["Reqs"], 3
-                )
-            # Rule 4
-            elif self._rule_applicable(transactions, self._rules[3]["Reqs"]):
-                reward += self._rules[3]["Points"]
-                rules_used = rules_used + [4]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[3]["Reqs"]
-                )
+
+def compile_rules(
+    rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+) -> RulePlan:
+    """
+    Returns the compiled plan for a rule set, reusing a cached plan
+    when the same rule set has been compiled before in this process
+
+    Args:
+        rules -- a list of rules (see DEFAULT_RULES above for format)
+        defined_merchants -- set of known merchant codes
+
+    Returns:
+        RulePlan -- the compiled rule set
+    """
+    # requirements are scaled to integer cents once, here
+    frozen_rules = tuple(
+        (
+            rule["Points"],
+            tuple(
+                (merchant, round(amount * 100))
+                for merchant, amount in rule["Reqs"]
+            )
+        )
+        for rule in rules
+    )
+    return _compile_frozen_rules(frozen_rules, frozenset(defined_merchants))
+
+
+@lru_cache(maxsize=RULE_PLAN_CACHE_SIZE)
+def _compile_frozen_rules(
+    frozen_rules: Tuple[Tuple[int, Tuple[Tuple[str, int], ...]], ...],
+    defined_merchants: FrozenSet[str]
+) -> RulePlan:
+    """
+    Compiles a rule set (frozen into tuples so it can key the cache)
+
+    Args:
+        frozen_rules -- (points, reqs in cents) for every rule in rule order
+        defined_merchants -- set of known merchant codes
+
+    Returns:
+        RulePlan -- the compiled rule set
+    """
+    specific_merchants = tuple(sorted(
+        merchant for merchant in defined_merchants
+        if merchant != OTHER_MERCHANT
+    ))
+    fingerprint = hashlib.sha1(
+        repr((frozen_rules, specific_merchants)).encode()
+    ).hexdigest()
+    unit_cents = reduce(math.gcd, (
+        amount for _, reqs in frozen_rules for _, amount in reqs
+    ), 0) or 100
+
+    bundle_rules = []
+    catch_all_rules = []
+    for rule_num, (points, reqs) in enumerate(frozen_rules, start=1):
+        req_vector = [0] * len(specific_merchants)
+        cost = 0
+        applicable = bool(reqs)
+        for merchant, amount in reqs:
+            amount //= unit_cents
+            cost += amount
+            if merchant == OTHER_MERCHANT:
                 continue
-            # Rule 6
-            elif self._rule_applicable(transactions, self._rules[5]["Reqs"]):
-                reward += self._rules[5]["Points"]
-                rules_used = rules_used + [6]
-                total_remainig -= self._apply_rule(
-                    transactions, self._rules[5]["Reqs"]
-                )
+            if merchant not in specific_merchants:
+                # parse_transactions moves undefined merchants into
+                #  'other' so this rule can never be applied
+                applicable = False
+                break
+            req_vector[specific_merchants.index(merchant)] += amount
+
+        if not applicable or cost <= 0:
+            continue
+        if any(req_vector):
+            bundle_rules.append(
+                (rule_num, points, tuple(req_vector) + (cost,))
+            )
+        else:
+            catch_all_rules.append((rule_num, points, cost))
+
+    best, choice, best_rule = _catch_all_table(catch_all_rules)
+    plan = RulePlan(
+        fingerprint=fingerprint,
+        rules=frozen_rules,
+        unit_cents=unit_cents,
+        specific_merchants=specific_merchants,
+        specific_reqs=tuple(
+            reqs for _, reqs in frozen_rules
+            if any(merchant != OTHER_MERCHANT for merchant, _ in reqs)
+        ),
+        bundle_rules=tuple(bundle_rules),
+        pruned_rules=(),
+        catch_all_rules=tuple(catch_all_rules),
+        catch_all_best=best,
+        catch_all_choice=choice,
+        catch_all_best_rule=best_rule,
+        saturating=(),
+        count_caps=()
+    )
+
+    kept_rules = tuple(
+        rule for rule in bundle_rules
+        if not _rule_dominated(plan, rule)
+    )
+    return plan._replace(
+        bundle_rules=kept_rules,
+        pruned_rules=tuple(
+            rule[0] for rule in bundle_rules if rule not in kept_rules
+        ),
+        saturating=tuple(
+            points >= _max_catch_all_gain(plan, reqs[-1])
+            for _, points, reqs in kept_rules
+        ),
+        count_caps=tuple(
+            _count_cap(plan, points, reqs[-1])
+            for _, points, reqs in kept_rules
+        )
+    )
+
+
+def _catch_all_table(
+    catch_all_rules: List[Tuple[int, int, int]]
+) -> Tuple[Tuple[int, ...], Tuple[int, ...], int]:
+    """
+    Solves the catch-all rules (an unbounded knapsack in one dimension)
+    for every left over amount up to the point where it becomes periodic
+
+    Any optimal solution uses fewer than `cost of the best ratio rule`
+    applications of other rules (otherwise a subset of them could be
+    swapped for best ratio rules), so amounts above
+    best_cost * max_cost can always start with a best ratio rule
+
+    Args:
+        catch_all_rules -- catch-all rules (see formats above)
+
+    Returns:
+        tuple -- (best reward table, last rule choice table,
+                  index of the best ratio rule)
+    """
+    if not catch_all_rules:
+        return (0,), (-1,), -1
+
+    best_rule = max(
+        range(len(catch_all_rules)),
+        key=lambda index: Fraction(
+            catch_all_rules[index][1], catch_all_rules[index][2]
+        )
+    )
+    table_size = catch_all_rules[best_rule][2] \
+        * max(cost for _, _, cost in catch_all_rules) + 1
+
+    best = [0] * table_size
+    choice = [-1] * table_size
+    for amount in range(1, table_size):
+        best[amount] = best[amount - 1]
+        choice[amount] = choice[amount - 1]
+        for index, (_, points, cost) in enumerate(catch_all_rules):
+            if cost <= amount and best[amount - cost] + points > best[amount]:
+                best[amount] = best[amount - cost] + points
+                choice[amount] = index
+
+    return tuple(best), tuple(choice), best_rule
+
+
+def _solve_catch_all(
+    plan: RulePlan,
+    leftover: int
+) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Best reward from the catch-all rules for a left over amount
+
+    Args:
+        plan -- compiled rule set
+        leftover -- units (plan.unit_cents) left after applying bundle
+                    rules (a negative amount, eg. a refund, earns 0)
+
+    Returns:
+        tuple -- (reward, (rule_num, times_used) of the catch-all rules
+                  used, in rule order)
+    """
+    if not plan.catch_all_rules:
+        return 0, []
+
+    leftover = max(leftover, 0)
+    table_size = len(plan.catch_all_best)
+    used = Counter()
+    reward = 0
+    if leftover >= table_size:
+        _, best_points, best_cost = \
+            plan.catch_all_rules[plan.catch_all_best_rule]
+        bulk = (leftover - table_size) // best_cost + 1
+        leftover -= bulk * best_cost
+        reward += bulk * best_points
+        used[plan.catch_all_rules[plan.catch_all_best_rule][0]] += bulk
+
+    reward += plan.catch_all_best[leftover]
+    while plan.catch_all_choice[leftover] != -1:
+        rule_num, _, cost = \
+            plan.catch_all_rules[plan.catch_all_choice[leftover]]
+        used[rule_num] += 1
+        leftover -= cost
+
+    return reward, sorted(used.items())
+
+
+def _catch_all_points(plan: RulePlan, leftover: int) -> int:
+    """Reward part of _solve_catch_all (hot path of the month search)"""
+    if leftover < 0:
+        return 0
+    if leftover < len(plan.catch_all_best):
+        return plan.catch_all_best[leftover]
+    if not plan.catch_all_rules:
+        return 0
+    _, best_points, best_cost = plan.catch_all_rules[plan.catch_all_best_rule]
+    bulk = (leftover - len(plan.catch_all_best)) // best_cost + 1
+    return (
+        plan.catch_all_best[leftover - bulk * best_cost] + bulk * best_points
+    )
+
+
+def _max_catch_all_gain(plan: RulePlan, cost: int) -> int:
+    """
+    Most the catch-all reward can grow when `cost` more units are left
+    over; past the table the reward is periodic with the best ratio rule
+    so checking one period beyond it covers every amount
+    """
+    if not plan.catch_all_rules:
+        return 0
+    period = plan.catch_all_rules[plan.catch_all_best_rule][2]
+    return max(
+        _catch_all_points(plan, leftover + cost)
+        - _catch_all_points(plan, leftover)
+        for leftover in range(len(plan.catch_all_best) + period)
+    )
+
+
+def _count_cap(plan: RulePlan, points: int, cost: int) -> Optional[int]:
+    """
+    Most applications of a bundle rule an optimal month needs, if it
+    earns no more per unit than the best ratio catch-all rule: taking
+    away best_cost of them leaves cost x best_cost more units over,
+    which the superadditive catch-all reward turns into at least
+    cost x best_points >= best_cost x points
+
+    Args:
+        plan -- compiled rule set
+        points -- points of the bundle rule
+        cost -- its cost in units
+
+    Returns:
+        int -- the cap (best_cost - 1), None when the rule has none
+    """
+    if not plan.catch_all_rules:
+        return None
+    _, best_points, best_cost = plan.catch_all_rules[plan.catch_all_best_rule]
+    if points * best_cost > best_points * cost:
+        return None
+    return best_cost - 1
+
+
+def _rule_dominated(
+    plan: RulePlan,
+    rule: Tuple[int, int, Tuple[int, ...]]
+) -> bool:
+    """
+    Checks if a bundle rule never needs to be used because applying
+    another bundle rule k times (or none at all) on a subset of its
+    requirements, and giving the rest to the catch-all rules, earns at
+    least as much (e.g. 3 x Rule 6 + Rule 7 instead of Rule 3)
+
+    Replacing the rule this way keeps any solution feasible and, since
+    the catch-all reward is superadditive, never lowers its reward
+
+    Args:
+        plan -- compiled rule set (bundle_rules not yet pruned)
+        rule -- the bundle rule to check
+
+    Returns:
+        bool -- whether the rule can be dropped
+    """
+    rule_num, points, reqs = rule
+    if _solve_catch_all(plan, reqs[-1])[0] >= points:
+        return True
+
+    for other_num, other_points, other_reqs in plan.bundle_rules:
+        if other_num == rule_num:
+            continue
+        times = _times_applicable(reqs, other_reqs)
+        if not times:
+            continue
+        if other_reqs == reqs and other_points == points:
+            # identical rules, keep the first one
+            if other_num < rule_num:
+                return True
+            continue
+        for count in range(1, times + 1):
+            leftover = reqs[-1] - count * other_reqs[-1]
+            if count * other_points \
+               + _solve_catch_all(plan, leftover)[0] >= points:
+                return True
+
+    return False
+
+
+def _times_applicable(residual: Tuple[int, ...], reqs: Tuple[int, ...]) -> int:
+    """Number of times a requirement vector fits into a residual vector"""
+    return min(
+        amount // req for amount, req in zip(residual, reqs) if req > 0
+    )
+
+
+def _lp_relaxation(
+    profits: List[Fraction],
+    columns: List[Tuple[int, ...]],
+    capacities: Tuple[int, ...]
+) -> List[Fraction]:
+    """
+    Solves max(profits . x) subject to sum(x[j] * columns[j]) <= capacities
+    and x >= 0 exactly with a Fraction based simplex (Bland's rule)
+
+    Args:
+        profits -- objective coefficient for each variable
+        columns -- constraint coefficients for each variable
+        capacities -- non-negative right hand side for each constraint
+
+    Returns:
+        list -- optimal value of each variable
+    """
+    num_vars = len(profits)
+    num_rows = len(capacities)
+    # each row is [variables..., slacks..., right hand side]
+    tableau = [
+        [Fraction(column[row]) for column in columns]
+        + [Fraction(int(row == slack)) for slack in range(num_rows)]
+        + [Fraction(capacities[row])]
+        for row in range(num_rows)
+    ]
+    objective = [-profit for profit in profits] \
+        + [Fraction(0)] * (num_rows + 1)
+    basis = list(range(num_vars, num_vars + num_rows))
+
+    while True:
+        entering = next(
+            (col for col, cost in enumerate(objective[:-1]) if cost < 0), None
+        )
+        if entering is None:
+            break
+        # every rule consumes part of the pooled total so a leaving row
+        #  always exists
+        _, _, pivot = min(
+            (row[-1] / row[entering], basis[index], index)
+            for index, row in enumerate(tableau) if row[entering] > 0
+        )
+        pivot_row = tableau[pivot]
+        pivot_value = pivot_row[entering]
+        pivot_row[:] = [value / pivot_value for value in pivot_row]
+        for row in tableau + [objective]:
+            factor = row[entering]
+            if row is not pivot_row and factor:
+                row[:] = [
+                    value - factor * pivot
+                    for value, pivot in zip(row, pivot_row)
+                ]
+        basis[pivot] = entering
+
+    solution = [Fraction(0)] * num_vars
+    for index, var in enumerate(basis):
+        if var < num_vars:
+            solution[var] = tableau[index][-1]
+    return solution
+
+
+def _solve_month(
+    plan: RulePlan,
+    amounts: Tuple[int, ...]
+) -> Tuple[int, Tuple[int, ...], List[Tuple[int, int]]]:
+    """
+    Finds the best multiset of rules for a month (unbounded knapsack over
+    the per merchant amount vector)
+
+    Small months are solved by an exhaustive search over how many times
+    each rule is applied, memoized on (rule, residual merchant vector);
+    a saturating last rule is applied by division instead of searched
+    and a rule earning no more than the catch-all rate at most its
+    count cap (see _count_cap).
+    When that search would be too large, the bulk of the LP relaxation
+    optimum (minus LP_BULK_MARGIN applications per rule) is applied
+    first by division so the exact search only runs on a residual
+    vector bounded by the margin rather than the spend. The bulk
+    can cut off the optimum, so a result below the floor of the LP bound
+    is only kept once _branch_and_bound finds nothing better among the
+    solutions applying some rule fewer times than its bulk
+
+    Args:
+        plan -- compiled rule set
+        amounts -- whole units (plan.unit_cents) per specific merchant
+                   followed by the whole units of the pooled total
+
+    Returns:
+        tuple -- (max_reward, count per plan bundle rule,
+                  (rule_num, times_used) of the catch-all rules used)
+    """
+    bundle_rules = plan.bundle_rules
+    last = len(bundle_rules) - 1
+
+    bulk = [0] * len(bundle_rules)
+    bound = None
+    if _search_states(plan, amounts) > MAX_EXACT_SEARCH_STATES:
+        # value of a rule relative to leaving its cost to the catch-all
+        #  rules at their best rate
+        catch_all_rate = max(
+            (
+                Fraction(points, cost)
+                for _, points, cost in plan.catch_all_rules
+            ),
+            default=Fraction(0)
+        )
+        profits = [
+            points - catch_all_rate * reqs[-1]
+            for _, points, reqs in bundle_rules
+        ]
+        solution = _lp_relaxation(
+            profits, [reqs for _, _, reqs in bundle_rules], amounts
+        )
+        bulk = [max(int(count) - LP_BULK_MARGIN, 0) for count in solution]
+        # the LP optimum bounds every integer solution from above
+        bound = math.floor(catch_all_rate * amounts[-1] + sum(
+            profit * count for profit, count in zip(profits, solution)
+        ))
+        COUNTERS["lp_relaxations"] += 1
+
+    residual = list(amounts)
+    for count, (_, _, reqs) in zip(bulk, bundle_rules):
+        for dim, req in enumerate(reqs):
+            residual[dim] -= count * req
+    residual = tuple(residual)
+
+    memo = {}
+
+    def search(
+        index: int,
+        residual: Tuple[int, ...]
+    ) -> Tuple[int, Tuple[int, ...]]:
+        if index > last:
+            return _catch_all_points(plan, residual[-1]), ()
+        key = (index, residual)
+        if key not in memo:
+            _, points, reqs = bundle_rules[index]
+            times = _times_applicable(residual, reqs)
+            if plan.count_caps[index] is not None:
+                times = min(times, plan.count_caps[index])
+            if index == last and plan.saturating[index]:
+                tries = range(times, times - 1, -1)
+            else:
+                tries = range(times, -1, -1)
+            best = None
+            for count in tries:
+                value, later_counts = search(index + 1, tuple(
+                    amount - count * req for amount, req in zip(residual, reqs)
+                ))
+                value += count * points
+                if best is None or value > best[0]:
+                    best = (value, (count,) + later_counts)
+            memo[key] = best
+        return memo[key]
+
+    _, counts = search(0, residual)
+    counts = tuple(extra + count for extra, count in zip(bulk, counts))
+    COUNTERS["solver_states"] += len(memo)
+
+    solution = _solve_month_counts(plan, amounts, counts)
+    if bound is not None and solution[0] < bound:
+        better = _branch_and_bound(plan, amounts, solution[0], bulk)
+        if better is not None:
+            solution = _solve_month_counts(plan, amounts, better)
+    return solution
+
+
+def _search_states(plan: RulePlan, amounts: Tuple[int, ...]) -> int:
+    """
+    Number of (rule, count) combinations the exact search of _solve_month
+    could try on a unit vector
+    """
+    states = 1
+    for (_, _, reqs), cap in zip(plan.bundle_rules, plan.count_caps):
+        times = _times_applicable(amounts, reqs)
+        if cap is not None:
+            times = min(times, cap)
+        states *= times + 1
+    return states
+
+
+def _solve_month_counts(
+    plan: RulePlan,
+    amounts: Tuple[int, ...],
+    counts: Tuple[int, ...]
+) -> Tuple[int, Tuple[int, ...], List[Tuple[int, int]]]:
+    """
+    _solve_month result for fixed bundle rule counts, the left over
+    amount going to the catch-all rules
+    """
+    reward = 0
+    leftover = amounts[-1]
+    for count, (_, points, reqs) in zip(counts, plan.bundle_rules):
+        reward += count * points
+        leftover -= count * reqs[-1]
+    catch_all_reward, catch_all_used = _solve_catch_all(plan, leftover)
+    return reward + catch_all_reward, tuple(counts), catch_all_used
+
+
+def _branch_and_bound(
+    plan: RulePlan,
+    amounts: Tuple[int, ...],
+    incumbent: int,
+    bulk: List[int]
+) -> Optional[Tuple[int, ...]]:
+    """
+    Searches for a month solution earning more than incumbent: the month
+    as an integer program over every bundle and catch-all rule, solved
+    by depth first branch and bound on exact LP relaxations
+
+    The incumbent is already the best solution applying every bundle rule
+    at least its bulk count, so the search starts from the regions where
+    some rule is applied fewer times (the first such rule being j, the
+    rules before it at least their bulk); their LP bounds mostly drop
+    below the incumbent straight away
+
+    Args:
+        plan -- compiled rule set
+        amounts -- unit vector of the month (see _solve_month)
+        incumbent -- reward of the best solution known so far
+        bulk -- count per plan bundle rule the incumbent is optimal above
+
+    Returns:
+        tuple -- count per plan bundle rule of an optimal solution, None
+                 when no solution earns more than incumbent
+    """
+    dims = len(amounts)
+    profits = [points for _, points, _ in plan.bundle_rules] + [
+        points for _, points, _ in plan.catch_all_rules
+    ]
+    columns = [reqs for _, _, reqs in plan.bundle_rules] + [
+        (0,) * (dims - 1) + (cost,) for _, _, cost in plan.catch_all_rules
+    ]
+    num_bundles = len(plan.bundle_rules)
+    best = None
+
+    # (lower bound, upper bound or None) of every rule count
+    free = (None,) * (len(profits) - num_bundles)
+    stack = [
+        (
+            tuple(bulk[:rule]) + (0,) * (len(profits) - rule),
+            (None,) * rule + (count - 1,) + (None,) * (num_bundles - rule - 1)
+            + free
+        )
+        for rule, count in enumerate(bulk) if count
+    ]
+    while stack:
+        lower, upper = stack.pop()
+        # x = lower + y, the upper bounds become extra rows on y
+        capacities = [
+            amount - sum(
+                low * column[dim] for low, column in zip(lower, columns)
+            )
+            for dim, amount in enumerate(amounts)
+        ]
+        bounded = [
+            index for index, high in enumerate(upper) if high is not None
+        ]
+        capacities += [upper[index] - lower[index] for index in bounded]
+        if min(capacities) < 0:
+            continue
+        solution = _lp_relaxation(
+            [Fraction(profit) for profit in profits],
+            [
+                column + tuple(int(index == row) for row in bounded)
+                for index, column in enumerate(columns)
+            ],
+            tuple(capacities)
+        )
+        COUNTERS["lp_relaxations"] += 1
+        solution = [low + count for low, count in zip(lower, solution)]
+        value = sum(profit * count for profit, count in zip(profits, solution))
+        # rewards are integers, no solution here can beat the floor
+        if math.floor(value) <= incumbent:
+            continue
+
+        # rounded down bundle counts with the catch-all rules on the rest
+        #  are always feasible and often good enough to prune with
+        rounded = tuple(math.floor(count) for count in solution[:num_bundles])
+        reward = _solve_month_counts(plan, amounts, rounded)[0]
+        if reward > incumbent:
+            incumbent, best = reward, rounded
+            if math.floor(value) <= incumbent:
                 continue
-        
-        print("Maximum Reward Points For Month: ", reward)
-        print("Rules Used: ", rules_used)
 
-        return (reward, rules_used)
+        fractional = [
+            index for index, count in enumerate(solution)
+            if count.denominator != 1
+        ]
+        if not fractional:
+            # integral, the catch-all rules are no worse on their own
+            continue
+        # branch on the most fractional count, rounded up first
+        index = max(
+            fractional,
+            key=lambda index: min(
+                solution[index] - math.floor(solution[index]),
+                math.ceil(solution[index]) - solution[index]
+            )
+        )
+        floor = math.floor(solution[index])
+        stack.append((lower, upper[:index] + (floor,) + upper[index + 1:]))
+        stack.append((lower[:index] + (floor + 1,) + lower[index + 1:], upper))
 
+    return best
 
-    @staticmethod
-    def _rule_applicable(
-        transactions: Dict[str, float], 
-        reqs: List[Tuple[str, int]]
-    ) -> int:
+
+def _month_units(
+    plan: RulePlan,
+    parsed_transactions: Dict[str, int],
+    total_amount: int
+) -> Tuple[int, ...]:
+    """
+    Whole units (plan.unit_cents) available for each merchant specific
+    requirement, followed by the whole units of the pooled total (OTHER
+    requirements can be paid by any merchant); the month's solution
+    only depends on this vector. Net refunds leave nothing to spend, so
+    negative amounts count as 0
+    """
+    return tuple(
+        max(parsed_transactions.get(merchant, 0) // plan.unit_cents, 0)
+        for merchant in plan.specific_merchants
+    ) + (max(total_amount // plan.unit_cents, 0),)
+
+
+def _lookup_month(
+    plan: RulePlan,
+    amounts: Tuple[int, ...],
+    reward_only: bool = False
+) -> Tuple[int, Any, Any]:
+    """
+    Looks a month's unit vector (see _month_units) up in the installed
+    reward table, solving it when the table does not cover it
+
+    Args:
+        plan -- compiled rule set
+        amounts -- the month's unit vector
+        reward_only -- only the reward is needed, so a table lookup
+                       skips rebuilding the rule counts
+
+    Returns:
+        tuple -- (max_reward, bundle rule counts, catch-all rules used)
+                 as _solve_month; both rule parts are None for a
+                 reward_only table lookup
+    """
+    table = REWARD_TABLES.get(plan.fingerprint)
+    if table is not None:
+        if reward_only:
+            reward = table.reward(amounts)
+            solution = None if reward is None else (reward, None, None)
+        else:
+            solution = table.solve(plan, amounts)
+        if solution is not None:
+            COUNTERS["table_lookups"] += 1
+            return solution
+
+    with Timer("month_solve", units=amounts):
+        solution = _solve_month(plan, amounts)
+    COUNTERS["month_solves"] += 1
+    return solution
+
+
+def _month_solution(
+    plan: RulePlan,
+    amounts: Tuple[int, ...]
+) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Solves a month's unit vector (see _month_units)
+
+    Returns:
+        tuple -- (max_reward, run length encoded rules_used)
+    """
+    reward, counts, catch_all_used = _lookup_month(plan, amounts)
+
+    rules_used = [
+        (rule_num, count)
+        for (rule_num, _, _), count in zip(plan.bundle_rules, counts)
+        if count
+    ]
+    rules_used.extend(catch_all_used)
+    return reward, rules_used
+
+
+def expand_rules(
+    rules_used: List[Tuple[int, int]],
+    listed_once: Iterable[int] = ()
+) -> List[int]:
+    """
+    Expands run length encoded rules_used ([(6, 3), (7, 52)]) into a
+    flat list ([6, 6, 6, 7, 7, ...]); the rules in listed_once appear a
+    single time whatever their count (see _legacy_rules_used)
+    """
+    listed_once = set(listed_once)
+    return [
+        rule_num for rule_num, count in rules_used
+        for _ in range(1 if rule_num in listed_once else count)
+    ]
+
+
+def _legacy_rules_used(
+    plan: RulePlan,
+    rules_used: List[Tuple[int, int]]
+) -> List[int]:
+    """
+    Legacy flat month rules_used ([1, 6, 6, 6, 7]), where the catch-all
+    rules are only listed once each to keep it clean
+    """
+    return expand_rules(
+        rules_used, [rule_num for rule_num, _, _ in plan.catch_all_rules]
+    )
+
+
+def date_ordinal(raw_date: Any) -> int:
+    """
+    Day number of a transaction "date" ("YYYY-MM-DD", a time part is
+    ignored)
+
+    Returns:
+        int -- date.toordinal() of the day, 0 when missing or invalid
+    """
+    try:
+        return date.fromisoformat(raw_date[:10]).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def amount_in_cents(raw_amount: Any) -> int:
+    """
+    Transaction "amount_cents" as an int; whole number floats (eg.
+    2500.0 from a JSON encoder that writes every number as a float) are
+    accepted
+
+    Raises:
+        ValueError -- if the amount is not a whole number of cents or
+                      does not fit an int64 column
+    """
+    if type(raw_amount) is float and raw_amount.is_integer():
+        raw_amount = int(raw_amount)
+    elif type(raw_amount) is not int:
+        raise ValueError(
+            "amount_cents must be a whole number, got %r" % (raw_amount,)
+        )
+    if not -2 ** 63 <= raw_amount < 2 ** 63:
+        raise ValueError("amount_cents %d is out of range" % raw_amount)
+    return raw_amount
+
+
+class TransactionColumns:
+    """
+    Compact column store for a month of transactions: merchant codes are
+    interned into a small table and every per transaction field is a
+    typed array, instead of one dict per transaction
+    """
+    __slots__ = (
+        "transaction_ids", "merchants", "merchant_index", "amount_cents",
+        "date_ordinals", "_merchant_lookup", "_date_lookup"
+    )
+
+    def __init__(self) -> None:
+        """Constructor (empty, see from_dict and append)"""
+        self.transaction_ids = []
+        # merchant code of each merchant index
+        self.merchants = []
+        self.merchant_index = array("i")
+        self.amount_cents = array("q")
+        # date.toordinal() of each transaction, 0 when missing or invalid
+        self.date_ordinals = array("i")
+        self._merchant_lookup = {}
+        self._date_lookup = {}
+
+    @classmethod
+    def from_dict(
+        cls,
+        transactions: Dict[str, Dict[str, Any]]
+    ) -> "TransactionColumns":
+        """Builds the columns from the request transactions dict"""
+        columns = cls()
+        for transaction_id, transaction in transactions.items():
+            columns.append(transaction_id, transaction)
+        return columns
+
+    def append(self, transaction_id: str, transaction: Dict[str, Any]) -> int:
         """
-        Checks how many times Rule with requirements == reqs
-        can be applied
+        Appends one transaction ({"merchant_code", "amount_cents", "date"})
 
-        Args:
-            transactions -- a dict of parsed transactions 
-                          (same format as self._parsed_transactions)
-            reqs -- a list of requirements 
-                    (see DEFAULT_RULES[i]["Reqs"] above for format)
-        
         Returns:
-            int -- number of times rule can be applied
+            int -- row index of the transaction
         """
-        # counts of how many times a req can be applied to a specific
-        #  merchant within transaction
-        number_of_applications = []
-        for merchant, amount in reqs:
-            if merchant not in transactions or \
-               transactions[merchant] < amount:
-                return 0
-            else:
-                number_of_applications.append(
-                    transactions[merchant] // amount
-                )
-        
-        # the max number of times a rule can be applied to a transaction is 
-        #  limited by the number of times a req can be applied to any 
-        #  specific merchant within the transaction
-        return int(min(number_of_applications))
-    
-    @staticmethod
-    def _apply_rule(
-        transactions: Dict[str, float],
-        reqs: List[Tuple[str, int]],
-        times: int = 1
-    ) -> int:
+        index, amount, ordinal = self._encode(transaction)
+        self.transaction_ids.append(transaction_id)
+        self.merchant_index.append(index)
+        self.amount_cents.append(amount)
+        self.date_ordinals.append(ordinal)
+        return len(self.transaction_ids) - 1
+
+    def replace(self, row: int, transaction: Dict[str, Any]) -> None:
+        """
+        Overwrites the fields of row with another transaction, keeping
+        its id and position (eg. a later duplicate of the id)
         """
-        modifies transaction in place to decrement ammounts
-        returns total decremented
+        index, amount, ordinal = self._encode(transaction)
+        self.merchant_index[row] = index
+        self.amount_cents[row] = amount
+        self.date_ordinals[row] = ordinal
 
-        * Expects that _rule_applicable(transactions, reqs, times)
-          has returned True
+    def _encode(self, transaction: Dict[str, Any]) -> Tuple[int, int, int]:
+        """(merchant index, amount_cents, date ordinal) of a transaction"""
+        merchant = transaction["merchant_code"]
+        index = self._merchant_lookup.get(merchant)
+        if index is None:
+            index = self._merchant_lookup[merchant] = len(self.merchants)
+            self.merchants.append(merchant)
 
-        Args:
-            transactions -- a dict of parsed transactions 
-                          (same format as self._parsed_transactions)
-            reqs -- a list of requirements 
-                    (see DEFAULT_RULES[i]["Reqs"] above for format)
-            times -- the number of times the rule is applied
-        
-        Returns:
-            the total amount deducted from transaction total to apply the Rule
+        raw_date = transaction.get("date")
+        ordinal = self._date_lookup.get(raw_date)
+        if ordinal is None:
+            ordinal = self._date_lookup[raw_date] = date_ordinal(raw_date)
+        return index, amount_in_cents(transaction["amount_cents"]), ordinal
+
+    def __len__(self) -> int:
+        return len(self.transaction_ids)
+
+    def truncate(self, length: int) -> None:
+        """Drops every row from index length on (eg. of a bad request)"""
+        del self.transaction_ids[length:]
+        del self.merchant_index[length:]
+        del self.amount_cents[length:]
+        del self.date_ordinals[length:]
+
+    def copy_rows(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> "TransactionColumns":
         """
-        total = 0
-        for merchant, amount in reqs:
-            transactions[merchant] -= amount * times
-            total += amount * times
+        New store of rows start to stop - 1 (default all), with the same
+        merchant indexes (eg. to score one request of a batch alone)
+        """
+        columns = TransactionColumns()
+        columns.transaction_ids = self.transaction_ids[start:stop]
+        columns.merchants = list(self.merchants)
+        columns.merchant_index = self.merchant_index[start:stop]
+        columns.amount_cents = self.amount_cents[start:stop]
+        columns.date_ordinals = self.date_ordinals[start:stop]
+        columns._merchant_lookup = dict(self._merchant_lookup)
+        columns._date_lookup = dict(self._date_lookup)
+        return columns
+
+    def merchant_totals(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> List[int]:
+        """
+        Cents spent per merchant index over rows start to stop - 1
+        (default all); totals of disjoint row ranges add up to the
+        totals of their union (see merge_merchant_totals)
+        """
+        return _merchant_totals(
+            self.merchant_index[start:stop],
+            self.amount_cents[start:stop],
+            len(self.merchants)
+        )
 
-        return total
+    def stored_rewards(self, plan: RulePlan) -> Any:
+        """Precomputed rewards for plan (see MappedTransactionColumns)"""
+        return None
 
-    @staticmethod
-    def _must_merge_to_other(transactions: Dict[str, float]) -> bool:
+
+"""
+Transaction file format (write_transaction_file / MappedTransactionColumns),
+little endian, every column 8 byte aligned:
+    TRANSACTION_FILE_MAGIC, uint64 header length, JSON header, padding
+    int64 columns of header["rows"] values, at header["columns"] offsets:
+        merchant_index, amount_cents, date_ordinals
+        points, rule_nums, multiplicities (only with rewards)
+        transaction_id_offsets (rows + 1 values into transaction_ids)
+    transaction_ids -- UTF-8 bytes of every id, back to back
+The header also holds the merchant table, the cents per merchant and
+the fingerprint of the rule plan the rewards were scored with
+"""
+_INT64_COLUMNS = ("merchant_index", "amount_cents", "date_ordinals")
+_REWARD_COLUMNS = ("points", "rule_nums", "multiplicities")
+_FILE_PREFIX = struct.Struct("<8sQ")
+
+
+def _padded(size: int) -> int:
+    """size rounded up to a multiple of 8"""
+    return (size + 7) & ~7
+
+
+def write_transaction_file(
+    path: str,
+    columns: TransactionColumns,
+    plan: RulePlan = None
+) -> None:
+    """
+    Writes transactions (and, given a plan with at most one catch-all
+    rule, their per transaction rewards) to a transaction file that
+    MappedTransactionColumns reads back without copying
+
+    Args:
+        path -- file to write
+        columns -- the transactions
+        plan -- compiled rule set to store rewards for (optional)
+    """
+    rows = len(columns)
+    data = {
+        name: array("q", getattr(columns, name)) for name in _INT64_COLUMNS
+    }
+    rewards_fingerprint = None
+    if plan is not None and len(plan.catch_all_rules) <= 1:
+        rewards = RewardPointsCalculator._score_columns(
+            plan, columns, columnar=True
+        )
+        data["points"] = array("q", rewards["points"])
+        data["rule_nums"] = array("q", rewards["rules"])
+        data["multiplicities"] = array("q", rewards["times"])
+        rewards_fingerprint = plan.fingerprint
+
+    encoded_ids = [
+        str(transaction_id).encode("utf-8")
+        for transaction_id in columns.transaction_ids
+    ]
+    id_offsets = array("q", [0])
+    for encoded in encoded_ids:
+        id_offsets.append(id_offsets[-1] + len(encoded))
+    data["transaction_id_offsets"] = id_offsets
+
+    offsets = {}
+    position = 0
+    for name, column in data.items():
+        offsets[name] = position
+        position += len(column) * 8
+    offsets["transaction_ids"] = position
+
+    header = json.dumps({
+        "rows": rows,
+        "merchants": columns.merchants,
+        "merchant_totals": columns.merchant_totals(),
+        "rewards_fingerprint": rewards_fingerprint,
+        "columns": offsets
+    }).encode("utf-8")
+    start = _padded(_FILE_PREFIX.size + len(header))
+
+    with open(path, "wb") as output:
+        output.write(_FILE_PREFIX.pack(TRANSACTION_FILE_MAGIC, len(header)))
+        output.write(header)
+        output.write(b"\0" * (start - _FILE_PREFIX.size - len(header)))
+        for column in data.values():
+            if sys.byteorder != "little":
+                column = array("q", column)
+                column.byteswap()
+            column.tofile(output)
+        output.write(b"".join(encoded_ids))
+
+
+class _StringColumn:
+    """Read only sequence of the strings of a transaction file"""
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return bytes(
+            self._blob[self._offsets[index]:self._offsets[index + 1]]
+        ).decode("utf-8")
+
+    def __iter__(self) -> Iterable[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class MappedTransactionColumns(TransactionColumns):
+    """
+    Read only TransactionColumns over a transaction file: the file is
+    memory mapped and every column is a memoryview into it, so opening
+    even millions of rows costs no parsing or copying (NumPy reads the
+    same pages through np.frombuffer)
+    """
+    __slots__ = (
+        "rewards", "rewards_fingerprint", "_merchant_totals", "_mmap"
+    )
+
+    def __init__(self, path: str) -> None:
         """
-        This method is specific to the DEFAULT_RULES given in the assesment;
-        it checks if none of the rules other than Rule 7 can be applied.
-        (if that is the case, then we must merge all merchants
-         into the 'other' category to be used as left over amount)
+        Constructor
 
         Args:
-            transactions -- a dict of parsed transactions 
-                          (same format as self._parsed_transactions)
-        Returns:
-            bool -- whether we need to merge the other merchants 
-                     values into 'other' or not
+            path -- transaction file (see write_transaction_file)
         """
-        return MerchantCode.SPORTCHECK.value not in transactions or \
-            transactions[MerchantCode.SPORTCHECK.value] < 20
+        if sys.byteorder != "little":
+            raise ValueError("Transaction files are little endian")
+        with open(path, "rb") as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
 
-    @staticmethod
-    def _merge_to_other(transactions: Dict[str, float]) -> int:
+        magic, header_size = _FILE_PREFIX.unpack_from(view)
+        if magic != TRANSACTION_FILE_MAGIC:
+            raise ValueError("%s is not a transaction file" % (path,))
+        header = json.loads(bytes(
+            view[_FILE_PREFIX.size:_FILE_PREFIX.size + header_size]
+        ))
+        start = _padded(_FILE_PREFIX.size + header_size)
+        rows = header["rows"]
+        offsets = header["columns"]
+
+        def column(name: str, length: int = rows) -> memoryview:
+            begin = start + offsets[name]
+            return view[begin:begin + length * 8].cast("q")
+
+        self.merchants = header["merchants"]
+        self.merchant_index = column("merchant_index")
+        self.amount_cents = column("amount_cents")
+        self.date_ordinals = column("date_ordinals")
+        self.transaction_ids = _StringColumn(
+            column("transaction_id_offsets", rows + 1),
+            view[start + offsets["transaction_ids"]:]
+        )
+        self.rewards_fingerprint = header["rewards_fingerprint"]
+        self.rewards = None
+        if self.rewards_fingerprint is not None:
+            self.rewards = tuple(column(name) for name in _REWARD_COLUMNS)
+        self._merchant_totals = header["merchant_totals"]
+        self._merchant_lookup = {
+            merchant: index for index, merchant in enumerate(self.merchants)
+        }
+        self._date_lookup = {}
+
+    def append(self, transaction_id: str, transaction: Dict[str, Any]) -> int:
+        raise TypeError("Transaction files are read only")
+
+    def replace(self, row: int, transaction: Dict[str, Any]) -> None:
+        raise TypeError("Transaction files are read only")
+
+    def truncate(self, length: int) -> None:
+        raise TypeError("Transaction files are read only")
+
+    def merchant_totals(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> List[int]:
         """
-        Merges all remaining transactions into the 'other'
-        category and returns the total from applying Rule 7
+        Cents spent per merchant index (stored in the header, summed
+        from the columns for a row range)
+        """
+        if start == 0 and (stop is None or stop >= len(self)):
+            return list(self._merchant_totals)
+        return super().merchant_totals(start, stop)
 
-        * requires a mechant_code of 'other' to be present in transactions
+    def stored_rewards(self, plan: RulePlan) -> Any:
+        """
+        (points, rule_nums, multiplicities) int64 columns stored for
+        plan's rule set, None when the file holds no rewards for it
+        """
+        if self.rewards_fingerprint != plan.fingerprint:
+            return None
+        return self.rewards
+
+
+class RewardTable:
+    """
+    Precomputed month answers of a rule plan for bounded spend
+
+    When every bundle rule only requires specific merchants and the best
+    catch-all rule costs one unit (or there is none), the left over
+    total is always paid out at that rule's rate, so a month's reward is
+
+        pool_points * pooled units + best[specific merchant cells]
+
+    best is a dense table over the specific merchant amounts, each
+    floored to the gcd of that merchant's requirements, solved once by
+    dynamic programming with bundle points reduced by what their cost
+    would have earned through the catch-all rule. The pooled total is
+    the exact linear extension, so a lookup is O(1) for any total;
+    months past the table bounds at a merchant return None (solved by
+    _solve_month instead). install_reward_table makes the month methods
+    use it; tables are saved to and memory mapped from files for cold
+    starts
+    """
+    __slots__ = (
+        "fingerprint", "steps", "shape", "strides", "moves",
+        "pool_points", "best", "choice", "_mmap"
+    )
+
+    def __init__(
+        self,
+        fingerprint: str,
+        steps: List[int],
+        shape: List[int],
+        moves: List[int],
+        pool_points: int,
+        best: Any,
+        choice: Any
+    ) -> None:
+        """
+        Constructor (see build and load)
 
         Args:
-            transactions -- a dict of parsed transactions 
-                          (same format as self._parsed_transactions)
-        Returns:
-            int -- amount earned from applying rule 7
+            fingerprint -- fingerprint of the plan tabulated
+            steps -- plan units per cell for each specific merchant
+                     (0 for merchants no bundle rule requires)
+            shape -- cells per specific merchant
+            moves -- flat cell offset of each plan bundle rule
+            pool_points -- points per pooled unit (best catch-all rule)
+            best -- int64 reduced reward per flat cell
+            choice -- int8 last step per flat cell: a bundle rule index,
+                      len(moves) + merchant for a smaller cell, -1 none
         """
-        for merchant, amount in transactions.items():
-            if merchant != MerchantCode.OTHER.value:
-                transactions[MerchantCode.OTHER.value] += amount
+        self.fingerprint = fingerprint
+        self.steps = list(steps)
+        self.shape = list(shape)
+        self.strides = [1] * len(shape)
+        for dim in range(len(shape) - 2, -1, -1):
+            self.strides[dim] = self.strides[dim + 1] * shape[dim + 1]
+        self.moves = list(moves)
+        self.pool_points = pool_points
+        self.best = best
+        self.choice = choice
+        self._mmap = None
+
+    @classmethod
+    def build(
+        cls,
+        plan: RulePlan,
+        max_spend_cents: int = DEFAULT_REWARD_TABLE_SPEND_CENTS
+    ) -> "RewardTable":
+        """
+        Tabulates a rule plan
+
+        Args:
+            plan -- compiled rule set
+            max_spend_cents -- spend per merchant covered by the table
+
+        Returns:
+            RewardTable -- the table, ValueError if the plan's catch-all
+                           or OTHER requirements keep it from separating
+                           the pooled total
+        """
+        pool_points = 0
+        if plan.catch_all_rules:
+            _, pool_points, best_cost = \
+                plan.catch_all_rules[plan.catch_all_best_rule]
+            if best_cost != 1:
+                raise ValueError(
+                    "The best catch-all rule must cost one unit to tabulate"
+                )
+        if any(sum(reqs[:-1]) != reqs[-1] for _, _, reqs in plan.bundle_rules):
+            raise ValueError("Bundle rules with OTHER requirements")
+
+        steps = [
+            reduce(
+                math.gcd, (reqs[dim] for _, _, reqs in plan.bundle_rules), 0
+            )
+            for dim in range(len(plan.specific_merchants))
+        ]
+        max_units = max_spend_cents // plan.unit_cents
+        shape = [max_units // step + 1 if step else 1 for step in steps]
+        table = cls(
+            plan.fingerprint, steps, shape, [], pool_points, None, None
+        )
+        cell_reqs = [
+            tuple(req // step if step else 0 for req, step in zip(reqs, steps))
+            for _, _, reqs in plan.bundle_rules
+        ]
+        table.moves = [
+            sum(req * stride for req, stride in zip(cell_req, table.strides))
+            for cell_req in cell_reqs
+        ]
+        gains = [
+            points - pool_points * reqs[-1]
+            for _, points, reqs in plan.bundle_rules
+        ]
+
+        size = table.strides[0] * shape[0] if shape else 1
+        best = array("q", bytes(8 * size))
+        choice = array("b", b"\xff" * size)
+        # (dim, stride, choice code) of the merchants that have cells
+        dims = [
+            (dim, table.strides[dim], len(table.moves) + dim)
+            for dim, step in enumerate(steps) if step
+        ]
+        # (choice code, ((dim, cells needed), ...), move, gain)
+        bundles = [
+            (
+                index,
+                tuple((dim, req) for dim, req in enumerate(cell_req) if req),
+                table.moves[index],
+                gain
+            )
+            for index, (cell_req, gain) in enumerate(zip(cell_reqs, gains))
+            if gain > 0
+        ]
+        # flat order is lexicographic so every cell a cell is built from
+        #  comes before it
+        for flat, cell in enumerate(itertools.product(*map(range, shape))):
+            value = 0
+            last = -1
+            for dim, stride, code in dims:
+                if cell[dim] and best[flat - stride] > value:
+                    value = best[flat - stride]
+                    last = code
+            for code, needs, move, gain in bundles:
+                for dim, req in needs:
+                    if cell[dim] < req:
+                        break
+                else:
+                    if best[flat - move] + gain > value:
+                        value = best[flat - move] + gain
+                        last = code
+            best[flat] = value
+            choice[flat] = last
+        table.best = best
+        table.choice = choice
+        return table
+
+    def reward(self, amounts: Tuple[int, ...]) -> Optional[int]:
+        """
+        Max reward for a month's unit vector (see _month_units), None
+        when it is outside the table
+        """
+        flat = self._cell(amounts)
+        if flat is None:
+            return None
+        return self.best[flat] + self.pool_points * amounts[-1]
+
+    def solve(
+        self,
+        plan: RulePlan,
+        amounts: Tuple[int, ...]
+    ) -> Optional[Tuple[int, Tuple[int, ...], List[Tuple[int, int]]]]:
+        """
+        Table version of _solve_month (same result format), None when
+        the unit vector is outside the table
+        """
+        flat = self._cell(amounts)
+        if flat is None:
+            return None
+        reward = self.best[flat] + self.pool_points * amounts[-1]
+        counts = [0] * len(self.moves)
+        while self.choice[flat] != -1:
+            step = self.choice[flat]
+            if step < len(self.moves):
+                counts[step] += 1
+                flat -= self.moves[step]
+            else:
+                flat -= self.strides[step - len(self.moves)]
+
+        leftover = amounts[-1] - sum(
+            count * reqs[-1]
+            for count, (_, _, reqs) in zip(counts, plan.bundle_rules)
+        )
+        return reward, tuple(counts), _solve_catch_all(plan, leftover)[1]
+
+    def _cell(self, amounts: Tuple[int, ...]) -> Optional[int]:
+        """Flat cell of a unit vector, None outside the table"""
+        flat = 0
+        for amount, step, size, stride in zip(
+            amounts, self.steps, self.shape, self.strides
+        ):
+            if amount < 0:
+                return None
+            if step:
+                cell = amount // step
+                if cell >= size:
+                    return None
+                flat += cell * stride
+        # a pool smaller than the specific merchants (refunds at other
+        #  merchants) could bind, which the table does not model
+        if amounts[-1] < sum(amounts[:-1]):
+            return None
+        return flat
+
+    def save(self, path: str) -> None:
+        """
+        Writes the table: REWARD_TABLE_MAGIC, uint64 header length, JSON
+        header, padding to 8 bytes, the int64 best column then the int8
+        choice column, little endian
+        """
+        header = json.dumps({
+            "fingerprint": self.fingerprint,
+            "steps": self.steps,
+            "shape": self.shape,
+            "moves": self.moves,
+            "pool_points": self.pool_points
+        }).encode("utf-8")
+        start = _padded(_FILE_PREFIX.size + len(header))
+        best = array("q", self.best)
+        if sys.byteorder != "little":
+            best.byteswap()
+
+        with open(path, "wb") as output:
+            output.write(_FILE_PREFIX.pack(REWARD_TABLE_MAGIC, len(header)))
+            output.write(header)
+            output.write(b"\0" * (start - _FILE_PREFIX.size - len(header)))
+            best.tofile(output)
+            array("b", self.choice).tofile(output)
+
+    @classmethod
+    def load(cls, path: str) -> "RewardTable":
+        """
+        Memory maps a table written by save (nothing is parsed or copied,
+        pages are read on first lookup)
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Reward table files are little endian")
+        with open(path, "rb") as source:
+            file_map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(file_map)
+
+        magic, header_size = _FILE_PREFIX.unpack_from(view)
+        if magic != REWARD_TABLE_MAGIC:
+            raise ValueError("%s is not a reward table file" % (path,))
+        header = json.loads(bytes(
+            view[_FILE_PREFIX.size:_FILE_PREFIX.size + header_size]
+        ))
+        start = _padded(_FILE_PREFIX.size + header_size)
+        size = 1
+        for cells in header["shape"]:
+            size *= cells
+
+        table = cls(
+            header["fingerprint"], header["steps"], header["shape"],
+            header["moves"], header["pool_points"],
+            view[start:start + size * 8].cast("q"),
+            view[start + size * 8:start + size * 9].cast("b")
+        )
+        table._mmap = file_map
+        return table
+
+
+# RewardTable per plan fingerprint, used by the month solvers
+REWARD_TABLES = {}
+
+
+def install_reward_table(table: RewardTable) -> None:
+    """Makes month solves of the table's rule plan look it up first"""
+    REWARD_TABLES[table.fingerprint] = table
+
+
+def _load_numpy() -> Any:
+    """
+    Imports NumPy on first use (it is optional and importing it costs
+    more than the rest of the Lambda cold start), None if not installed
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+# NumPy module once _load_numpy has run (None if missing)
+_numpy = False
+
+
+def _int_array(np: Any, column: Any) -> Any:
+    """
+    Zero copy NumPy view of an int column (array or memoryview), typed
+    after the column's own item type
+    """
+    return np.frombuffer(
+        column,
+        dtype=np.dtype(getattr(column, "typecode", None) or column.format)
+    )
+
+
+def _merchant_totals(
+    merchant_index: Any,
+    amount_cents: Any,
+    merchant_count: int
+) -> List[int]:
+    """
+    Sums amount_cents per merchant index, with NumPy's bincount when
+    there are enough rows and the sums are certain to be exact
+
+    Args:
+        merchant_index -- int column of merchant indexes
+        amount_cents -- int column of amounts, same length
+        merchant_count -- number of merchant indexes
+
+    Returns:
+        list -- cents per merchant index (exact integers)
+    """
+    rows = len(amount_cents)
+    np = _load_numpy() if rows >= VECTORIZE_MIN_TRANSACTIONS else None
+    if np is not None:
+        cents = _int_array(np, amount_cents)
+        largest = max(int(cents.max()), -int(cents.min()))
+        # bincount adds in float64, which is exact while every partial
+        #  sum stays below 2 ** 53 in magnitude
+        if largest * rows < 2 ** 53:
+            sums = np.bincount(
+                _int_array(np, merchant_index),
+                weights=cents,
+                minlength=merchant_count
+            )
+            return [int(amount) for amount in sums.tolist()]
+
+    totals = [0] * merchant_count
+    for index, amount in zip(merchant_index, amount_cents):
+        totals[index] += amount
+    return totals
+
+
+def merge_merchant_totals(partials: Iterable[List[int]]) -> List[int]:
+    """
+    Adds up per merchant index totals of disjoint row ranges (see
+    TransactionColumns.merchant_totals); the sum is associative so
+    partials can come from any split of the rows, in any order
+    """
+    merged = []
+    for totals in partials:
+        if len(totals) > len(merged):
+            merged.extend([0] * (len(totals) - len(merged)))
+        for index, amount in enumerate(totals):
+            merged[index] += amount
+    return merged
+
+
+class TransactionRewards(NamedTuple):
+    """
+    Columnar per transaction rewards, index i is transaction i
+    (see RewardPointsCalculator.maximum_reward_per_transaction_columnar)
+    """
+    points: Any  # int64 array -- reward for each transaction
+    rule_nums: Any  # int64 array -- rule used (0 if none)
+    multiplicities: Any  # int64 array -- times the rule is used
+
+    def to_list(self) -> List[Tuple[int, Dict[str, List[int]]]]:
+        """Converts to the maximum_reward_per_transaction format"""
+        return [
+            (points, {"rules_used": [rule_num] * multiplicity})
+            for points, rule_num, multiplicity in zip(
+                self.points.tolist(),
+                self.rule_nums.tolist(),
+                self.multiplicities.tolist()
+            )
+        ]
+
+    def to_columns(self) -> Dict[str, List[int]]:
+        """
+        Converts to the compact columnar response format
+        ({"points", "rules", "times"}, see rewards_to_columns)
+        """
+        return {
+            "points": self.points.tolist(),
+            "rules": self.rule_nums.tolist(),
+            "times": self.multiplicities.tolist()
+        }
+
+
+def rewards_from_columns(
+    columns: Dict[str, List[Any]]
+) -> List[Tuple[int, Dict[str, List[int]]]]:
+    """
+    Converts columnar rewards ({"points", "rules", "times"}) to the
+    maximum_reward_per_transaction format; rules[i] is the rule used
+    times[i] times, or a list of rules each used once (only possible
+    with several catch-all rules)
+    """
+    return [
+        (points, {
+            "rules_used": [rule] * times if type(rule) is int else list(rule)
+        })
+        for points, rule, times in zip(
+            columns["points"], columns["rules"], columns["times"]
+        )
+    ]
+
+
+class LazyTransactionRewards:
+    """
+    Per transaction rewards that only build a transaction's rules_used
+    list when it is accessed; points are plain ints, so totals and
+    rankings never touch the breakdown
+    """
+    __slots__ = ("points", "rules", "times")
+
+    def __init__(self, columns: Dict[str, List[Any]]) -> None:
+        """
+        Constructor
+
+        Args:
+            columns -- columnar rewards ({"points", "rules", "times"},
+                       see rewards_from_columns)
+        """
+        self.points = columns["points"]
+        self.rules = columns["rules"]
+        self.times = columns["times"]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __getitem__(self, index: Any) -> Any:
+        """
+        (points, {"rules_used": [...]}) of transaction index, or a list
+        of them for a slice
+        """
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+        return self.points[index], {"rules_used": self.rules_used(index)}
+
+    def __iter__(self) -> Iterable[Tuple[int, Dict[str, List[int]]]]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def rules_used(self, index: int) -> List[int]:
+        """rules_used of transaction index"""
+        rule = self.rules[index]
+        return [rule] * self.times[index] if type(rule) is int else list(rule)
+
+    def total(self) -> int:
+        """Sum of the per transaction max rewards"""
+        return sum(self.points)
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Compact columnar format (see rewards_from_columns)"""
+        return {
+            "points": self.points, "rules": self.rules, "times": self.times
+        }
+
+    def to_list(self) -> List[Tuple[int, Dict[str, List[int]]]]:
+        """Materializes every transaction (maximum_reward_per_transaction)"""
+        return rewards_from_columns(self.to_columns())
+
+
+def _score_transactions_vectorized(
+    plan: RulePlan,
+    columns: TransactionColumns,
+    start: int = 0,
+    stop: int = None
+) -> TransactionRewards:
+    """
+    NumPy version of the maximum_reward_per_transaction rule scan
+
+    A transaction only holds its own merchant, so a rule applies to it
+    when every requirement is for that merchant, floor(amount / req)
+    times for the largest req. Applicable counts are computed for all
+    rules and transactions at once and argmax picks the first rule with
+    a non zero count; transactions without one go to the catch-all rule
+
+    * requires NumPy and at most one catch-all rule in the plan
+
+    Args:
+        plan -- compiled rule set
+        columns -- the transactions
+        start, stop -- only score rows start to stop - 1 (default all)
+
+    Returns:
+        TransactionRewards -- columnar rewards
+    """
+    np = _load_numpy()
+    merchant_ids = {
+        merchant: index for index, merchant in enumerate(columns.merchants)
+    }
+    # views on the typed arrays, no copy
+    merchant_index = _int_array(np, columns.merchant_index)[start:stop]
+    cents = _int_array(np, columns.amount_cents)[start:stop]
+
+    # req_cents[rule, merchant] -- cents needed per application of the
+    #  rule for a transaction of that merchant (0 when not applicable)
+    req_cents = np.zeros(
+        (len(plan.rules), max(len(merchant_ids), 1)), dtype=np.int64
+    )
+    for rule_index, (_, reqs) in enumerate(plan.rules):
+        rule_merchants = {merchant for merchant, _ in reqs}
+        if len(rule_merchants) != 1:
+            continue
+        merchant = rule_merchants.pop()
+        if merchant in merchant_ids and merchant != OTHER_MERCHANT:
+            req_cents[rule_index, merchant_ids[merchant]] = max(
+                amount for _, amount in reqs
+            )
+    rule_points = np.array(
+        [points for points, _ in plan.rules], dtype=np.int64
+    )
+
+    reqs = req_cents[:, merchant_index]
+    # refunds apply no rule (a negative count would pass for the first)
+    counts = np.where(
+        reqs > 0, np.maximum(cents, 0) // np.maximum(reqs, 1), 0
+    )
+    first_rule = np.argmax(counts > 0, axis=0)
+    multiplicities = counts[first_rule, np.arange(len(cents))]
+    points = rule_points[first_rule] * multiplicities
+    rule_nums = first_rule + 1
+
+    no_rule = multiplicities == 0
+    if plan.catch_all_rules:
+        rule_num, best_points, best_cost = plan.catch_all_rules[0]
+        # refunds earn nothing instead of indexing from the table's end
+        leftover = np.maximum(cents[no_rule] // plan.unit_cents, 0)
+        table = np.array(plan.catch_all_best, dtype=np.int64)
+        bulk = np.where(
+            leftover >= len(table), (leftover - len(table)) // best_cost + 1, 0
+        )
+        points[no_rule] = \
+            bulk * best_points + table[leftover - bulk * best_cost]
+        rule_nums[no_rule] = rule_num
+        multiplicities[no_rule] = 1
+    else:
+        points[no_rule] = 0
+        rule_nums[no_rule] = 0
+
+    return TransactionRewards(points, rule_nums, multiplicities)
+
+
+class TransactionRewardCache:
+    """
+    Bounded LRU cache of per transaction results, shared by every
+    calculator of the process (see TRANSACTION_REWARD_CACHE)
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Constructor
+
+        Args:
+            max_size -- number of entries kept, 0 disables the cache
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Any:
+        """Cached value for key, or None"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Tuple[Any, ...], value: Any) -> None:
+        """Caches value, evicting the least recently used entry if full"""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops every entry and resets the counters"""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Counters, e.g. for logging at the end of an invocation"""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+# module level so warm Lambda containers keep it between invocations
+TRANSACTION_REWARD_CACHE = TransactionRewardCache(
+    TRANSACTION_REWARD_CACHE_SIZE
+)
+
+
+class RewardPointsCalculator:
+    def __init__(
+        self, 
+        transactions: Union[Dict[str, Dict[str, Any]], TransactionColumns],
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            transactions -- the request transactions dict, or the same
+                            already in TransactionColumns form
+            rules -- a list of rules (see DEFAULT_RULES above for format)
+            defined_merchants -- set of known merchant codes
+        """
+        if not isinstance(transactions, TransactionColumns):
+            transactions = TransactionColumns.from_dict(transactions)
+        self._transactions = transactions
+        # compiled once per rule set and shared between instances
+        self._plan = compile_rules(rules, defined_merchants)
+        self._defined_merchants = defined_merchants
+        self._total_transaction_amount = 0
+
+        # sets self._parsed_transactions attr
+        # and updates self._total_transaction_amount
+        self.parse_transactions()
+
+    def parse_transactions(self) -> None:
+        """
+        Parses transactions by summing values with same
+        merchant_code and putting unknown merchants into 'other'
+
+        sets self._parsed_transactions attribute ({merchant: cents})
+        and self._total_transaction_amount (cents)
+        """
+        # init all merchants to 0
+        transactions = {
+            merchant_code: 0 for merchant_code in self._defined_merchants
+        }
+
+        with Timer("parse_transactions", transactions=len(self._transactions)):
+            # amounts stay in integer cents so sums are exact
+            for merchant, amount in zip(
+                self._transactions.merchants, self._sum_merchant_totals()
+            ):
+                if merchant not in self._defined_merchants:
+                    merchant = OTHER_MERCHANT
+                self._total_transaction_amount += amount
+                transactions[merchant] += amount
+        COUNTERS["transactions_parsed"] += len(self._transactions)
+
+        self._parsed_transactions = transactions
+
+    def _sum_merchant_totals(self) -> List[int]:
+        """
+        Cents per merchant index of self._transactions (the aggregation
+        step of parse_transactions)
+        """
+        return self._transactions.merchant_totals()
+
+    def maximum_reward_per_transaction(
+        self
+    )-> List[Tuple[int, Dict[str, List[int]]]]:
+        """
+        Compute max reward points per transaction based on
+        self._transactions
+
+        Returns:
+            list of tuples -- (
+                    max_reward_for_transaction, 
+                    {"rules_used": [rules_used]}
+                )
+                index of each tuple denotes the transaction number
+        """
+        return self._score_columns(self._plan, self._transactions)
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+    ) -> "RewardPointsCalculator":
+        """
+        Calculator over a transaction file (see save), memory mapped so
+        nothing is parsed; rewards stored for the same rule set are used
+        instead of scoring again
+
+        Args:
+            path -- transaction file written by save
+            rules -- a list of rules (see DEFAULT_RULES above for format)
+            defined_merchants -- set of known merchant codes
+        """
+        return cls(MappedTransactionColumns(path), rules, defined_merchants)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the transactions and their per transaction rewards to a
+        transaction file (see from_file)
+        """
+        write_transaction_file(path, self._transactions, self._plan)
+
+    def reward_points_per_transaction(self) -> List[int]:
+        """
+        Totals only fast path of maximum_reward_per_transaction: the max
+        reward points of each transaction, without building rules_used
+
+        Returns:
+            list -- points, index i is transaction i
+        """
+        return self._score_columns(
+            self._plan, self._transactions, points_only=True
+        )
+
+    def transaction_rewards(self) -> "LazyTransactionRewards":
+        """
+        maximum_reward_per_transaction with the rules_used breakdown only
+        built for the transactions that are looked at
+
+        Returns:
+            LazyTransactionRewards -- indexes like the list returned by
+                maximum_reward_per_transaction
+        """
+        return LazyTransactionRewards(self._score_columns(
+            self._plan, self._transactions, columnar=True
+        ))
+
+    def maximum_reward_per_transaction_columnar(self) -> TransactionRewards:
+        """
+        Batched version of maximum_reward_per_transaction that scores
+        every transaction at once with NumPy
+
+        * requires NumPy and at most one catch-all rule
+
+        Returns:
+            TransactionRewards -- points, rule_nums and multiplicities
+                arrays; TransactionRewards.to_list() gives the same
+                output as maximum_reward_per_transaction
+        """
+        if _load_numpy() is None:
+            raise RuntimeError("NumPy is required for the batched path")
+        if len(self._plan.catch_all_rules) > 1:
+            raise ValueError(
+                "The batched path supports at most one catch-all rule"
+            )
+
+        return _score_transactions_vectorized(self._plan, self._transactions)
+
+    def maximum_reward_for_month(
+        self,
+        expand_rules_used: bool = False
+    ) -> Tuple[int, List[Any]]:
+        """
+        Compute maximum reward for month based on self._parsed_transactions
+
+        Works for any rule set: rules whose only requirement is OTHER are
+        treated as catch-all rules applied to the pooled left over amount,
+        and the best multiset of the remaining rules is found with
+        _solve_month (see module level solver above)
+
+        Args:
+            expand_rules_used -- return rules_used in the legacy flat
+                                 format ([1, 6, 6, 6, 7]) instead of run
+                                 length encoded; its size grows with spend
+
+        Returns:
+            tuple -- (max_reward: int, rules_used: List[Tuple[int, int]])
+                rules_used holds (rule_num, times_used) pairs; the
+                legacy flat list only lists catch-all rules (Rule 7)
+                once
+        """
+        reward, rules_used = self._month_rewards(
+            self._plan,
+            self._parsed_transactions,
+            self._total_transaction_amount,
+            expand_rules_used
+        )
+
+        return (reward, rules_used)
+
+    def top_transactions(self, k: int) -> List[Tuple[str, int]]:
+        """
+        The k transactions with the highest max reward, scored in chunks
+        so memory stays O(k) beyond the transactions themselves
+
+        Args:
+            k -- number of transactions to return
+
+        Returns:
+            list -- (transaction_id, points) from the highest reward
+                    down, ties in transaction order
+        """
+        heap = []
+        if k <= 0:
+            return heap
+        for row, points in self._iter_reward_candidates(k, heap):
+            item = (points, -row)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        transaction_ids = self._transactions.transaction_ids
+        return [
+            (transaction_ids[-negative_row], points)
+            for points, negative_row in sorted(heap, reverse=True)
+        ]
+
+    def transactions_with_reward_at_least(
+        self,
+        min_points: int
+    ) -> Iterable[Tuple[str, int]]:
+        """
+        Streams the transactions whose max reward is at least min_points
+
+        Args:
+            min_points -- smallest reward returned
+
+        Returns:
+            iterator of (transaction_id, points), in transaction order
+        """
+        transaction_ids = self._transactions.transaction_ids
+        for row, points in self._iter_reward_candidates(min_points=min_points):
+            if points >= min_points:
+                yield transaction_ids[row], points
+
+    def _iter_reward_candidates(
+        self,
+        k: int = 0,
+        heap: List[Tuple[int, int]] = None,
+        min_points: int = None
+    ) -> Iterable[Tuple[int, int]]:
+        """
+        Yields (row, points) of the transactions that can still make a
+        top-k heap or reach min_points, in row order
+
+        With NumPy the rows are scored a QUERY_CHUNK_ROWS chunk at a time
+        and only the chunk's own top k (ties included) or the rows at or
+        above min_points are yielded; otherwise every row is yielded,
+        scored through TRANSACTION_REWARD_CACHE. Rewards stored in a
+        transaction file are read instead of scored
+        """
+        plan = self._plan
+        columns = self._transactions
+        stored = columns.stored_rewards(plan)
+        if stored is not None and _load_numpy() is None:
+            yield from enumerate(stored[0])
+            return
+
+        if stored is None and (
+            len(columns) < VECTORIZE_MIN_TRANSACTIONS
+            or len(plan.catch_all_rules) > 1 or _load_numpy() is None
+        ):
+            COUNTERS["transactions_scored"] += len(columns)
+            merchants = columns.merchants
+            for row, (index, amount) in enumerate(zip(
+                columns.merchant_index, columns.amount_cents
+            )):
+                yield row, self._cached_scan(plan, merchants[index], amount)[0]
+            return
+
+        np = _load_numpy()
+        if stored is None:
+            COUNTERS["transactions_scored"] += len(columns)
+        for start in range(0, len(columns), QUERY_CHUNK_ROWS):
+            if stored is not None:
+                points = _int_array(np, stored[0])[
+                    start:start + QUERY_CHUNK_ROWS
+                ]
+            else:
+                points = _score_transactions_vectorized(
+                    plan, columns, start, start + QUERY_CHUNK_ROWS
+                ).points
+            if min_points is not None:
+                cutoff = min_points
+            else:
+                # the chunk's k-th highest reward
+                kth = len(points) - min(k, len(points))
+                cutoff = np.partition(points, kth)[kth]
+                # rows the full heap already beats cannot get in
+                if len(heap) == k:
+                    cutoff = max(cutoff, heap[0][0])
+            for row in np.flatnonzero(points >= cutoff).tolist():
+                yield start + row, int(points[row])
+
+    def total_reward_for_month(self) -> int:
+        """
+        Totals only version of maximum_reward_for_month (the month's max
+        reward, without building rules_used)
+        """
+        return self._month_total(
+            self._plan, self._parsed_transactions,
+            self._total_transaction_amount
+        )
+
+    @classmethod
+    def _score_columns(
+        cls,
+        plan: RulePlan,
+        columns: TransactionColumns,
+        columnar: bool = False,
+        points_only: bool = False
+    ) -> Any:
+        """
+        Scores every transaction of columns (see
+        maximum_reward_per_transaction), with NumPy when there are
+        enough of them
+
+        Args:
+            plan -- compiled rule set
+            columns -- the transactions
+            columnar -- return the compact columnar format instead
+            points_only -- only return each row's points (no rules_used)
+
+        Returns:
+            list of tuples -- (max_reward_for_transaction,
+                               {"rules_used": [rules_used]}) per row
+            or with columnar
+            dict -- {"points": [...], "rules": [...], "times": [...]},
+                    row i used rules[i] times[i] times (see
+                    rewards_from_columns)
+            or with points_only
+            list -- points per row
+        """
+        stored = columns.stored_rewards(plan)
+        if stored is not None:
+            # scored when the transaction file was written
+            points, rule_nums, multiplicities = stored
+            if points_only:
+                return points.tolist()
+            rewards = {
+                "points": points.tolist(),
+                "rules": rule_nums.tolist(),
+                "times": multiplicities.tolist()
+            }
+            return rewards if columnar else rewards_from_columns(rewards)
+
+        COUNTERS["transactions_scored"] += len(columns)
+        if len(columns) >= VECTORIZE_MIN_TRANSACTIONS \
+           and len(plan.catch_all_rules) <= 1 and _load_numpy() is not None:
+            with Timer("score_transactions", transactions=len(columns),
+                       vectorized=True):
+                rewards = _score_transactions_vectorized(plan, columns)
+                if points_only:
+                    return rewards.points.tolist()
+                return rewards.to_columns() if columnar else rewards.to_list()
+
+        merchants = columns.merchants
+        with Timer("score_transactions", transactions=len(columns),
+                   vectorized=False):
+            if points_only:
+                return [
+                    cls._cached_scan(plan, merchants[index], amount)[0]
+                    for index, amount in zip(
+                        columns.merchant_index, columns.amount_cents
+                    )
+                ]
+            if not columnar:
+                return [
+                    cls._score_transaction(plan, merchants[index], amount)
+                    for index, amount in zip(
+                        columns.merchant_index, columns.amount_cents
+                    )
+                ]
+
+            points = []
+            rules = []
+            times = []
+            for index, amount in zip(
+                columns.merchant_index, columns.amount_cents
+            ):
+                reward, rule_nums, multiplicity = cls._cached_scan(
+                    plan, merchants[index], amount
+                )
+                points.append(reward)
+                if len(rule_nums) == 1:
+                    rules.append(rule_nums[0])
+                    times.append(multiplicity)
+                elif rule_nums:
+                    # several catch-all rules, each used once
+                    rules.append(list(rule_nums))
+                    times.append(1)
+                else:
+                    rules.append(0)
+                    times.append(0)
+            return {"points": points, "rules": rules, "times": times}
+
+    @staticmethod
+    def _month_total(
+        plan: RulePlan,
+        parsed_transactions: Dict[str, int],
+        total_amount: int
+    ) -> int:
+        """Max reward for aggregated merchant totals (see _month_rewards)"""
+        reward, _, _ = _lookup_month(
+            plan, _month_units(plan, parsed_transactions, total_amount),
+            reward_only=True
+        )
+        return reward
+
+    @staticmethod
+    def _month_rewards(
+        plan: RulePlan,
+        parsed_transactions: Dict[str, int],
+        total_amount: int,
+        expand_rules_used: bool = False
+    ) -> Tuple[int, List[Any]]:
+        """
+        Solves the month for aggregated merchant totals
+        (see maximum_reward_for_month)
+
+        Args:
+            plan -- compiled rule set
+            parsed_transactions -- {merchant: cents} totals
+                                   (same format as self._parsed_transactions)
+            total_amount -- cents spent in the month
+            expand_rules_used -- return the legacy flat rules_used list
+
+        Returns:
+            tuple -- (max_reward, rules_used)
+        """
+        reward, rules_used = _month_solution(
+            plan, _month_units(plan, parsed_transactions, total_amount)
+        )
+        if expand_rules_used:
+            rules_used = _legacy_rules_used(plan, rules_used)
+
+        return reward, rules_used
+
+    @classmethod
+    def _score_transaction(
+        cls,
+        plan: RulePlan,
+        merchant: str,
+        amount_cents: int
+    ) -> Tuple[int, Dict[str, List[int]]]:
+        """
+        Scores a single transaction (see maximum_reward_per_transaction),
+        going through TRANSACTION_REWARD_CACHE since the result only
+        depends on the rule set, merchant and amount
+
+        Args:
+            plan -- compiled rule set
+            merchant -- merchant_code of the transaction
+            amount_cents -- amount_cents of the transaction
+
+        Returns:
+            tuple -- (max_reward_for_transaction, {"rules_used": [rules_used]})
+        """
+        points, rule_nums, multiplicity = cls._cached_scan(
+            plan, merchant, amount_cents
+        )
+        return points, {"rules_used": list(rule_nums) * multiplicity}
+
+    @classmethod
+    def _cached_scan(
+        cls,
+        plan: RulePlan,
+        merchant: str,
+        amount_cents: int
+    ) -> Tuple[int, Tuple[int, ...], int]:
+        """_scan_rules through TRANSACTION_REWARD_CACHE"""
+        key = (plan.fingerprint, merchant, amount_cents)
+        result = TRANSACTION_REWARD_CACHE.get(key)
+        if result is None:
+            result = cls._scan_rules(plan, merchant, amount_cents)
+            TRANSACTION_REWARD_CACHE.put(key, result)
+        return result
+
+    @classmethod
+    def _scan_rules(
+        cls,
+        plan: RulePlan,
+        merchant: str,
+        amount_cents: int
+    ) -> Tuple[int, Tuple[int, ...], int]:
+        """
+        Scans the rules in order for a single transaction
+
+        Args:
+            plan -- compiled rule set
+            merchant -- merchant_code of the transaction
+            amount_cents -- amount_cents of the transaction
+
+        Returns:
+            tuple -- (max_reward_for_transaction, rule nums, multiplicity)
+                rules_used is rule nums repeated multiplicity times
+        """
+        # add transaction for transsaction["merchant_code"]
+        #  and a 0$ transaction for 'other' in case Rule 7 required
+        #  ('other' first so an 'other' transaction is not zeroed)
+        parsed_transaction = {
+            OTHER_MERCHANT: 0,
+            merchant: amount_cents
+        }
+
+        # check if only catch-all rules (Rule 7) are applicable
+        if cls._must_merge_to_other(parsed_transaction, plan.specific_reqs):
+            catch_all_reward, catch_all_used = _solve_catch_all(
+                plan,
+                cls._merge_to_other(parsed_transaction) // plan.unit_cents
+            )
+            # a catch-all rule is reported even when the amount is under $1
+            return (
+                catch_all_reward,
+                tuple(rule_num for rule_num, _ in catch_all_used) or tuple(
+                    rule[0] for rule in plan.catch_all_rules[:1]
+                ),
+                1
+            )
+
+        # iterate over all rules from highest reward to lowest
+        #  return when an applicable rule is reached
+        for rule_num, (points, reqs) in enumerate(plan.rules):
+            num_times_applicable = cls._rule_applicable(
+                parsed_transaction, reqs
+            )   
+            if num_times_applicable:
+                # rules are 0 indexed
+                return (
+                    points * num_times_applicable,
+                    # use rule number num_times_applicable times
+                    (rule_num + 1,),
+                    num_times_applicable
+                )
+
+    @staticmethod
+    def _rule_applicable(
+        transactions: Dict[str, int], 
+        reqs: List[Tuple[str, int]]
+    ) -> int:
+        """
+        Checks how many times Rule with requirements == reqs
+        can be applied
+
+        Args:
+            transactions -- a dict of parsed transactions 
+                          (same format as self._parsed_transactions)
+            reqs -- a list of requirements in cents
+                    (see RulePlan.rules above for format)
+        
+        Returns:
+            int -- number of times rule can be applied
+        """
+        # counts of how many times a req can be applied to a specific
+        #  merchant within transaction
+        number_of_applications = []
+        for merchant, amount in reqs:
+            if merchant not in transactions or \
+               transactions[merchant] < amount:
+                return 0
+            else:
+                number_of_applications.append(
+                    transactions[merchant] // amount
+                )
+        
+        # the max number of times a rule can be applied to a transaction is 
+        #  limited by the number of times a req can be applied to any 
+        #  specific merchant within the transaction
+        return min(number_of_applications)
+    
+    @classmethod
+    def _must_merge_to_other(
+        cls,
+        transactions: Dict[str, int],
+        specific_reqs: List[List[Tuple[str, int]]]
+    ) -> bool:
+        """
+        Checks if none of the rules other than the catch-all rules
+        (Rule 7 for DEFAULT_RULES) can be applied.
+        (if that is the case, then we must merge all merchants
+         into the 'other' category to be used as left over amount)
+
+        Args:
+            transactions -- a dict of parsed transactions 
+                          (same format as self._parsed_transactions)
+            specific_reqs -- requirements of the rules that have a
+                             requirement for a merchant other than OTHER
+        Returns:
+            bool -- whether we need to merge the other merchants 
+                     values into 'other' or not
+        """
+        return not any(
+            cls._rule_applicable(transactions, reqs)
+            for reqs in specific_reqs
+        )
+
+    @staticmethod
+    def _merge_to_other(transactions: Dict[str, int]) -> int:
+        """
+        Merges all remaining transactions into the 'other'
+        category and returns the cents left for the
+        catch-all rules (Rule 7)
+
+        * requires a mechant_code of 'other' to be present in transactions
+
+        Args:
+            transactions -- a dict of parsed transactions 
+                          (same format as self._parsed_transactions)
+        Returns:
+            int -- cents in 'other' after merging
+        """
+        for merchant, amount in transactions.items():
+            if merchant != OTHER_MERCHANT:
+                transactions[OTHER_MERCHANT] += amount
         
-        # using int cast on floats in Python is the same as floor
-        return int(transactions[MerchantCode.OTHER.value])
+        return transactions[OTHER_MERCHANT]
+
+
+class MonthAccumulator:
+    """
+    Incremental alternative to RewardPointsCalculator: transactions are
+    added one at a time (e.g. from transaction_reader) and only the per
+    merchant totals are kept, so month answers are available at any
+    point without holding the raw transactions in memory
+    """
+
+    def __init__(
+        self,
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+        keep_transaction_rewards: bool = True
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            rules -- a list of rules (see DEFAULT_RULES above for format)
+            defined_merchants -- set of known merchant codes
+            keep_transaction_rewards -- score each transaction as it is
+                                        added and keep the results for
+                                        maximum_reward_per_transaction
+                                        (memory then grows per row)
+        """
+        self._plan = compile_rules(rules, defined_merchants)
+        self._merchants = sorted(defined_merchants)
+        self._merchant_index = {
+            merchant: index for index, merchant in enumerate(self._merchants)
+        }
+        self._other_index = self._merchant_index[OTHER_MERCHANT]
+        # cents per merchant, same order as self._merchants
+        self._totals = array("q", [0] * len(self._merchants))
+        self._total_transaction_amount = 0
+        self._transaction_count = 0
+        self._rewards = [] if keep_transaction_rewards else None
+
+    def add(self, transaction: Dict[str, Any]) -> None:
+        """
+        Adds one transaction ({"merchant_code": str, "amount_cents": int})
+        """
+        merchant = transaction["merchant_code"]
+        amount = amount_in_cents(transaction["amount_cents"])
+        self._totals[
+            self._merchant_index.get(merchant, self._other_index)
+        ] += amount
+        self._total_transaction_amount += amount
+        self._transaction_count += 1
+        if self._rewards is not None:
+            self._rewards.append(RewardPointsCalculator._score_transaction(
+                self._plan, merchant, amount
+            ))
+
+    def add_many(self, transactions: Iterable[Dict[str, Any]]) -> None:
+        """Adds every transaction of an iterable, consuming it lazily"""
+        for transaction in transactions:
+            self.add(transaction)
+
+    def add_merchant_totals(
+        self,
+        merchants: List[str],
+        totals: List[int],
+        transaction_count: int
+    ) -> None:
+        """
+        Adds transactions already summed per merchant (eg. by
+        TransactionColumns.merchant_totals)
+
+        Args:
+            merchants -- merchant code of each totals index
+            totals -- cents per merchant, same order as merchants
+            transaction_count -- number of transactions summed
+        """
+        if self._rewards is not None:
+            raise ValueError(
+                "Summed totals have no per transaction rewards to keep"
+            )
+        for merchant, amount in zip(merchants, totals):
+            self._totals[
+                self._merchant_index.get(merchant, self._other_index)
+            ] += amount
+            self._total_transaction_amount += amount
+        self._transaction_count += transaction_count
+
+    def merge(self, other: "MonthAccumulator") -> None:
+        """
+        Adds the transactions of another accumulator (built for the same
+        rule set) to this one; other's per transaction rewards follow
+        this one's
+        """
+        if other._plan.fingerprint != self._plan.fingerprint \
+           or other._merchants != self._merchants:
+            raise ValueError(
+                "Cannot merge accumulators of different rule sets"
+            )
+        if (self._rewards is None) != (other._rewards is None):
+            raise ValueError(
+                "Cannot merge accumulators that differ in keeping rewards"
+            )
+
+        for index, amount in enumerate(other._totals):
+            self._totals[index] += amount
+        self._total_transaction_amount += other._total_transaction_amount
+        self._transaction_count += other._transaction_count
+        if self._rewards is not None:
+            self._rewards.extend(other._rewards)
+
+    @property
+    def transaction_count(self) -> int:
+        """Number of transactions added so far"""
+        return self._transaction_count
+
+    @property
+    def total_transaction_amount(self) -> int:
+        """Cents spent over the transactions added so far"""
+        return self._total_transaction_amount
+
+    @property
+    def parsed_transactions(self) -> Dict[str, int]:
+        """
+        Per merchant totals in cents (same format as
+        RewardPointsCalculator._parsed_transactions)
+        """
+        return dict(zip(self._merchants, self._totals))
+
+    def maximum_reward_for_month(
+        self,
+        expand_rules_used: bool = False
+    ) -> Tuple[int, List[Any]]:
+        """
+        Max reward for the transactions added so far
+        (see RewardPointsCalculator.maximum_reward_for_month)
+        """
+        return RewardPointsCalculator._month_rewards(
+            self._plan,
+            self.parsed_transactions,
+            self._total_transaction_amount,
+            expand_rules_used
+        )
+
+    def total_reward_for_month(self) -> int:
+        """
+        Max reward for the transactions added so far, without rules_used
+        (see RewardPointsCalculator.total_reward_for_month)
+        """
+        return RewardPointsCalculator._month_total(
+            self._plan, self.parsed_transactions,
+            self._total_transaction_amount
+        )
+
+    def maximum_reward_per_transaction(
+        self
+    ) -> List[Tuple[int, Dict[str, List[int]]]]:
+        """
+        Rewards of the transactions added so far, in the order they were
+        added (see RewardPointsCalculator.maximum_reward_per_transaction)
+        """
+        if self._rewards is None:
+            raise ValueError(
+                "Transaction rewards are not kept by this accumulator"
+            )
+        return list(self._rewards)
+
+
+class MonthRescore(NamedTuple):
+    """Result of IncrementalMonth.rescore"""
+    max_reward: int
+    rules_used: List[Any]
+    # max_reward minus the previous rescore's
+    reward_change: int
+    # (rule_num, change in times used) for every rule whose count changed
+    rules_used_diff: List[Tuple[int, int]]
+
+
+class IncrementalMonth:
+    """
+    Month kept up to date under ledger edits: transactions are added,
+    updated and deleted by ID, each edit is an O(1) change to the per
+    merchant totals and rescore only solves the month again when the
+    whole units it depends on changed
+    """
+
+    def __init__(
+        self,
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+        transactions: Dict[str, Dict[str, Any]] = None
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            rules -- a list of rules (see DEFAULT_RULES above for format)
+            defined_merchants -- set of known merchant codes
+            transactions -- initial transactions dict (optional)
+        """
+        self._plan = compile_rules(rules, defined_merchants)
+        self._defined_merchants = defined_merchants
+        self._merchants = sorted(defined_merchants)
+        self._merchant_index = {
+            merchant: index for index, merchant in enumerate(self._merchants)
+        }
+        self._other_index = self._merchant_index[OTHER_MERCHANT]
+        # cents per merchant, same order as self._merchants
+        self._totals = array("q", [0] * len(self._merchants))
+        self._total_transaction_amount = 0
+        # transaction id -> (merchant index, cents)
+        self._transactions = {}
+        # unit vector (see _month_units) -> (max_reward, rules_used)
+        self._solutions = OrderedDict()
+        self._last_solution = (0, [])
+
+        for transaction_id, transaction in (transactions or {}).items():
+            self.add(transaction_id, transaction)
+
+    def add(self, transaction_id: str, transaction: Dict[str, Any]) -> None:
+        """
+        Adds a transaction ({"merchant_code": str, "amount_cents": int})
+
+        Raises:
+            ValueError -- if transaction_id was already added
+        """
+        entry = self._entry(transaction)
+        if transaction_id in self._transactions:
+            raise ValueError(
+                "Transaction %r was already added" % (transaction_id,)
+            )
+        self._replace(transaction_id, entry)
+
+    def update(self, transaction_id: str, transaction: Dict[str, Any]) -> None:
+        """
+        Replaces a transaction (eg. a corrected amount); the month is
+        left as it was if the new transaction is invalid
+
+        Raises:
+            KeyError -- if transaction_id is unknown
+        """
+        entry = self._entry(transaction)
+        if transaction_id not in self._transactions:
+            raise KeyError(transaction_id)
+        self._replace(transaction_id, entry)
+
+    def delete(self, transaction_id: str) -> None:
+        """
+        Removes a transaction (eg. a reversal)
+
+        Raises:
+            KeyError -- if transaction_id is unknown
+        """
+        if transaction_id not in self._transactions:
+            raise KeyError(transaction_id)
+        self._replace(transaction_id, None)
+
+    def apply(
+        self,
+        changes: Iterable[Tuple[str, str, Dict[str, Any]]],
+        expand_rules_used: bool = False
+    ) -> MonthRescore:
+        """
+        Applies a batch of edits and rescores the month once; if an edit
+        fails, the edits before it are undone and its error is raised
+
+        Args:
+            changes -- ("add" | "update" | "delete", transaction_id,
+                        transaction) triples (transaction is ignored
+                        for deletes)
+            expand_rules_used -- return the legacy flat rules_used list
+
+        Returns:
+            MonthRescore -- see rescore
+        """
+        # (transaction_id, entry before the edit) of the edits applied
+        undo = []
+        try:
+            for operation, transaction_id, transaction in changes:
+                previous = self._transactions.get(transaction_id)
+                if operation == "add":
+                    self.add(transaction_id, transaction)
+                elif operation == "update":
+                    self.update(transaction_id, transaction)
+                elif operation == "delete":
+                    self.delete(transaction_id)
+                else:
+                    raise ValueError("Unknown operation %r" % (operation,))
+                undo.append((transaction_id, previous))
+        except Exception:
+            for transaction_id, previous in reversed(undo):
+                self._replace(transaction_id, previous)
+            raise
+        return self.rescore(expand_rules_used)
+
+    def _entry(self, transaction: Dict[str, Any]) -> Tuple[int, int]:
+        """(merchant index, cents) of a transaction, validating it"""
+        index = self._merchant_index.get(
+            transaction["merchant_code"], self._other_index
+        )
+        return index, amount_in_cents(transaction["amount_cents"])
+
+    def _replace(
+        self,
+        transaction_id: str,
+        entry: Optional[Tuple[int, int]]
+    ) -> None:
+        """
+        Sets the (merchant index, cents) of a transaction (None removes
+        it) and moves the totals accordingly
+        """
+        previous = self._transactions.pop(transaction_id, None)
+        if previous is not None:
+            index, amount = previous
+            self._totals[index] -= amount
+            self._total_transaction_amount -= amount
+        if entry is not None:
+            index, amount = entry
+            self._transactions[transaction_id] = entry
+            self._totals[index] += amount
+            self._total_transaction_amount += amount
+
+    @property
+    def transaction_count(self) -> int:
+        """Number of transactions currently in the month"""
+        return len(self._transactions)
+
+    @property
+    def parsed_transactions(self) -> Dict[str, int]:
+        """
+        Per merchant totals in cents (same format as
+        RewardPointsCalculator._parsed_transactions)
+        """
+        return dict(zip(self._merchants, self._totals))
+
+    def rescore(self, expand_rules_used: bool = False) -> MonthRescore:
+        """
+        Max reward for the month as it is now, compared with the result
+        of the previous rescore (the first one compares with an empty
+        month)
+
+        Args:
+            expand_rules_used -- return the legacy flat rules_used list
+
+        Returns:
+            MonthRescore -- (max_reward, rules_used, reward_change,
+                            rules_used_diff)
+        """
+        amounts = _month_units(
+            self._plan, self.parsed_transactions,
+            self._total_transaction_amount
+        )
+        solution = self._solutions.get(amounts)
+        if solution is None:
+            solution = self._solutions[amounts] = _month_solution(
+                self._plan, amounts
+            )
+            if len(self._solutions) > INCREMENTAL_SOLUTION_CACHE_SIZE:
+                self._solutions.popitem(last=False)
+        else:
+            self._solutions.move_to_end(amounts)
+
+        previous_reward, previous_rules_used = self._last_solution
+        self._last_solution = solution
+        reward, rules_used = solution
+
+        changes = dict(rules_used)
+        for rule_num, count in previous_rules_used:
+            changes[rule_num] = changes.get(rule_num, 0) - count
+        rules_used_diff = sorted(
+            (rule_num, change) for rule_num, change in changes.items()
+            if change
+        )
+
+        if expand_rules_used:
+            rules_used = _legacy_rules_used(self._plan, rules_used)
+        else:
+            rules_used = list(rules_used)
+
+        return MonthRescore(
+            reward, rules_used, reward - previous_reward, rules_used_diff
+        )
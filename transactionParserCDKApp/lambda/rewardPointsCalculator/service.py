@@ -0,0 +1,267 @@
+"""
+Asyncio HTTP service for container deployments
+
+Accepts the Lambda request body on POST and answers with the Lambda
+response body. Concurrent requests are micro-batched: a batch is closed
+after max_batch_size requests or max_wait seconds, whichever comes first,
+and scored in one score_bodies pass. Identical bodies in flight at the
+same time are coalesced and computed once
+
+Usage:
+    python -m rewardPointsCalculator.service [--port 8080]
+        [--max-batch-size 64] [--max-wait-ms 5]
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .instrumentation import logger
+from .lambda_handler import CODEC, INTERNAL_ERROR, score_bodies
+from .rewardPointsCalculator import COUNTERS, Timer
+
+DEFAULT_MAX_BATCH_SIZE = 64
+# seconds the first request of a batch waits for others to join
+DEFAULT_MAX_WAIT = 0.005
+# largest accepted request body
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large",
+    500: "Internal Server Error"
+}
+
+
+class BatchingScorer:
+    """
+    Collects concurrently submitted request bodies into batches for
+    score_bodies; results are JSON encoded once per distinct body
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            max_batch_size -- most distinct bodies scored per batch
+            max_wait -- seconds a batch stays open for more bodies
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        # scoring runs off the event loop so connections keep being served
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self._worker = None
+        # body -> future of its (status, encoded response body)
+        self._pending = {}
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0}
+
+    async def score(self, body: str) -> Tuple[int, bytes]:
+        """
+        Scores one request body
+
+        Returns:
+            tuple -- (status code, JSON encoded response body)
+        """
+        self.stats["requests"] += 1
+        future = self._pending.get(body)
+        if future is not None:
+            self.stats["coalesced"] += 1
+        else:
+            if self._worker is None:
+                self._queue = asyncio.Queue()
+                self._worker = asyncio.ensure_future(self._run())
+            future = asyncio.get_running_loop().create_future()
+            self._pending[body] = future
+            self._queue.put_nowait(body)
+        # shield so a client going away does not cancel the shared result
+        return await asyncio.shield(future)
+
+    async def close(self) -> None:
+        """Stops the batching task and the scoring thread"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=True)
+
+    async def _run(self) -> None:
+        """Batching loop: one batch at a time, in arrival order"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats["batches"] += 1
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, _score_batch, batch
+                )
+            except Exception:
+                # score_bodies answers per body, so this is a failure of
+                #  the whole batch; every client still gets a response
+                logger.exception("Scoring a batch failed")
+                failed = (500, CODEC.dumps(INTERNAL_ERROR))
+                for body in batch:
+                    self._pending.pop(body).set_result(failed)
+                continue
+            for body, result in zip(batch, results):
+                self._pending.pop(body).set_result(result)
+
+
+def _score_batch(bodies: List[str]) -> List[Tuple[int, bytes]]:
+    """Scores and encodes a batch (runs in the scoring thread)"""
+    results = score_bodies(bodies)
+    with Timer("json_encode", bodies=len(results), codec=CODEC.name):
+        return [(status, CODEC.dumps(body)) for status, body in results]
+
+
+async def handle_connection(
+    scorer: BatchingScorer,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter
+) -> None:
+    """Serves HTTP/1.1 requests of one (keep-alive) connection"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = await _read_headers(reader)
+            length = int(headers.get("content-length", "0"))
+            keep_alive = headers.get("connection", "").lower() != "close"
+
+            if length > MAX_BODY_BYTES:
+                await _respond(
+                    writer, 413, b'{"message": "Body too large"}', False
+                )
+                break
+            body = await reader.readexactly(length)
+
+            if path == "/health":
+                status, response = 200, b'{"status": "ok"}'
+            elif path == "/metrics":
+                status, response = 200, CODEC.dumps(
+                    {"counters": dict(COUNTERS), "batching": scorer.stats}
+                )
+            elif path != "/":
+                status, response = 404, b'{"message": "Not found"}'
+            elif method != "POST":
+                status, response = 405, b'{"message": "Use POST"}'
+            else:
+                try:
+                    text = body.decode("utf-8")
+                except UnicodeDecodeError:
+                    status, response = 400, b'{"message": "Body is not UTF-8"}'
+                else:
+                    status, response = await scorer.score(text)
+            await _respond(writer, status, response, keep_alive)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    """Reads header lines up to the blank line, names lower cased"""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _respond(
+    writer: asyncio.StreamWriter,
+    status: int,
+    body: bytes,
+    keep_alive: bool
+) -> None:
+    """Writes one JSON response"""
+    head = (
+        "HTTP/1.1 %d %s\r\n"
+        "Content-Type: application/json\r\n"
+        "Content-Length: %d\r\n"
+        "Connection: %s\r\n\r\n"
+    ) % (
+        status, REASONS.get(status, ""), len(body),
+        "keep-alive" if keep_alive else "close"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def start_server(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_wait: float = DEFAULT_MAX_WAIT
+) -> Tuple[asyncio.AbstractServer, BatchingScorer]:
+    """
+    Starts the service on the running event loop (port 0 picks a free
+    port, see server.sockets[0].getsockname())
+
+    Returns:
+        tuple -- (server, scorer)
+    """
+    scorer = BatchingScorer(max_batch_size, max_wait)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(scorer, reader, writer),
+        host, port
+    )
+    return server, scorer
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the reward points calculator over HTTP"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+        help="most distinct request bodies scored per batch"
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000,
+        help="milliseconds a batch stays open for more requests"
+    )
+    args = parser.parse_args(argv)
+
+    async def serve() -> None:
+        server, _ = await start_server(
+            args.host, args.port, args.max_batch_size, args.max_wait_ms / 1000
+        )
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
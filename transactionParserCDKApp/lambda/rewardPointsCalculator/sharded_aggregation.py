@@ -0,0 +1,108 @@
+"""
+Month aggregation of very large statements over a process pool
+
+The rows are split into shards of consecutive rows, each worker sums
+its shard's cents per merchant index (TransactionColumns.merchant_totals,
+a NumPy bincount when installed) and the partial sums are merged with
+merge_merchant_totals. Integer addition is associative, so the result is
+exactly what parse_transactions computes in one pass:
+    calculator = ShardedRewardPointsCalculator(columns, workers=8)
+
+Each shard ships its two int columns to the worker. Memory mapped
+transaction files are not sharded, their totals are stored in the header
+"""
+from array import array
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, MappedTransactionColumns,
+    RewardPointsCalculator, TransactionColumns, _merchant_totals,
+    merge_merchant_totals
+)
+from .worker_pool import pool_map
+
+# rows per shard
+DEFAULT_SHARD_ROWS = 1 << 20
+# fewest rows worth spreading over a process pool
+PARALLEL_MIN_ROWS = 1 << 21
+
+
+def sharded_merchant_totals(
+    columns: TransactionColumns,
+    workers: Optional[int] = None,
+    shard_rows: int = DEFAULT_SHARD_ROWS
+) -> List[int]:
+    """
+    Cents per merchant index of columns, summed per shard in parallel
+
+    Args:
+        columns -- the transactions (TransactionColumns or a
+                   MappedTransactionColumns)
+        workers -- number of worker processes (defaults to cpu count,
+                   1 sums in this process)
+        shard_rows -- rows per shard
+
+    Returns:
+        list -- cents per merchant index, same as columns.merchant_totals()
+    """
+    if shard_rows < 1:
+        raise ValueError("shard_rows must be at least 1")
+    rows = len(columns)
+    if workers == 1 or rows < PARALLEL_MIN_ROWS or rows <= shard_rows \
+       or isinstance(columns, MappedTransactionColumns):
+        return columns.merchant_totals()
+
+    shards = [
+        (start, min(start + shard_rows, rows))
+        for start in range(0, rows, shard_rows)
+    ]
+    return merge_merchant_totals(pool_map(
+        _shard_totals,
+        [
+            (
+                columns.merchant_index[start:stop],
+                columns.amount_cents[start:stop],
+                len(columns.merchants)
+            )
+            for start, stop in shards
+        ],
+        workers=workers
+    ))
+
+
+class ShardedRewardPointsCalculator(RewardPointsCalculator):
+    """
+    RewardPointsCalculator whose parse_transactions aggregates the
+    merchant totals over a process pool (see sharded_merchant_totals)
+    """
+
+    def __init__(
+        self,
+        transactions: Union[Dict[str, Dict[str, Any]], TransactionColumns],
+        rules: List[Dict[str, Any]] = DEFAULT_RULES,
+        defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+        workers: Optional[int] = None,
+        shard_rows: int = DEFAULT_SHARD_ROWS
+    ) -> None:
+        """
+        Constructor
+
+        Args:
+            transactions, rules, defined_merchants -- see
+                RewardPointsCalculator
+            workers -- number of worker processes (defaults to cpu count)
+            shard_rows -- rows per shard
+        """
+        self._workers = workers
+        self._shard_rows = shard_rows
+        super().__init__(transactions, rules, defined_merchants)
+
+    def _sum_merchant_totals(self) -> List[int]:
+        return sharded_merchant_totals(
+            self._transactions, self._workers, self._shard_rows
+        )
+
+
+def _shard_totals(shard: Tuple[array, array, int]) -> List[int]:
+    """Sums one in memory shard (runs in a worker)"""
+    return _merchant_totals(*shard)
@@ -0,0 +1,245 @@
+"""
+What-if simulation of candidate rule sets over historical spend
+
+Every account's month is reduced once to its merchant spend vector,
+identical vectors are merged, and each candidate rule set then only runs
+the month solver on the distinct unit vectors it sees:
+    grid = rule_grid(DEFAULT_RULES, {(4, "Points"): [150, 175, 200]})
+    simulate_rule_sets([rules for _, rules in grid], accounts)
+    # [VariantReport(variant=0, total_points=..., ...), ...]
+"""
+import itertools
+from collections import Counter
+from typing import (
+    Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+)
+
+from .rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, OTHER_MERCHANT,
+    _month_solution, _month_units, amount_in_cents, compile_rules
+)
+from .worker_pool import pool_map, worker_state
+
+# rule set field of a rule_grid change: (rule_num, POINTS) sets the
+#  points, (rule_num, merchant) sets the dollars required of a merchant
+POINTS = "Points"
+# fewest rule sets worth spreading over a process pool
+PARALLEL_MIN_VARIANTS = 4
+# issuer cost of one point, in cents (see VariantReport.cost_cents)
+DEFAULT_CENTS_PER_POINT = 1.0
+
+
+class SpendAggregates(NamedTuple):
+    """
+    Accounts reduced to their distinct month spend vectors
+
+    merchants -- merchant order of the vectors (sorted defined merchants,
+                 unknown merchants counted under 'other')
+    spend -- ((cents per merchant...), number of accounts) pairs
+    accounts -- number of accounts
+    total_spend_cents -- cents spent over every account
+    """
+    merchants: Tuple[str, ...]
+    spend: Tuple[Tuple[Tuple[int, ...], int], ...]
+    accounts: int
+    total_spend_cents: int
+
+
+class VariantReport(NamedTuple):
+    """
+    Aggregate result of one candidate rule set
+
+    variant -- index of the rule set in the grid
+    total_points -- points earned over every account
+    points_change -- total_points minus the first rule set's
+    cost_cents -- total_points at cents_per_point
+    points_per_dollar -- total_points per dollar of spend
+    rewarded_accounts -- accounts earning any points
+    rule_applications -- {rule_num: times applied over every account},
+                         catch-all rules included
+    distinct_months -- unit vectors the solver ran on
+    """
+    variant: int
+    total_points: int
+    points_change: int
+    cost_cents: float
+    points_per_dollar: float
+    rewarded_accounts: int
+    rule_applications: Dict[int, int]
+    distinct_months: int
+
+
+def aggregate_accounts(
+    accounts: Union[Dict[str, Any], Iterable[Dict[str, Dict[str, Any]]]],
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS
+) -> SpendAggregates:
+    """
+    Reduces every account's transactions to its merchant spend vector,
+    shared by all rule sets with these defined merchants
+
+    Args:
+        accounts -- {account_id: transactions} (or an iterable of
+                    transactions dicts), in the request format
+        defined_merchants -- set of known merchant codes
+
+    Returns:
+        SpendAggregates -- distinct spend vectors with account counts
+    """
+    if isinstance(accounts, dict):
+        accounts = accounts.values()
+    merchants = tuple(sorted(defined_merchants))
+    merchant_index = {
+        merchant: index for index, merchant in enumerate(merchants)
+    }
+    other_index = merchant_index[OTHER_MERCHANT]
+
+    spend = Counter()
+    for transactions in accounts:
+        vector = [0] * len(merchants)
+        for transaction in transactions.values():
+            vector[merchant_index.get(
+                transaction["merchant_code"], other_index
+            )] += amount_in_cents(transaction["amount_cents"])
+        spend[tuple(vector)] += 1
+
+    return SpendAggregates(
+        merchants=merchants,
+        spend=tuple(spend.items()),
+        accounts=sum(spend.values()),
+        total_spend_cents=sum(
+            sum(vector) * count for vector, count in spend.items()
+        )
+    )
+
+
+def rule_grid(
+    base_rules: List[Dict[str, Any]] = DEFAULT_RULES,
+    changes: Optional[Dict[Tuple[int, str], List[Any]]] = None
+) -> List[Tuple[Dict[Tuple[int, str], Any], List[Dict[str, Any]]]]:
+    """
+    Every combination of the changes applied to base_rules
+
+    Args:
+        base_rules -- a list of rules (see DEFAULT_RULES for format)
+        changes -- {(rule_num, POINTS or merchant): candidate values},
+                   eg. {(4, POINTS): [150, 175], (1, "sportcheck"): [60]}
+                   (rule_num starts from 1, a merchant not yet required
+                   by the rule is added to it)
+
+    Returns:
+        list -- (applied {change: value}, rules) pairs, the first one
+                being the first value of every change
+    """
+    changes = changes or {}
+    keys = list(changes)
+    grid = []
+    for values in itertools.product(*(changes[key] for key in keys)):
+        rules = [
+            {"Points": rule["Points"], "Reqs": list(rule["Reqs"])}
+            for rule in base_rules
+        ]
+        for (rule_num, field), value in zip(keys, values):
+            rule = rules[rule_num - 1]
+            if field == POINTS:
+                rule["Points"] = value
+                continue
+            reqs = [req for req in rule["Reqs"] if req[0] != field]
+            rule["Reqs"] = reqs + [(field, value)] if value else reqs
+        grid.append((dict(zip(keys, values)), rules))
+    return grid
+
+
+def simulate_rule_sets(
+    rule_sets: List[List[Dict[str, Any]]],
+    accounts: Union[SpendAggregates, Dict[str, Dict[str, Dict[str, Any]]]],
+    defined_merchants: Set[str] = DEFAULT_DEFINED_MERCHANTS,
+    cents_per_point: float = DEFAULT_CENTS_PER_POINT,
+    workers: Optional[int] = None
+) -> List[VariantReport]:
+    """
+    Scores every account's month against each candidate rule set
+
+    Args:
+        rule_sets -- candidate rule sets (see DEFAULT_RULES for format),
+                     the first one is the baseline of points_change
+        accounts -- SpendAggregates, or {account_id: transactions}
+                    aggregated here
+        defined_merchants -- set of known merchant codes
+        cents_per_point -- issuer cost of a point for cost_cents
+        workers -- number of worker processes (defaults to cpu count,
+                   1 solves in this process)
+
+    Returns:
+        list -- a VariantReport per rule set, in input order
+    """
+    if not isinstance(accounts, SpendAggregates):
+        accounts = aggregate_accounts(accounts, defined_merchants)
+    elif set(accounts.merchants) != set(defined_merchants):
+        raise ValueError("Aggregates were built for other defined merchants")
+
+    if workers == 1 or len(rule_sets) < PARALLEL_MIN_VARIANTS:
+        results = [_simulate_variant(rules, accounts) for rules in rule_sets]
+    else:
+        # the aggregates are shipped once per worker, not per rule set
+        results = pool_map(
+            _simulate_worker_variant, rule_sets,
+            workers=workers, state=accounts
+        )
+
+    baseline = results[0][0] if results else 0
+    dollars = accounts.total_spend_cents / 100
+    return [
+        VariantReport(
+            variant=variant,
+            total_points=points,
+            points_change=points - baseline,
+            cost_cents=points * cents_per_point,
+            points_per_dollar=points / dollars if dollars else 0.0,
+            rewarded_accounts=rewarded,
+            rule_applications=applications,
+            distinct_months=distinct
+        )
+        for variant, (points, rewarded, applications, distinct)
+        in enumerate(results)
+    ]
+
+
+def _simulate_variant(
+    rules: List[Dict[str, Any]],
+    accounts: SpendAggregates
+) -> Tuple[int, int, Dict[int, int], int]:
+    """
+    Solves the distinct months of one rule set
+
+    Returns:
+        tuple -- (total points, rewarded accounts, rule applications,
+                  distinct unit vectors)
+    """
+    plan = compile_rules(rules, set(accounts.merchants))
+    # spend vectors differing by less than a unit share a solution
+    units = Counter()
+    for vector, count in accounts.spend:
+        units[_month_units(
+            plan, dict(zip(accounts.merchants, vector)), sum(vector)
+        )] += count
+
+    total_points = 0
+    rewarded = 0
+    applications = Counter()
+    for amounts, count in units.items():
+        reward, rules_used = _month_solution(plan, amounts)
+        total_points += reward * count
+        if reward:
+            rewarded += count
+        for rule_num, times in rules_used:
+            applications[rule_num] += times * count
+    return (
+        total_points, rewarded, dict(sorted(applications.items())), len(units)
+    )
+
+
+def _simulate_worker_variant(
+    rules: List[Dict[str, Any]]
+) -> Tuple[int, int, Dict[int, int], int]:
+    """Solves one rule set (runs in a worker)"""
+    return _simulate_variant(rules, worker_state())
@@ -0,0 +1,132 @@
+import json
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+# characters read from the stream at a time
+READ_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_ndjson_transactions(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Yields transactions from an NDJSON stream, one JSON object per line
+    (blank lines are skipped)
+
+    Args:
+        stream -- text stream of NDJSON transactions
+
+    Returns:
+        iterator of transaction dicts
+    """
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json_transactions(
+    stream: TextIO,
+    options: Optional[Dict[str, Any]] = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Incrementally parses a request body of the form
+    {"transactions": {"T01": {...}, ...}, ...} and yields the
+    transactions one at a time, so only one transaction (plus a read
+    chunk) is held in memory; a repeated transaction id is yielded
+    again, callers wanting json.loads' last value wins keep the last one
+
+    Args:
+        stream -- text stream of the JSON document
+        options -- if given, filled with the other top level keys of the
+                   document (complete once the iterator is exhausted)
+
+    Returns:
+        iterator of (transaction_id, transaction) tuples
+    """
+    reader = _JsonStreamReader(stream)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "transactions":
+            reader.expect("{")
+            if reader.peek() == "}":
+                reader.expect("}")
+            else:
+                while True:
+                    transaction_id = reader.value()
+                    reader.expect(":")
+                    yield transaction_id, reader.value()
+                    if reader.expect(",}") == "}":
+                        break
+        else:
+            value = reader.value()
+            if options is not None:
+                options[key] = value
+
+        if reader.expect(",}") == "}":
+            return
+
+
+class _JsonStreamReader:
+    """Buffered reader decoding one JSON value at a time from a stream"""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads another chunk, returns False at the end of the stream"""
+        if self._eof:
+            return False
+        chunk = self._stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        # drop what has already been consumed
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non whitespace character ('' at the end of the stream)"""
+        while True:
+            while self._pos < len(self._buffer) \
+                  and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def expect(self, allowed: str) -> str:
+        """Consumes the next character, which must be one of allowed"""
+        char = self.peek()
+        if not char or char not in allowed:
+            raise ValueError(
+                "Expected one of {!r} in JSON body, got {!r}".format(
+                    allowed, char
+                )
+            )
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number at the end of the buffer may continue in the
+            #  next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
@@ -0,0 +1,55 @@
+"""
+Process pool shared by the parallel paths (period solving, batch and
+sharded scoring, rule set simulation)
+
+    results = pool_map(solve, periods, workers=8, state=(rules, merchants))
+
+state is shipped once to every worker process instead of with every
+task, and the tasks read it back with worker_state()
+"""
+from typing import Any, Callable, Iterable, List, Optional
+
+# state of the current worker process (see pool_map)
+_worker_state = None
+
+
+def pool_map(
+    function: Callable[..., Any],
+    *iterables: Iterable[Any],
+    workers: Optional[int] = None,
+    state: Any = None,
+    chunksize: int = 1
+) -> List[Any]:
+    """
+    map(function, *iterables) over a process pool
+
+    Args:
+        function -- module level function run in the workers
+        iterables -- its arguments, one iterable per parameter
+        workers -- number of worker processes (defaults to cpu count)
+        state -- value every worker returns from worker_state()
+        chunksize -- tasks handed to a worker at a time
+
+    Returns:
+        list -- the results, in input order
+    """
+    # imported here, multiprocessing is slow to import on a cold start
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(state,)
+    ) as executor:
+        return list(executor.map(function, *iterables, chunksize=chunksize))
+
+
+def worker_state() -> Any:
+    """state given to pool_map, in one of its worker processes"""
+    return _worker_state
+
+
+def _init_worker(state: Any) -> None:
+    """Keeps the pool's state in the worker process"""
+    global _worker_state
+    _worker_state = state
@@ -11,8 +11,33 @@ export class TransactionParserCdkAppStack extends cdk.Stack {
     // Define AWS Lambda resource
     const my_lambda = new lambda.Function(this, 'TransactionHandler', {
       runtime: lambda.Runtime.PYTHON_3_9,
-      code: lambda.Code.fromAsset(__dirname + '/../lambda',),
-      handler: 'rewardPointsCalculator.lambda_handler.handler'
+      code: lambda.Code.fromAsset(__dirname + '/../lambda', {
+        exclude: ['**/__pycache__'],
+        // ship precompiled bytecode, /var/task is read only so Python
+        //  would otherwise compile the sources on every cold start; the
+        //  default rules' reward table is built here too
+        bundling: {
+          image: lambda.Runtime.PYTHON_3_9.bundlingImage,
+          command: [
+            'bash', '-c',
+            'cp -r /asset-input/. /asset-output && ' +
+            'python -m compileall -q --invalidation-mode unchecked-hash /asset-output && ' +
+            'cd /asset-output && python -c "from rewardPointsCalculator.rewardPointsCalculator ' +
+            'import RewardTable, compile_rules; RewardTable.build(compile_rules()).save(\'reward_table.bin\')"'
+          ],
+        },
+      }),
+      handler: 'rewardPointsCalculator.lambda_handler.handler',
+      environment: {
+        // compile the default rule plan during the init phase
+        PRELOAD_RULE_PLAN: '1',
+        // month answers of the default rules, built at bundling
+        REWARD_TABLE_PATH: '/var/task/reward_table.bin',
+        // share of instrumentation events logged as JSON; full request
+        //  payloads are only logged with LOG_PAYLOADS=1
+        LOG_SAMPLE_RATE: '0.01',
+        LOG_PAYLOADS: '0'
+      }
     });
 
     // Defines API Gateway REST API resource backed by our "hello" func
@@ -0,0 +1,9 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the calculator package lives in the Lambda asset directory, the brute
+#  force oracle with the benchmarks
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "lambda"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "benchmarks"))
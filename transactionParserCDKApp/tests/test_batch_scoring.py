@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+
+from rewardPointsCalculator.batch_scoring import (
+    TASKS_PER_WORKER, default_chunk_size, score_accounts, score_shards
+)
+from rewardPointsCalculator.rewardPointsCalculator import (
+    RewardPointsCalculator
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def account_transactions(seed, accounts=5, count=30):
+    rng = random.Random(seed)
+    return [
+        {
+            "account_id": "A%d-%d" % (seed, rng.randrange(accounts)),
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-1000, 9000)
+        }
+        for _ in range(count)
+    ]
+
+
+def expected_results(transactions):
+    accounts = {}
+    for index, transaction in enumerate(transactions):
+        accounts.setdefault(transaction["account_id"], {})["T%d" % index] = \
+            transaction
+    results = []
+    for account_id, account in accounts.items():
+        max_reward, rules_used = \
+            RewardPointsCalculator(account).maximum_reward_for_month()
+        results.append({
+            "account_id": account_id,
+            "transaction_count": len(account),
+            "max_reward": max_reward,
+            "rules_used": [list(rule) for rule in rules_used]
+        })
+    return results
+
+
+def test_score_accounts_matches_the_calculator():
+    transactions = account_transactions(0)
+    results = json.loads(json.dumps(list(score_accounts(transactions))))
+    assert results == expected_results(transactions)
+
+
+def test_score_shards(tmp_path):
+    shard_paths = []
+    shards = [account_transactions(seed) for seed in range(5)]
+    for seed, transactions in enumerate(shards):
+        path = tmp_path / ("shard%d.ndjson" % seed)
+        path.write_text("".join(
+            json.dumps(transaction) + "\n" for transaction in transactions
+        ))
+        shard_paths.append(str(path))
+
+    output_dir = str(tmp_path / "out")
+    written = score_shards(shard_paths, output_dir, workers=2)
+    assert [path.rsplit("/", 1)[1] for path in written] \
+        == ["shard%d.ndjson" % seed for seed in range(5)]
+    for path, transactions in zip(written, shards):
+        with open(path) as output:
+            results = [json.loads(line) for line in output]
+        assert results == expected_results(transactions)
+
+
+@pytest.mark.parametrize("num_shards, workers, chunk_size", [
+    (0, 4, 1),
+    (3, 4, 1),
+    (4 * TASKS_PER_WORKER, 4, 1),
+    (4 * TASKS_PER_WORKER + 1, 4, 2),
+    (1000, 8, 1000 // (8 * TASKS_PER_WORKER) + 1),
+])
+def test_default_chunk_size(num_shards, workers, chunk_size):
+    assert default_chunk_size(num_shards, workers) == chunk_size
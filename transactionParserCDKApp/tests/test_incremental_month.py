@@ -0,0 +1,94 @@
+import pytest
+
+from rewardPointsCalculator.rewardPointsCalculator import (
+    IncrementalMonth, RewardPointsCalculator
+)
+
+
+def transaction(merchant, amount):
+    return {"merchant_code": merchant, "amount_cents": amount}
+
+
+TRANSACTIONS = {
+    "T1": transaction("sportcheck", 7500),
+    "T2": transaction("tim_hortons", 2500),
+    "T3": transaction("subway", 2500),
+    "T4": transaction("unknown", 1000),
+}
+
+
+def month_reward(transactions):
+    return RewardPointsCalculator(transactions).maximum_reward_for_month()
+
+
+def test_edits_match_a_fresh_calculator():
+    month = IncrementalMonth(transactions=TRANSACTIONS)
+    first = month.rescore()
+    assert (first.max_reward, first.rules_used) == month_reward(TRANSACTIONS)
+    assert first.reward_change == first.max_reward
+
+    month.add("T5", transaction("sportcheck", 2000))
+    month.update("T2", transaction("tim_hortons", 3000))
+    month.delete("T4")
+    expected = dict(
+        TRANSACTIONS, T2=transaction("tim_hortons", 3000),
+        T5=transaction("sportcheck", 2000)
+    )
+    del expected["T4"]
+    second = month.rescore()
+    assert (second.max_reward, second.rules_used) == month_reward(expected)
+    assert second.reward_change == second.max_reward - first.max_reward
+    assert month.transaction_count == 4
+    assert month.parsed_transactions["sportcheck"] == 9500
+
+
+def test_add_and_delete_check_the_transaction_id():
+    month = IncrementalMonth(transactions=TRANSACTIONS)
+    with pytest.raises(ValueError):
+        month.add("T1", transaction("subway", 100))
+    with pytest.raises(KeyError):
+        month.delete("T9")
+    with pytest.raises(KeyError):
+        month.update("T9", transaction("subway", 100))
+    assert month.parsed_transactions \
+        == IncrementalMonth(transactions=TRANSACTIONS).parsed_transactions
+
+
+@pytest.mark.parametrize("bad", [
+    {"merchant_code": "subway"},
+    transaction("subway", "100"),
+    transaction("subway", 2.5),
+])
+def test_failing_update_keeps_the_transaction(bad):
+    month = IncrementalMonth(transactions=TRANSACTIONS)
+    totals = month.parsed_transactions
+    with pytest.raises((KeyError, ValueError)):
+        month.update("T1", bad)
+    assert month.transaction_count == len(TRANSACTIONS)
+    assert month.parsed_transactions == totals
+    month.delete("T1")
+
+
+def test_failing_apply_is_rolled_back():
+    month = IncrementalMonth(transactions=TRANSACTIONS)
+    before = month.rescore()
+    totals = month.parsed_transactions
+    with pytest.raises(KeyError):
+        month.apply([
+            ("add", "T5", transaction("subway", 5000)),
+            ("update", "T1", transaction("sportcheck", 100)),
+            ("delete", "T2", None),
+            ("delete", "T9", None),
+        ])
+    assert month.parsed_transactions == totals
+    assert month.transaction_count == len(TRANSACTIONS)
+    with pytest.raises(ValueError):
+        month.apply([("move", "T1", None)])
+
+    rescore = month.apply([
+        ("add", "T5", transaction("subway", 5000)),
+        ("delete", "T5", None),
+    ])
+    assert rescore.max_reward == before.max_reward
+    assert rescore.reward_change == 0
+    assert rescore.rules_used_diff == []
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+from rewardPointsCalculator import lambda_handler, service
+from rewardPointsCalculator.json_codec import get_codec
+
+
+def transaction(merchant, amount, date="2021-05-01"):
+    return {"date": date, "merchant_code": merchant, "amount_cents": amount}
+
+
+def request_body(transactions, **options):
+    return json.dumps(dict(options, transactions=transactions))
+
+
+def handle(body):
+    response = lambda_handler.handler({"body": body}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+@pytest.mark.parametrize("body", [
+    '{"transactions": {"T1": 5}}',
+    '{"transactions": {"T1": "sportcheck"}}',
+    '{"transactions": {"T1": [1, 2]}}',
+    '{"transactions": [1]}',
+    '[1]',
+    '',
+    '{"transactions": {"T1": {"merchant_code": "sportcheck"}}}',
+    '{"transactions": {"T1": {"merchant_code": 5, "amount_cents": 1}}}',
+    '{"transactions": {"T1": {"merchant_code": "sportcheck", '
+    '"amount_cents": "2500"}}}',
+    '{"transactions": {"T1": {"merchant_code": "sportcheck", '
+    '"amount_cents": 2500.5}}}',
+    '{"transactions": {"T1": {"merchant_code": "sportcheck", '
+    '"amount_cents": true}}}',
+    '{"transactions": {"T1": {"merchant_code": "sportcheck", '
+    '"amount_cents": 100000000000000000000}}}',
+    request_body({"T1": transaction("subway", 5)}, period="week"),
+])
+def test_malformed_body_is_rejected(body):
+    status, response = handle(body)
+    assert status == 400
+    assert "message" in response
+
+
+def test_malformed_body_does_not_fail_its_batch():
+    good = request_body({"T1": transaction("sportcheck", 2500)})
+    results = lambda_handler.score_bodies(
+        ['{"transactions": {"T1": 5}}', good]
+    )
+    assert [status for status, _ in results] == [400, 200]
+
+
+def test_bodies_are_scored_alone_when_the_batch_fails(monkeypatch):
+    score_rows = lambda_handler._score_rows
+    calls = []
+
+    def fail_batch(plan, columns, explain):
+        calls.append(len(columns))
+        if len(calls) == 1:
+            raise RuntimeError("batch pass failed")
+        return score_rows(plan, columns, explain)
+
+    bodies = [
+        request_body({"T1": transaction("sportcheck", 2500)}),
+        request_body({"T1": transaction("subway", 7500)})
+    ]
+    expected = lambda_handler.score_bodies(bodies)
+    monkeypatch.setattr(lambda_handler, "_score_rows", fail_batch)
+    assert lambda_handler.score_bodies(bodies) == expected
+    assert calls == [2, 1, 1]
+
+
+def test_handler_answers_500_when_scoring_fails(monkeypatch):
+    def fail(bodies):
+        raise RuntimeError("scoring failed")
+
+    monkeypatch.setattr(lambda_handler, "score_bodies", fail)
+    assert handle(request_body({})) == (500, lambda_handler.INTERNAL_ERROR)
+
+
+def test_service_answers_500_when_scoring_fails(monkeypatch):
+    def fail(bodies):
+        raise RuntimeError("scoring failed")
+
+    async def post(body):
+        server, scorer = await service.start_server(port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = body.encode()
+        writer.write(
+            b"POST / HTTP/1.1\r\nContent-Length: %d\r\n"
+            b"Connection: close\r\n\r\n" % len(data) + data
+        )
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        await scorer.close()
+        return response
+
+    monkeypatch.setattr(service, "score_bodies", fail)
+    response = asyncio.run(post(request_body({})))
+    assert response.startswith(b"HTTP/1.1 500 Internal Server Error\r\n")
+    assert response.endswith(b'{"message":"Internal server error"}')
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson"])
+def test_repeated_id_keeps_its_last_value(monkeypatch, codec):
+    if codec == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(lambda_handler, "CODEC", get_codec(codec))
+    body = (
+        '{"transactions": {'
+        '"T1": {"merchant_code": "sportcheck", "amount_cents": 2500}, '
+        '"T2": {"merchant_code": "subway", "amount_cents": 1000}, '
+        '"T1": {"merchant_code": "tim_hortons", "amount_cents": 4000}'
+        '}, "period": "month"}'
+    )
+    status, response = handle(body)
+    assert status == 200
+    # what json.loads makes of the body
+    assert response == handle(request_body(
+        json.loads(body)["transactions"], period="month"
+    ))[1]
+    assert [points for points, _ in response["max_reward_per_transaction"]] \
+        == [40, 10]
+    assert response["rewards_by_period"][0]["transaction_count"] == 2
+
+
+def test_whole_number_float_amounts_are_accepted():
+    assert handle(request_body({"T1": transaction("sportcheck", 2500.0)})) \
+        == handle(request_body({"T1": transaction("sportcheck", 2500)}))
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from rewardPointsCalculator import lambda_handler
+from rewardPointsCalculator.merchant_registry import (
+    MerchantRegistry, RegistryFile, normalize_merchant
+)
+from rewardPointsCalculator.rewardPointsCalculator import (
+    RewardPointsCalculator, TransactionColumns
+)
+
+
+@pytest.mark.parametrize("raw, code", [
+    ("sportcheck", "sportcheck"),
+    ("SPORTCHEK #123", "sportcheck"),
+    ("Sport Chek", "sportcheck"),
+    ("Tim Hortons #0442", "tim_hortons"),
+    ("TIM HORTON'S 12", "tim_hortons"),
+    ("tims", "tim_hortons"),
+    ("SUBWAY 1234 TORONTO ON", "subway"),
+    ("Timbits Bakery", "Timbits Bakery"),
+    ("", ""),
+    (5, 5),
+])
+def test_default_registry(raw, code):
+    assert MerchantRegistry().canonical(raw) == code
+
+
+def test_normalize_merchant():
+    assert normalize_merchant("Tim Hortons 0442") == "tim_hortons"
+    assert normalize_merchant("  McDonald's #12 ") == "mcdonalds"
+
+
+def test_longest_prefix_wins():
+    registry = MerchantRegistry({
+        "subway": {"prefixes": ["subway"]},
+        "subway_station": {"prefixes": ["subway station"]},
+    })
+    assert registry.canonical("SUBWAY 99 KING ST") == "subway"
+    assert registry.canonical("Subway Station Parking") == "subway_station"
+
+
+def test_canonicalize_and_remap_columns():
+    registry = MerchantRegistry()
+    transactions = {
+        "T1": {"merchant_code": "SPORTCHEK #1", "amount_cents": 7500},
+        "T2": {"merchant_code": "Tim Hortons #2", "amount_cents": 2500},
+        "T3": {"merchant_code": "SPORTCHEK #3", "amount_cents": 2500},
+        "T4": {"merchant_code": "Corner Store", "amount_cents": 100},
+    }
+    canonical = registry.canonicalize(transactions)
+    assert [t["merchant_code"] for t in canonical.values()] \
+        == ["sportcheck", "tim_hortons", "sportcheck", "Corner Store"]
+    # the input is not modified
+    assert transactions["T1"]["merchant_code"] == "SPORTCHEK #1"
+
+    remapped = registry.remap_columns(
+        TransactionColumns.from_dict(transactions)
+    )
+    assert remapped.merchants == ["sportcheck", "tim_hortons", "Corner Store"]
+    assert list(remapped.merchant_index) == [0, 1, 0, 2]
+    assert list(remapped.transaction_ids) == list(transactions)
+    assert RewardPointsCalculator(remapped).maximum_reward_for_month() \
+        == RewardPointsCalculator(canonical).maximum_reward_for_month()
+
+
+def test_registry_file_reloads_on_change(tmp_path):
+    path = tmp_path / "merchants.json"
+    path.write_text(json.dumps({"merchants": {"subway": {}}}))
+    registry_file = RegistryFile(str(path))
+    assert registry_file.registry().canonical("tims") == "tims"
+
+    path.write_text(json.dumps({"merchants": {
+        "tim_hortons": {"aliases": ["tims"]}
+    }}))
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert registry_file.registry().canonical("tims") == "tim_hortons"
+
+    path.write_text("{}")
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    with pytest.raises(ValueError):
+        registry_file.registry()
+
+
+def test_lambda_applies_the_registry(monkeypatch, tmp_path):
+    path = tmp_path / "merchants.json"
+    path.write_text(json.dumps({"merchants": {
+        "sportcheck": {"prefixes": ["sportchek"]}, "other": {}
+    }}))
+    monkeypatch.setattr(
+        lambda_handler, "MERCHANT_REGISTRY", RegistryFile(str(path))
+    )
+    body = json.dumps({"transactions": {
+        "T1": {"merchant_code": "SPORTCHEK 12", "amount_cents": 2000}
+    }})
+    response = lambda_handler.handler({"body": body}, None)
+    assert json.loads(response["body"])["rewards_for_month"]["max_reward"] \
+        == 75
@@ -0,0 +1,116 @@
+import random
+import time
+
+import pytest
+
+from oracle import brute_force_month
+from rewardPointsCalculator.reference_solver import (
+    check_month, random_rule_set, reference_month_reward, verify_month_solver
+)
+from rewardPointsCalculator.rewardPointsCalculator import (
+    DEFAULT_DEFINED_MERCHANTS, DEFAULT_RULES, RewardPointsCalculator,
+    compile_rules
+)
+
+# a random rule set on which the LP bulk used to cut off the optimum
+LP_BULK_RULES = [
+    {"Points": 393, "Reqs": [["sportcheck", 75]]},
+    {"Points": 64, "Reqs": [["tim_hortons", 25], ["sportcheck", 20]]},
+    {"Points": 222, "Reqs": [["subway", 10], ["tim_hortons", 75]]},
+    {"Points": 457, "Reqs": [["subway", 10]]},
+    {"Points": 485, "Reqs": [["subway", 10], ["sportcheck", 5]]},
+    {"Points": 255, "Reqs": [
+        ["subway", 25], ["sportcheck", 40], ["tim_hortons", 25]
+    ]},
+    {"Points": 1, "Reqs": [["other", 1]]},
+]
+LP_BULK_MONTH = {
+    "sportcheck": 2944859, "subway": 1683102, "tim_hortons": 0,
+    "other": 847911
+}
+
+
+def test_lp_bulk_regression():
+    calculator = RewardPointsCalculator(
+        {
+            "T%d" % index: {"merchant_code": merchant, "amount_cents": amount}
+            for index, (merchant, amount) in enumerate(LP_BULK_MONTH.items())
+        },
+        rules=LP_BULK_RULES
+    )
+    max_reward, rules_used = calculator.maximum_reward_for_month()
+    assert max_reward == 934919
+    assert [rule for rule in rules_used if rule[0] != 7] == \
+        [(1, 281), (4, 9), (5, 1674)]
+    assert check_month(LP_BULK_MONTH, LP_BULK_RULES) is None
+
+
+# a rule earning less than the catch-all rate, which the LP bulk leaves
+#  at 0, used to be searched over the whole sportcheck spend
+BELOW_RATE_RULES = [
+    {"Points": 900, "Reqs": [["sportcheck", 3], ["tim_hortons", 2]]},
+    {"Points": 1, "Reqs": [["sportcheck", 1]]},
+    {"Points": 6, "Reqs": [["other", 5]]},
+]
+
+
+@pytest.mark.parametrize("month", [
+    {"sportcheck": 100000000},
+    {"sportcheck": 1000000000},
+    {"sportcheck": 100000000, "tim_hortons": 200000},
+])
+def test_below_rate_rule_regression(month):
+    month = dict(dict.fromkeys(DEFAULT_DEFINED_MERCHANTS, 0), **month)
+    plan = compile_rules(BELOW_RATE_RULES)
+    started = time.perf_counter()
+    reward, _ = RewardPointsCalculator._month_rewards(
+        plan, month, sum(month.values())
+    )
+    assert time.perf_counter() - started < 1
+    assert reward == reference_month_reward(month, BELOW_RATE_RULES)[0]
+
+
+SAMPLE_TRANSACTIONS = {
+    "T01": {"merchant_code": "sportcheck", "amount_cents": 21000},
+    "T02": {"merchant_code": "sportcheck", "amount_cents": 8700},
+    "T03": {"merchant_code": "tim_hortons", "amount_cents": 323},
+    "T04": {"merchant_code": "tim_hortons", "amount_cents": 1267},
+    "T05": {"merchant_code": "tim_hortons", "amount_cents": 2116},
+    "T06": {"merchant_code": "tim_hortons", "amount_cents": 2211},
+    "T07": {"merchant_code": "subway", "amount_cents": 1853},
+    "T08": {"merchant_code": "subway", "amount_cents": 2153},
+    "T09": {"merchant_code": "sportcheck", "amount_cents": 7326},
+    "T10": {"merchant_code": "tim_hortons", "amount_cents": 1321},
+}
+
+
+def test_catch_all_count_is_reported():
+    calculator = RewardPointsCalculator(SAMPLE_TRANSACTIONS)
+    assert calculator.maximum_reward_for_month() == \
+        (1677, [(1, 1), (4, 1), (6, 13), (7, 52)])
+    # the legacy flat list still names Rule 7 once
+    assert calculator.maximum_reward_for_month(expand_rules_used=True) == \
+        (1677, [1, 4] + [6] * 13 + [7])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_brute_force_oracle(seed):
+    rng = random.Random(seed)
+    rules = DEFAULT_RULES if seed == 0 else random_rule_set(rng)
+    plan = compile_rules(rules)
+    for _ in range(40):
+        # small spends keep the oracle's exhaustive search fast
+        month = {
+            merchant: rng.randint(0, 30000)
+            for merchant in sorted(DEFAULT_DEFINED_MERCHANTS)
+        }
+        total = sum(month.values())
+        reward, _ = RewardPointsCalculator._month_rewards(plan, month, total)
+        assert reward == brute_force_month(month, rules), month
+
+
+@pytest.mark.parametrize("seed", [3, 7, 11])
+def test_matches_reference_solver(seed):
+    rules = random_rule_set(random.Random(seed))
+    assert verify_month_solver(rules, trials=15, seed=seed) == []
+    assert verify_month_solver(trials=5, seed=seed) == []
@@ -0,0 +1,111 @@
+import json
+import random
+from datetime import date
+
+import pytest
+
+from rewardPointsCalculator import lambda_handler, period_scoring
+from rewardPointsCalculator.period_scoring import (
+    PERIOD_MONTH, UNDATED_PERIOD, PeriodIndex, period_key
+)
+from rewardPointsCalculator.rewardPointsCalculator import (
+    RewardPointsCalculator, TransactionColumns
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def random_transactions(seed, count=400):
+    rng = random.Random(seed)
+    transactions = {}
+    for index in range(count):
+        day = date(2021, 1, 1).toordinal() + rng.randrange(120)
+        transactions["T%d" % index] = {
+            # some rows are undated or carry a date that does not parse
+            "date": rng.choice([None, "2021-13-40"]) if rng.random() < 0.1
+            else date.fromordinal(day).isoformat(),
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-1000, 9000)
+        }
+    return transactions
+
+
+def expected_periods(transactions, period, anchor=1):
+    grouped = {}
+    for transaction_id, transaction in transactions.items():
+        try:
+            ordinal = date.fromisoformat(transaction["date"]).toordinal()
+        except (TypeError, ValueError):
+            ordinal = 0
+        key = period_key(ordinal, period, anchor)
+        grouped.setdefault((not ordinal, key), {})[transaction_id] = \
+            transaction
+    breakdown = []
+    for (_, key), period_transactions in sorted(grouped.items()):
+        max_reward, rules_used = RewardPointsCalculator(
+            period_transactions
+        ).maximum_reward_for_month()
+        breakdown.append({
+            "period": key,
+            "transaction_count": len(period_transactions),
+            "max_reward": max_reward,
+            "rules_used": rules_used
+        })
+    return breakdown
+
+
+def test_period_key():
+    may_5 = date(2021, 5, 5).toordinal()
+    assert period_key(may_5) == "2021-05"
+    # 7 day windows are Monday weeks by default
+    assert period_key(may_5, 7) == "2021-05-03"
+    assert period_key(may_5, 7, date(2021, 5, 5).toordinal()) == "2021-05-05"
+    assert period_key(may_5, 1) == "2021-05-05"
+    assert period_key(0, 7) == UNDATED_PERIOD
+    for period in ("week", 0, -7, True, 1.5):
+        with pytest.raises(ValueError):
+            period_key(may_5, period)
+
+
+@pytest.mark.parametrize("seed, period, anchor", [
+    (0, PERIOD_MONTH, 1), (1, 7, 1), (2, 10, date(2021, 1, 4).toordinal())
+])
+def test_periods_match_the_calculator(seed, period, anchor):
+    transactions = random_transactions(seed)
+    expected = expected_periods(transactions, period, anchor)
+
+    index = PeriodIndex()
+    index.add_many(transactions.values())
+    assert index.solve(period, anchor) == expected
+
+    columns = TransactionColumns.from_dict(transactions)
+    index = PeriodIndex()
+    index.add_columns(columns, 0, 150)
+    index.add_columns(columns, 150)
+    assert index.solve(period, anchor) == expected
+    assert index.total.maximum_reward_for_month() \
+        == RewardPointsCalculator(transactions).maximum_reward_for_month()
+
+
+def test_periods_over_a_pool(monkeypatch):
+    monkeypatch.setattr(period_scoring, "PARALLEL_MIN_PERIODS", 2)
+    transactions = random_transactions(2)
+    index = PeriodIndex()
+    index.add_many(transactions.values())
+    assert index.solve(3, workers=2) == index.solve(3, workers=1)
+    assert [period["period"] for period in index.solve(3, explain=False)] \
+        == [period["period"] for period in expected_periods(transactions, 3)]
+
+
+def test_handler_periods():
+    transactions = random_transactions(3, count=60)
+    body = json.dumps({
+        "transactions": transactions, "period": 7,
+        "period_start": "2021-01-06"
+    })
+    response = lambda_handler.handler({"body": body}, None)
+    assert response["statusCode"] == 200
+    rewards_by_period = json.loads(response["body"])["rewards_by_period"]
+    assert rewards_by_period == json.loads(json.dumps(expected_periods(
+        transactions, 7, date(2021, 1, 6).toordinal()
+    )))
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from rewardPointsCalculator import lambda_handler
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator.rewardPointsCalculator import (
+    TRANSACTION_REWARD_CACHE, VECTORIZE_MIN_TRANSACTIONS,
+    RewardPointsCalculator
+)
+
+
+def calculator(*transactions):
+    return RewardPointsCalculator({
+        "T%d" % index: {"merchant_code": merchant, "amount_cents": amount}
+        for index, (merchant, amount) in enumerate(transactions)
+    })
+
+
+@pytest.mark.parametrize("merchant", ["sportcheck", "subway", "other"])
+def test_refund_earns_nothing(merchant):
+    refund = calculator((merchant, -500))
+    assert refund.maximum_reward_per_transaction() \
+        == [(0, {"rules_used": [7]})]
+    assert refund.maximum_reward_for_month() == (0, [])
+    assert refund.total_reward_for_month() == 0
+
+
+def test_refunds_net_against_spend():
+    # the refund at 'other' leaves no pooled total for sportcheck's rules
+    assert calculator(
+        ("sportcheck", 10000), ("other", -20000)
+    ).maximum_reward_for_month() == (0, [])
+    # a net refund at sportcheck still leaves the pool to Rule 7
+    assert calculator(
+        ("sportcheck", -5000), ("other", 20000)
+    ).total_reward_for_month() == 150
+
+
+def test_vectorized_refunds_match(monkeypatch):
+    pytest.importorskip("numpy")
+    transactions = [
+        (
+            ("sportcheck", "subway", "other")[row % 3],
+            (row * 7919) % 20000 - 10000
+        )
+        for row in range(VECTORIZE_MIN_TRANSACTIONS)
+    ]
+    vectorized = calculator(*transactions).maximum_reward_per_transaction()
+
+    monkeypatch.setattr(calculator_module, "_numpy", None)
+    TRANSACTION_REWARD_CACHE.clear()
+    assert calculator(*transactions).maximum_reward_per_transaction() \
+        == vectorized
+    assert min(points for points, _ in vectorized) == 0
+
+
+def test_handler_scores_refunds():
+    response = lambda_handler.handler({"body": json.dumps({"transactions": {
+        "T1": {"merchant_code": "sportcheck", "amount_cents": -500},
+        "T2": {"merchant_code": "other", "amount_cents": -100}
+    }})}, None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {
+        "max_reward_per_transaction": [
+            [0, {"rules_used": [7]}], [0, {"rules_used": [7]}]
+        ],
+        "rewards_for_month": {"max_reward": 0, "rules_used": []}
+    }
@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+
+from rewardPointsCalculator import lambda_handler
+from rewardPointsCalculator.merchant_registry import MerchantRegistry
+from rewardPointsCalculator.response_stream import RewardStream
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+class StaticRegistryFile:
+    def __init__(self, registry):
+        self._registry = registry
+
+    def registry(self):
+        return self._registry
+
+
+def random_transactions(seed, count=300):
+    rng = random.Random(seed)
+    return {
+        "T%d" % index: {
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-1000, 9000)
+        }
+        for index in range(count)
+    }
+
+
+def lambda_body(transactions, **options):
+    response = lambda_handler.handler({
+        "body": json.dumps(dict(options, transactions=transactions))
+    }, None)
+    assert response["statusCode"] == 200
+    return response["body"].encode()
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1000])
+@pytest.mark.parametrize("explain", [True, False])
+def test_json_matches_the_lambda_body(chunk_rows, explain):
+    transactions = random_transactions(chunk_rows)
+    stream = RewardStream(
+        explain=explain, chunk_rows=chunk_rows, codec=lambda_handler.CODEC
+    )
+    assert b"".join(stream.iter_json(transactions.items())) \
+        == lambda_body(transactions, explain=explain)
+
+
+def test_registry_maps_merchants_as_the_lambda_does(monkeypatch):
+    registry = MerchantRegistry()
+    monkeypatch.setattr(
+        lambda_handler, "MERCHANT_REGISTRY", StaticRegistryFile(registry)
+    )
+    transactions = {
+        "T1": {"merchant_code": "SPORTCHEK #123", "amount_cents": 7500},
+        "T2": {"merchant_code": "Tim Hortons #0442", "amount_cents": 2500},
+        "T3": {"merchant_code": "SUBWAY 1234", "amount_cents": 2500},
+    }
+    stream = RewardStream(registry=registry, codec=lambda_handler.CODEC)
+    output = b"".join(stream.iter_json(transactions.items()))
+    assert output == lambda_body(transactions)
+    assert json.loads(output)["rewards_for_month"]["max_reward"] == 500
+    # the caller's transactions are left as they were
+    assert transactions["T1"]["merchant_code"] == "SPORTCHEK #123"
+
+
+def test_repeated_id_is_scored_per_occurrence():
+    rows = [
+        ("T1", {"merchant_code": "sportcheck", "amount_cents": 2500}),
+        ("T1", {"merchant_code": "tim_hortons", "amount_cents": 4000}),
+    ]
+    repeated = b"".join(RewardStream().iter_ndjson(rows)).splitlines()
+    distinct = b"".join(RewardStream().iter_ndjson(
+        [("T1", rows[0][1]), ("T2", rows[1][1])]
+    )).splitlines()
+    assert repeated[0] == distinct[0]
+    assert repeated[1] == distinct[1].replace(b'"T2"', b'"T1"')
+    assert repeated[2] == distinct[2]
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator.rewardPointsCalculator import (
+    VECTORIZE_MIN_TRANSACTIONS, RewardPointsCalculator
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def random_transactions(seed, count=VECTORIZE_MIN_TRANSACTIONS + 300):
+    rng = random.Random(seed)
+    return {
+        "T%d" % index: {
+            "merchant_code": rng.choice(MERCHANTS),
+            # few distinct amounts, so there are plenty of ties
+            "amount_cents": rng.choice([-500, 900, 2000, 2500, 7500, 10000])
+        }
+        for index in range(count)
+    }
+
+
+def expected_rewards(transactions, calculator):
+    return [
+        (transaction_id, points)
+        for transaction_id, (points, _) in zip(
+            transactions, calculator.maximum_reward_per_transaction()
+        )
+    ]
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+@pytest.mark.parametrize("k", [0, 1, 5, 400, 5000])
+def test_top_transactions(monkeypatch, with_numpy, k):
+    if with_numpy:
+        pytest.importorskip("numpy")
+        # several chunks, so the chunk cutoffs are exercised
+        monkeypatch.setattr(calculator_module, "QUERY_CHUNK_ROWS", 97)
+    else:
+        monkeypatch.setattr(calculator_module, "_numpy", None)
+    transactions = random_transactions(k)
+    calculator = RewardPointsCalculator(transactions)
+    rewards = expected_rewards(transactions, calculator)
+    # highest reward first, ties in transaction order
+    expected = sorted(rewards, key=lambda reward: -reward[1])[:max(k, 0)]
+    assert calculator.top_transactions(k) == expected
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+@pytest.mark.parametrize("min_points", [-1, 0, 75, 200, 10 ** 6])
+def test_transactions_with_reward_at_least(
+    monkeypatch, with_numpy, min_points
+):
+    if with_numpy:
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(calculator_module, "QUERY_CHUNK_ROWS", 97)
+    else:
+        monkeypatch.setattr(calculator_module, "_numpy", None)
+    transactions = random_transactions(min_points)
+    calculator = RewardPointsCalculator(transactions)
+    assert list(calculator.transactions_with_reward_at_least(min_points)) == [
+        reward for reward in expected_rewards(transactions, calculator)
+        if reward[1] >= min_points
+    ]
+
+
+def test_queries_read_stored_rewards(tmp_path):
+    calculator = RewardPointsCalculator(random_transactions(1))
+    path = str(tmp_path / "month.cols")
+    calculator.save(path)
+    mapped = RewardPointsCalculator.from_file(path)
+    assert mapped.top_transactions(20) == calculator.top_transactions(20)
+    assert list(mapped.transactions_with_reward_at_least(100)) \
+        == list(calculator.transactions_with_reward_at_least(100))
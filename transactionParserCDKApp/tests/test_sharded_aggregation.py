@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator import sharded_aggregation
+from rewardPointsCalculator.rewardPointsCalculator import (
+    RewardPointsCalculator, TransactionColumns, merge_merchant_totals
+)
+from rewardPointsCalculator.sharded_aggregation import (
+    ShardedRewardPointsCalculator, sharded_merchant_totals
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def random_columns(seed, count=2000, max_amount=9000):
+    rng = random.Random(seed)
+    return TransactionColumns.from_dict({
+        "T%d" % index: {
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-max_amount // 10, max_amount)
+        }
+        for index in range(count)
+    })
+
+
+def loop_totals(columns):
+    totals = [0] * len(columns.merchants)
+    for index, amount in zip(columns.merchant_index, columns.amount_cents):
+        totals[index] += amount
+    return totals
+
+
+def test_merge_merchant_totals():
+    assert merge_merchant_totals([]) == []
+    assert merge_merchant_totals([[1, 2], [3], [0, 0, 5]]) == [4, 2, 5]
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+# the largest amount makes the NumPy sums fall back to the integer loop
+@pytest.mark.parametrize("max_amount", [9000, 2 ** 52])
+def test_row_range_totals_add_up(monkeypatch, with_numpy, max_amount):
+    if not with_numpy:
+        monkeypatch.setattr(calculator_module, "_numpy", None)
+    columns = random_columns(max_amount % 7, max_amount=max_amount)
+    expected = loop_totals(columns)
+    assert columns.merchant_totals() == expected
+    cuts = [0, 1, 333, 1000, 1999, 2000]
+    assert merge_merchant_totals(
+        columns.merchant_totals(start, stop)
+        for start, stop in zip(cuts, cuts[1:])
+    ) == expected
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sharded_totals_match_one_pass(monkeypatch, workers):
+    monkeypatch.setattr(sharded_aggregation, "PARALLEL_MIN_ROWS", 1)
+    columns = random_columns(workers)
+    assert sharded_merchant_totals(columns, workers, shard_rows=300) \
+        == loop_totals(columns)
+    with pytest.raises(ValueError):
+        sharded_merchant_totals(columns, workers, shard_rows=0)
+
+
+def test_sharded_calculator_matches_the_calculator(monkeypatch):
+    monkeypatch.setattr(sharded_aggregation, "PARALLEL_MIN_ROWS", 1)
+    columns = random_columns(3)
+    sharded = ShardedRewardPointsCalculator(columns, workers=2, shard_rows=250)
+    assert sharded.maximum_reward_for_month() \
+        == RewardPointsCalculator(columns).maximum_reward_for_month()
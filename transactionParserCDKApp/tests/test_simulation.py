@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+from rewardPointsCalculator.rewardPointsCalculator import (
+    DEFAULT_RULES, RewardPointsCalculator
+)
+from rewardPointsCalculator.simulation import (
+    POINTS, aggregate_accounts, rule_grid, simulate_rule_sets
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def random_accounts(seed, count=40):
+    rng = random.Random(seed)
+    accounts = {}
+    for account in range(count):
+        accounts["A%d" % account] = {
+            "T%d" % index: {
+                "merchant_code": rng.choice(MERCHANTS),
+                "amount_cents": rng.choice([2500, 5000, 7500, 1000, -500])
+            }
+            for index in range(rng.randint(0, 6))
+        }
+    return accounts
+
+
+def test_aggregate_accounts_merges_identical_months():
+    accounts = {
+        "A1": {"T1": {"merchant_code": "subway", "amount_cents": 2500}},
+        "A2": {"T9": {"merchant_code": "subway", "amount_cents": 2500}},
+        "A3": {"T1": {"merchant_code": "unknown", "amount_cents": 100}},
+    }
+    aggregates = aggregate_accounts(accounts)
+    assert aggregates.accounts == 3
+    assert aggregates.total_spend_cents == 5100
+    assert sorted(count for _, count in aggregates.spend) == [1, 2]
+    other = aggregates.merchants.index("other")
+    assert any(vector[other] == 100 for vector, _ in aggregates.spend)
+
+
+def test_rule_grid():
+    grid = rule_grid(DEFAULT_RULES, {
+        (4, POINTS): [150, 175], (3, "subway"): [0, 10]
+    })
+    assert len(grid) == 4
+    assert grid[0][0] == {(4, POINTS): 150, (3, "subway"): 0}
+    assert grid[0][1][3]["Points"] == 150
+    assert grid[0][1][2]["Reqs"] == DEFAULT_RULES[2]["Reqs"]
+    assert grid[-1][1][3]["Points"] == 175
+    assert ("subway", 10) in grid[-1][1][2]["Reqs"]
+    # the base rules are left alone
+    assert DEFAULT_RULES[3]["Points"] == 150
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_simulation_matches_the_calculator(workers):
+    accounts = random_accounts(workers)
+    rule_sets = [rules for _, rules in rule_grid(DEFAULT_RULES, {
+        (4, POINTS): [150, 175, 200, 300]
+    })]
+    reports = simulate_rule_sets(rule_sets, accounts, workers=workers)
+    assert [report.variant for report in reports] == [0, 1, 2, 3]
+
+    for report, rules in zip(reports, rule_sets):
+        total = 0
+        rewarded = 0
+        applications = Counter()
+        for transactions in accounts.values():
+            reward, rules_used = RewardPointsCalculator(
+                transactions, rules=rules
+            ).maximum_reward_for_month()
+            total += reward
+            rewarded += bool(reward)
+            for rule_num, times in rules_used:
+                applications[rule_num] += times
+        assert report.total_points == total
+        assert report.points_change == total - reports[0].total_points
+        assert report.rewarded_accounts == rewarded
+        # catch-all rules count their real applications too
+        assert report.rule_applications == dict(sorted(applications.items()))
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator.rewardPointsCalculator import (
+    MappedTransactionColumns, RewardPointsCalculator, RewardTable,
+    TransactionColumns, _month_units, _solve_month, compile_rules,
+    install_reward_table, write_transaction_file
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+
+
+def random_transactions(seed, count=200):
+    rng = random.Random(seed)
+    return {
+        "T%d" % index: {
+            "date": "2021-05-%02d" % rng.randint(1, 28),
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-1000, 9000)
+        }
+        for index in range(count)
+    }
+
+
+def test_reward_table_round_trip(tmp_path, monkeypatch):
+    plan = compile_rules()
+    table = RewardTable.build(plan, max_spend_cents=10000)
+    path = str(tmp_path / "rewards.table")
+    table.save(path)
+    loaded = RewardTable.load(path)
+    assert loaded.fingerprint == plan.fingerprint
+
+    rng = random.Random(0)
+    for _ in range(200):
+        month = {
+            merchant: rng.randint(0, 10000)
+            for merchant in ("sportcheck", "tim_hortons", "subway", "other")
+        }
+        amounts = _month_units(plan, month, sum(month.values()))
+        expected = _solve_month(plan, amounts)
+        assert loaded.solve(plan, amounts) == expected
+        assert loaded.reward(amounts) == expected[0]
+
+    # months within the table are then answered by it
+    monkeypatch.setattr(calculator_module, "REWARD_TABLES", {})
+    transactions = {
+        "T1": {"merchant_code": "sportcheck", "amount_cents": 9500},
+        "T2": {"merchant_code": "tim_hortons", "amount_cents": 3000},
+        "T3": {"merchant_code": "subway", "amount_cents": 2600},
+        "T4": {"merchant_code": "other", "amount_cents": 4000}
+    }
+    solved = RewardPointsCalculator(transactions).maximum_reward_for_month()
+    install_reward_table(loaded)
+    lookups = calculator_module.COUNTERS["table_lookups"]
+    assert RewardPointsCalculator(transactions).maximum_reward_for_month() \
+        == solved
+    assert calculator_module.COUNTERS["table_lookups"] == lookups + 1
+
+
+def test_reward_table_rejects_other_files(tmp_path):
+    path = tmp_path / "not.table"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        RewardTable.load(str(path))
+
+
+@pytest.mark.parametrize("with_rewards", [True, False])
+def test_transaction_file_round_trip(tmp_path, with_rewards):
+    transactions = random_transactions(2)
+    calculator = RewardPointsCalculator(transactions)
+    path = str(tmp_path / "month.cols")
+    if with_rewards:
+        calculator.save(path)
+    else:
+        write_transaction_file(
+            path, TransactionColumns.from_dict(transactions)
+        )
+
+    columns = MappedTransactionColumns(path)
+    assert list(columns.transaction_ids) == list(transactions)
+    assert list(columns.amount_cents) == [
+        transaction["amount_cents"] for transaction in transactions.values()
+    ]
+    assert (columns.stored_rewards(calculator._plan) is not None) \
+        == with_rewards
+    with pytest.raises(TypeError):
+        columns.append("T", {"merchant_code": "subway", "amount_cents": 1})
+
+    mapped = RewardPointsCalculator.from_file(path)
+    assert mapped.maximum_reward_per_transaction() \
+        == calculator.maximum_reward_per_transaction()
+    assert mapped.maximum_reward_for_month() \
+        == calculator.maximum_reward_for_month()
@@ -0,0 +1,58 @@
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator.rewardPointsCalculator import (
+    RewardPointsCalculator, TransactionRewardCache
+)
+
+
+def test_lru_counters_and_eviction():
+    cache = TransactionRewardCache(2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # "b" is now the least recently used entry
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "size": 2, "hits": 3, "misses": 2, "evictions": 1
+    }
+    cache.clear()
+    assert cache.stats() == {
+        "size": 0, "hits": 0, "misses": 0, "evictions": 0
+    }
+
+
+def test_zero_size_disables_the_cache():
+    cache = TransactionRewardCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_calculators_share_the_cache(monkeypatch):
+    cache = TransactionRewardCache(16)
+    monkeypatch.setattr(calculator_module, "TRANSACTION_REWARD_CACHE", cache)
+    transactions = {
+        "T1": {"merchant_code": "sportcheck", "amount_cents": 2500},
+        "T2": {"merchant_code": "sportcheck", "amount_cents": 2500},
+        "T3": {"merchant_code": "subway", "amount_cents": 2500},
+    }
+    first = RewardPointsCalculator(transactions) \
+        .maximum_reward_per_transaction()
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # a hit hands out a fresh rules_used list
+    first[0][1]["rules_used"].append(99)
+    second = RewardPointsCalculator(transactions) \
+        .maximum_reward_per_transaction()
+    assert (cache.hits, cache.misses) == (4, 2)
+    assert second[0] == second[1]
+    assert 99 not in second[0][1]["rules_used"]
+
+    # other rule sets do not share entries
+    RewardPointsCalculator(
+        transactions, rules=[{"Points": 2, "Reqs": [["sportcheck", 1]]}]
+    ).maximum_reward_per_transaction()
+    assert cache.misses == 4
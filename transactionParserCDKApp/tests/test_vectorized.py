@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from rewardPointsCalculator import rewardPointsCalculator as calculator_module
+from rewardPointsCalculator.reference_solver import random_rule_set
+from rewardPointsCalculator.rewardPointsCalculator import (
+    DEFAULT_RULES, TRANSACTION_REWARD_CACHE, VECTORIZE_MIN_TRANSACTIONS,
+    RewardPointsCalculator
+)
+
+MERCHANTS = ("sportcheck", "tim_hortons", "subway", "other", "unknown")
+# two catch-all rules of different rates
+TWO_CATCH_ALL_RULES = DEFAULT_RULES[:-1] + [
+    {"Points": 1, "Reqs": [["other", 1]]},
+    {"Points": 6, "Reqs": [["other", 5]]},
+]
+
+
+def random_transactions(seed):
+    rng = random.Random(seed)
+    return {
+        "T%d" % index: {
+            "merchant_code": rng.choice(MERCHANTS),
+            "amount_cents": rng.randint(-2000, 20000)
+        }
+        for index in range(VECTORIZE_MIN_TRANSACTIONS + 500)
+    }
+
+
+def per_transaction_results(transactions, rules):
+    TRANSACTION_REWARD_CACHE.clear()
+    calculator = RewardPointsCalculator(transactions, rules=rules)
+    return (
+        calculator.maximum_reward_per_transaction(),
+        calculator.reward_points_per_transaction()
+    )
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_vectorized_matches_baseline(monkeypatch, seed):
+    pytest.importorskip("numpy")
+    rules = {
+        0: DEFAULT_RULES, 1: TWO_CATCH_ALL_RULES
+    }.get(seed) or random_rule_set(random.Random(seed))
+    transactions = random_transactions(seed)
+    vectorized = per_transaction_results(transactions, rules)
+
+    calculator = RewardPointsCalculator(transactions, rules=rules)
+    if len(calculator._plan.catch_all_rules) <= 1:
+        assert calculator.maximum_reward_per_transaction_columnar() \
+            .to_list() == vectorized[0]
+
+    monkeypatch.setattr(calculator_module, "_numpy", None)
+    assert per_transaction_results(transactions, rules) == vectorized